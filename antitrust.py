@@ -0,0 +1,241 @@
+"""
+BWL Planspiel - Kartellamt-Vorprüfung
+Marktanteile aller Firmen einmal je Marktstand sortiert; für jeden Käufer
+liegen die Schwellen (Fusionskontrolle 25%, Marktbeherrschung 40%) dann als
+Schnittpunkte in dieser Reihenfolge - zulässige Ziele und maximal erlaubter
+Anteil per bisect in O(log n) statt einer Einzelprüfung je Firmenpaar.
+
+Dazu die Marktaufsicht im Quartalsabschluss (Subventionen, Bußgelder,
+Preissenkungen, Zerschlagung) als Masken über die Spalten aller Firmen.
+"""
+import bisect
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# GWB §35-39: kombinierter Marktanteil über 25% = Vermutung marktbeherrschender Stellung
+MERGER_CONTROL_THRESHOLD = 0.25
+
+# Oligopol: Top-3 zusammen über 50% → Top-3-Firmen dürfen nicht zukaufen
+OLIGOPOLY_THRESHOLD = 0.50
+
+# Marktbeherrschung bei vollständiger Übernahme (GameSession.check_antitrust)
+DOMINANCE_THRESHOLD = 0.40
+
+
+class AntitrustScreen:
+    """Sortierte Marktanteile + Oligopol-Kennzahlen, neu aufgebaut nur bei geändertem Marktstand (Quartal, Firmenmenge)"""
+
+    def __init__(self, game):
+        self.game = game
+        self._stamp = None
+        self.shares: List[float] = []  # aufsteigend sortierte Marktanteile (ohne insolvente Firmen)
+        self.ids: List[int] = []  # Firmen-IDs in derselben Reihenfolge
+        self.top_3_market_share = 0.0
+        self.top_3_values: frozenset = frozenset()  # gerundete Top-3-Anteile wie in get_market_overview
+
+    def _refresh(self):
+        game = self.game
+        stamp = (game.epoch, game.current_quarter, game.firms_version)
+        if stamp == self._stamp:
+            return
+        order = sorted((firm.market_share, firm.id) for firm in game.firms.values() if not firm.is_bankrupt)
+        self.shares = [share for share, _ in order]
+        self.ids = [firm_id for _, firm_id in order]
+        # Top 3 nach Marktanteil wie in BusinessFirm.can_be_acquired (gerundet auf 0,01%-Punkte)
+        top_3 = sorted((round(firm.market_share * 100, 2) for firm in game.firms.values()), reverse=True)[:3]
+        self.top_3_market_share = sum(top_3) / 100.0
+        self.top_3_values = frozenset(share / 100.0 for share in top_3)
+        self._stamp = stamp
+
+    def invalidate(self):
+        self._stamp = None
+
+    # ============ FUSIONSKONTROLLE (Anteilserwerb) ============
+
+    def oligopoly_blocked(self, acquirer) -> bool:
+        self._refresh()
+        return self.top_3_market_share > OLIGOPOLY_THRESHOLD and acquirer.market_share in self.top_3_values
+
+    def max_percentage(self, acquirer, target) -> float:
+        """Höchster zulässiger Anteil (%) an target, 0 = Erwerb untersagt"""
+        if target.is_bankrupt or target.id == acquirer.id or self.oligopoly_blocked(acquirer):
+            return 0.0
+        headroom = MERGER_CONTROL_THRESHOLD - acquirer.market_share
+        if headroom < 0:
+            return 0.0
+        if target.market_share <= headroom:
+            return 100.0
+        return min(100.0, headroom / target.market_share * 100.0)
+
+    def check(self, acquirer, target, percentage: float) -> Tuple[bool, str]:
+        """Fusionskontrolle einer einzelnen Übernahme (Meldungen wie BusinessFirm.can_be_acquired)"""
+        combined_market_share = acquirer.market_share + (target.market_share * percentage / 100.0)
+        if combined_market_share > MERGER_CONTROL_THRESHOLD:
+            return False, f"⚖️ KARTELLAMT: Übernahme untersagt! Kombinierter Marktanteil würde {combined_market_share*100:.1f}% betragen (>25% Schwelle)"
+        if self.oligopoly_blocked(acquirer):
+            return False, "⚖️ KARTELLAMT: Übernahme untersagt! Oligopolbildung verhindert (Top-3 hätten >50% Marktanteil)"
+        return True, "Übernahme kartellrechtlich zulässig"
+
+    def permissible_targets(self, acquirer, dominance: bool = False) -> List[Dict]:
+        """
+        Alle Ziele, an denen acquirer Anteile erwerben darf, mit maximal erlaubtem Anteil
+
+        Die Grenze für vollständige Übernahmen ist ein Schnittpunkt in den sortierten
+        Marktanteilen (bisect); nur Firmen dahinter brauchen eine Teilgrenze.
+        dominance: zusätzlich nur Ziele unter der 40%-Marktbeherrschungsgrenze (Dashboard)
+        """
+        self._refresh()
+        headroom = MERGER_CONTROL_THRESHOLD - acquirer.market_share
+        if headroom < 0 or self.oligopoly_blocked(acquirer):
+            return []
+        end = len(self.shares)
+        if dominance:
+            end = bisect.bisect_left(self.shares, DOMINANCE_THRESHOLD - acquirer.market_share)
+        full = min(end, bisect.bisect_right(self.shares, headroom))
+
+        targets = []
+        firms = self.game.firms
+        for position in range(end - 1, -1, -1):  # größte Marktanteile zuerst
+            firm_id = self.ids[position]
+            if firm_id == acquirer.id or firm_id not in firms:
+                continue
+            share = self.shares[position]
+            max_percentage = 100.0 if position < full else headroom / share * 100.0
+            if max_percentage <= 0:
+                continue
+            targets.append({
+                "firm_id": firm_id,
+                "market_share": round(share * 100, 2),
+                "max_percentage": round(min(100.0, max_percentage), 2)
+            })
+        return targets
+
+    # ============ MARKTBEHERRSCHUNG (vollständige Übernahme) ============
+
+    def dominance_check(self, acquirer, target) -> Dict:
+        """Vollständige Übernahme: kombinierter Marktanteil unter 40% (wie GameSession.check_antitrust)"""
+        combined_share = acquirer.market_share + target.market_share
+        if combined_share >= DOMINANCE_THRESHOLD:
+            return {
+                "allowed": False,
+                "reason": f"Marktbeherrschung ({combined_share*100:.1f}% > 40%)",
+                "combined_market_share": combined_share * 100
+            }
+        return {
+            "allowed": True,
+            "reason": "Unbedenklich",
+            "combined_market_share": combined_share * 100
+        }
+
+
+# ============ MARKTAUFSICHT (Quartalsabschluss) ============
+
+# Eingriffsstufen nach Marktanteil
+WARNING_THRESHOLD = 0.30  # Warnung + 2% Umsatz Bußgeld
+PENALTY_THRESHOLD = 0.40  # 5% Umsatz Strafe + Preissenkung
+CRITICAL_THRESHOLD = 0.50  # 10% Umsatz Strafe + Preissenkung + Kapazitätsabbau
+
+# Mittelstandsförderung: Firmen unter 10% Marktanteil mit Verlust erhalten 50% des Verlusts, max. €50.000
+SUBSIDY_THRESHOLD = 0.10
+SUBSIDY_RATE = 0.5
+SUBSIDY_CAP = 50_000
+
+FINE_RATES = (0.02, 0.05, 0.10)  # Warnung, Strafe, Zerschlagung (Anteil am Umsatz)
+
+# Preissenkung: Faktor und Preisuntergrenze je Stufe (Strafe, Zerschlagung)
+PRICE_CUTS = ((0.90, 80.0), (0.85, 75.0))
+
+# Zerschlagung: Verkauf von 10% der Maschinen (Maschinenwert + Produktionskapazität)
+DIVESTITURE_RATE = 0.10
+
+# Meldungspräfix je Stufe (Maßnahmen-Feed)
+ENFORCEMENT_LABELS = {
+    "warnung": "[WARNUNG] Kartellamt",
+    "strafe": "[STRAFE] Kartellamt",
+    "zerschlagung": "[ZERSCHLAGUNG] KARTELLAMT",
+}
+
+ENFORCEMENT_FIELDS = ("market_share", "revenue", "profit", "cash", "product_price", "production_capacity", "machines_value")
+
+
+def enforcement_levels(share, profit) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Masken (subventioniert, Warnung, Strafe, Zerschlagung) je Firma bzw. Szenario"""
+    subsidized = (share < SUBSIDY_THRESHOLD) & (profit < 0)
+    warned = (share >= WARNING_THRESHOLD) & (share < PENALTY_THRESHOLD)
+    penalized = (share >= PENALTY_THRESHOLD) & (share < CRITICAL_THRESHOLD)
+    critical = share >= CRITICAL_THRESHOLD
+    return subsidized, warned, penalized, critical
+
+
+def enforcement_cash(share, revenue, profit) -> Tuple[np.ndarray, np.ndarray]:
+    """(Subvention, Bußgeld) je Firma bzw. Szenario - auch für die Prognose (batch.kartellamt_cash_effect)"""
+    share, revenue, profit = (np.asarray(values, dtype=float) for values in (share, revenue, profit))
+    subsidized, warned, penalized, critical = enforcement_levels(share, profit)
+    subsidy = np.where(subsidized, np.minimum(SUBSIDY_CAP, -profit * SUBSIDY_RATE), 0.0)
+    fine = revenue * np.select([warned, penalized, critical], FINE_RATES, 0.0)
+    return subsidy, fine
+
+
+def enforce_regulations(firms: List, quarter: int) -> List[Dict]:
+    """
+    Eingriffe des Kartellamts für alle Firmen eines Quartals
+
+    Stufen, Bußgelder, Preissenkungen und Kapazitätsabbau werden als Masken über
+    die Spalten aller Firmen berechnet; zurückgeschrieben werden nur betroffene
+    Firmen. Rückgabe: eine Maßnahme je betroffener Firma (Dict, JSON-fähig).
+    """
+    if not firms:
+        return []
+    share, revenue, profit, cash, price, capacity, machines = (
+        np.array([getattr(firm, name) for firm in firms], dtype=float) for name in ENFORCEMENT_FIELDS)
+
+    subsidized, warned, penalized, critical = enforcement_levels(share, profit)
+    subsidy, fine = enforcement_cash(share, revenue, profit)
+
+    (penalty_factor, penalty_floor), (critical_factor, critical_floor) = PRICE_CUTS
+    new_price = np.select(
+        [penalized & (price > penalty_floor), critical & (price > critical_floor)],
+        [np.maximum(penalty_floor, price * penalty_factor), np.maximum(critical_floor, price * critical_factor)],
+        price)
+    divested = critical & (capacity > 0)
+    capacity_divested = np.where(divested, capacity * DIVESTITURE_RATE, 0.0)
+    machines_divested = np.where(divested, machines * DIVESTITURE_RATE, 0.0)
+    new_cash = cash + subsidy - fine
+
+    levels = np.select([subsidized, warned, penalized, critical], ["subvention", "warnung", "strafe", "zerschlagung"], "")
+    actions = []
+    for index in np.flatnonzero(levels != ""):
+        firm = firms[index]
+        level = str(levels[index])
+        action = {
+            "quarter": quarter,
+            "firm_id": firm.id,
+            "firm_name": firm.name,
+            "level": level,
+            "market_share": round(float(share[index]) * 100, 2),
+        }
+        firm.cash = float(new_cash[index])
+        if level == "subvention":
+            action["subsidy"] = round(float(subsidy[index]), 2)
+            action["message"] = f"Mittelstandsförderung: {firm.name} erhält €{subsidy[index]:,.0f} Subvention"
+            actions.append(action)
+            continue
+
+        action["fine"] = round(float(fine[index]), 2)
+        message = f"{ENFORCEMENT_LABELS[level]}: {firm.name} (Marktanteil {share[index]*100:.1f}%) - "
+        message += f"Warnung + €{fine[index]:,.0f} Bußgeld" if level == "warnung" else f"€{fine[index]:,.0f} Strafe"
+        if new_price[index] != price[index]:
+            firm.product_price = float(new_price[index])
+            action["price_before"] = round(float(price[index]), 2)
+            action["price_after"] = round(float(new_price[index]), 2)
+            message += f" + Preissenkung €{price[index]:.2f} -> €{new_price[index]:.2f}"
+        if divested[index]:
+            firm.production_capacity = float(capacity[index] - capacity_divested[index])
+            firm.machines_value = float(machines[index] - machines_divested[index])
+            action["capacity_divested"] = round(float(capacity_divested[index]), 2)
+            action["machines_value_divested"] = round(float(machines_divested[index]), 2)
+            message += f" + Zwangsverkauf von {DIVESTITURE_RATE:.0%} der Maschinen ({capacity_divested[index]:,.0f} Einheiten Kapazität)"
+        action["message"] = message
+        actions.append(action)
+    return actions
@@ -0,0 +1,134 @@
+"""
+BWL Planspiel - Vektorisierte Quartalsberechnung
+Rechnet die Formeln des Quartals-Kernels (kernel.quarter_formulas) für viele
+Firmen bzw. Szenarien gleichzeitig (numpy), ohne Firmenobjekte zu verändern.
+"""
+from typing import Dict, Iterable
+
+import numpy as np
+
+from antitrust import enforcement_cash
+from kernel import quarter_formulas
+
+# Firmenfelder, die in die Quartalsberechnung eingehen (1:1 Attributnamen von BusinessFirm)
+STATE_FIELDS = (
+    "cash", "debt", "product_price", "production_capacity", "inventory_level",
+    "safety_stock_percentage", "marketing_budget", "rd_budget", "quality_level",
+    "buildings_value", "machines_value", "equipment_value",
+    "buildings_depreciation_rate", "machines_depreciation_rate", "equipment_depreciation_rate",
+    "variable_cost_efficiency", "material_cost_reduction", "overhead_efficiency",
+    "process_optimization_investment", "supplier_negotiation_investment", "overhead_reduction_investment",
+    "innovation_investment", "machines_efficiency_factor", "machine_energy_cost_factor",
+)
+
+
+def firm_columns(firms: Iterable) -> Dict[str, np.ndarray]:
+    """
+    Snapshot der Firmen als Spalten-Arrays (eine Zeile pro Firma)
+
+    Zusätzlich zu STATE_FIELDS werden abgeleitete Konstanten des Quartals
+    vorberechnet: Personalkosten, Kreditzahlungen, Kreditzinsen, max. Kapazität.
+    """
+    firms = list(firms)
+    columns = {name: np.array([getattr(f, name) for f in firms], dtype=float) for name in STATE_FIELDS}
+    columns["personnel_costs"] = np.array([
+        f.personnel_ungelernt * f.cost_ungelernt +
+        f.personnel_angelernt * f.cost_angelernt +
+        f.personnel_facharbeiter * f.cost_facharbeiter
+        for f in firms
+    ], dtype=float)
+    loan_terms = [f.loan_terms() for f in firms]  # (Raten, Zinsen, Restschuld) aus dem Kreditbuch
+    columns["loan_payments"] = np.array([terms[0] for terms in loan_terms], dtype=float)
+    columns["loan_interest"] = np.array([terms[1] for terms in loan_terms], dtype=float)
+    columns["max_capacity"] = np.array([f.calculate_max_production_capacity() for f in firms], dtype=float)
+    return columns
+
+
+def broadcast_columns(columns: Dict[str, np.ndarray], shape) -> Dict[str, np.ndarray]:
+    """Read-only Views der Spalten in Szenario-Form (z.B. (K, n)) - es wird nichts kopiert"""
+    return {name: np.broadcast_to(col, shape) for name, col in columns.items()}
+
+
+def _like(value, reference) -> np.ndarray:
+    """Entscheidungswert auf die Form der Firmenspalten bringen (Skalar → Array-View)"""
+    value = np.asarray(value, dtype=float)
+    return np.broadcast_to(value, np.broadcast_shapes(value.shape, np.shape(reference)))
+
+
+def apply_decision_columns(columns: Dict[str, np.ndarray], price, capacity, marketing, rd, quality, jit_safety,
+                           process_opt=0, supplier_neg=0, overhead_red=0,
+                           buildings_depr=None, machines_depr=None, equipment_depr=None) -> Dict[str, np.ndarray]:
+    """
+    Vektorisierte Variante von BusinessFirm.apply_decisions
+
+    Copy-on-Write: nur die Entscheidungsspalten werden neu angelegt, alle
+    anderen Spalten werden mit dem Eingabe-Snapshot geteilt.
+    """
+    cash = columns["cash"]
+    out = dict(columns)
+    out["product_price"] = _like(np.clip(price, 50, 500), cash)
+    out["production_capacity"] = np.minimum(np.maximum(capacity, 0), columns["max_capacity"])
+    out["marketing_budget"] = np.maximum(0, np.minimum(cash * 0.3, marketing))
+    out["rd_budget"] = np.maximum(0, np.minimum(cash * 0.2, rd))
+    out["quality_level"] = _like(np.clip(quality, 1, 10), cash)
+    out["safety_stock_percentage"] = _like(np.clip(np.asarray(jit_safety, dtype=float) / 100.0, 0.0, 1.0), cash)
+
+    max_efficiency_investment = cash * 0.1
+    out["process_optimization_investment"] = np.maximum(0, np.minimum(max_efficiency_investment, process_opt))
+    out["supplier_negotiation_investment"] = np.maximum(0, np.minimum(max_efficiency_investment, supplier_neg))
+    out["overhead_reduction_investment"] = np.maximum(0, np.minimum(max_efficiency_investment, overhead_red))
+
+    if buildings_depr is not None:
+        out["buildings_depreciation_rate"] = _like(np.clip(np.asarray(buildings_depr, dtype=float) / 100.0, 0.001, 0.05), cash)
+    if machines_depr is not None:
+        out["machines_depreciation_rate"] = _like(np.clip(np.asarray(machines_depr, dtype=float) / 100.0, 0.001, 0.05), cash)
+    if equipment_depr is not None:
+        out["equipment_depreciation_rate"] = _like(np.clip(np.asarray(equipment_depr, dtype=float) / 100.0, 0.001, 0.05), cash)
+    return out
+
+
+class ArrayOps:
+    """Rechenoperationen von kernel.quarter_formulas für Spalten-Arrays (Gegenstück: kernel.ScalarOps)"""
+    minimum = staticmethod(np.minimum)
+    maximum = staticmethod(np.maximum)
+    log = staticmethod(np.log)
+    where = staticmethod(np.where)
+
+    @staticmethod
+    def ratio(numerator, denominator):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(denominator > 0, numerator / denominator, np.inf)
+
+
+def quarterly_results_batch(c: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Quartalsergebnis für alle Zeilen auf einmal (elementweise, beliebige Array-Form)
+    - dieselben Formeln wie der Quartals-Kernel (kernel.quarter_formulas)
+
+    Returns: revenue, units_sold, variable_costs, total_costs, ebit, profit (nach Steuern),
+             cash (nach Quartal), inventory, liquidity_1..3
+    """
+    f = quarter_formulas(c, c["personnel_costs"], ops=ArrayOps)
+    actual_sales = f["actual_sales"]
+    return {
+        "revenue": f["revenue"],
+        "units_sold": actual_sales,
+        "variable_costs": f["variable_costs"],
+        "total_costs": f["total_costs"],
+        "ebit": f["ebit"],
+        "profit": f["net_profit"],
+        "cash": c["cash"] + f["net_profit"],
+        "inventory": np.maximum(0, c["inventory_level"] + c["production_capacity"] - actual_sales),
+        "liquidity_1": f["liquidity_1"],
+        "liquidity_2": f["liquidity_2"],
+        "liquidity_3": f["liquidity_3"],
+    }
+
+
+def kartellamt_cash_effect(market_share, revenue, profit):
+    """
+    Cash-Wirkung der Kartellamt-Maßnahmen (Subvention positiv, Bußgeld negativ)
+    Schwellen und Sätze wie im Quartalsabschluss (antitrust.enforcement_cash)
+    """
+    subsidy, fine = enforcement_cash(market_share, revenue, profit)
+    return subsidy - fine
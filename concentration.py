@@ -0,0 +1,103 @@
+"""
+BWL Planspiel - Marktkonzentration
+Herfindahl-Hirschman-Index (HHI), Konzentrationsraten CR4/CR8 und Beitrag
+jeder Firma zum HHI, inkrementell gepflegt: jede Marktanteilsänderung ändert
+die Quadratsumme und eine sortierte Anteilsliste in O(log n) - Abfragen
+lesen nur noch die laufenden Summen bzw. die obersten k Einträge.
+"""
+import bisect
+from typing import Dict, List, Tuple
+
+# HHI-Einstufung (Punkte, Anteile in %): unter 1.500 unkonzentriert, ab 2.500 hoch konzentriert
+HHI_MODERATE = 1_500
+HHI_HIGH = 2_500
+
+# Nach so vielen Änderungen wird die Quadratsumme exakt neu gebildet (Rundungsfehler begrenzen)
+RESUM_INTERVAL = 1024
+
+
+def classify(hhi: float) -> str:
+    if hhi >= HHI_HIGH:
+        return "hoch konzentriert"
+    if hhi >= HHI_MODERATE:
+        return "mäßig konzentriert"
+    return "unkonzentriert"
+
+
+class ConcentrationIndex:
+    """Marktanteile (Anteil 0..1) je Firma mit laufender Quadratsumme und sortierter Rangfolge"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.shares: Dict[int, float] = {}
+        self._ranked: List[Tuple[float, int]] = []  # (Anteil, firm_id) aufsteigend
+        self._sum_squares = 0.0
+        self._changes = 0
+
+    # ============ ÄNDERUNGEN ============
+
+    def update(self, firm_id: int, share: float):
+        """Neuer Marktanteil einer Firma (auch für neue Firmen) - O(log n) + Verschieben in der Liste"""
+        old = self.shares.get(firm_id)
+        if old == share:
+            return
+        if old is not None:
+            self._unrank(firm_id, old)
+        bisect.insort(self._ranked, (share, firm_id))
+        self.shares[firm_id] = share
+        self._sum_squares += share * share
+        self._changed()
+
+    def remove(self, firm_id: int):
+        """Firma verlässt den Markt (Insolvenz, Übernahme)"""
+        old = self.shares.pop(firm_id, None)
+        if old is not None:
+            self._unrank(firm_id, old)
+            self._changed()
+
+    def _unrank(self, firm_id: int, share: float):
+        index = bisect.bisect_left(self._ranked, (share, firm_id))
+        del self._ranked[index]
+        self._sum_squares -= share * share
+
+    def _changed(self):
+        self._changes += 1
+        if self._changes >= RESUM_INTERVAL:
+            self._sum_squares = sum(share * share for share, _ in self._ranked)
+            self._changes = 0
+
+    # ============ ABFRAGEN ============
+
+    @property
+    def hhi(self) -> float:
+        """Herfindahl-Hirschman-Index in Punkten (0 … 10.000)"""
+        return max(0.0, self._sum_squares) * 10_000
+
+    def concentration_ratio(self, k: int) -> float:
+        """CRk: gemeinsamer Marktanteil (%) der k größten Firmen - O(k)"""
+        return sum(share for share, _ in self._ranked[-k:]) * 100 if k > 0 else 0.0
+
+    def contribution(self, firm_id: int) -> float:
+        """Anteil (%) der Firma am HHI"""
+        share = self.shares.get(firm_id, 0.0)
+        return share * share / self._sum_squares * 100 if self._sum_squares > 0 else 0.0
+
+    def merger_delta(self, firm_a: int, firm_b: int) -> float:
+        """HHI-Anstieg bei Zusammenschluss zweier Firmen: 2 · s_a · s_b (Punkte)"""
+        return 2 * self.shares.get(firm_a, 0.0) * self.shares.get(firm_b, 0.0) * 10_000
+
+    def top(self, k: int) -> List[Tuple[int, float]]:
+        """Die k größten Firmen als (firm_id, Anteil), größte zuerst"""
+        return [(firm_id, share) for share, firm_id in reversed(self._ranked[-k:])] if k > 0 else []
+
+    def summary(self) -> Dict:
+        hhi = self.hhi
+        return {
+            "hhi": round(hhi, 1),
+            "classification": classify(hhi),
+            "cr4": round(self.concentration_ratio(4), 2),
+            "cr8": round(self.concentration_ratio(8), 2),
+            "firms": len(self.shares)
+        }
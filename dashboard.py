@@ -3,6 +3,8 @@ BWL Planspiel - Dash Frontend Dashboard
 Nutzt fertige Dash Bootstrap Components
 """
 import os
+import json
+import threading
 import dash
 from dash import dcc, html, Input, Output, State, callback_context, ALL
 import dash_bootstrap_components as dbc
@@ -11,6 +13,7 @@ import requests
 from datetime import datetime
 from state import game  # Direkter Zugriff auf den Spielstatus
 from models import DecisionInput  # Für Typ-Sicherheit
+from forecast import forecast_decision
 
 # Dash App mit Bootstrap Theme
 app = dash.Dash(
@@ -30,6 +33,31 @@ def format_de(value):
     """Formatiert Zahlen im deutschen Format (1.000.000 statt 1,000,000)"""
     return f"{value:,.0f}".replace(",", ".")
 
+
+# Marktweite Diagramme: für alle Nutzer gleich → einmal pro Quartal gebaut und als
+# serialisiertes Figure-JSON (plain dict) an alle Dashboards ausgeliefert
+_figure_cache = {}  # name → (Marktstand, figure dict oder None)
+_figure_lock = threading.Lock()
+
+
+def market_figure_key() -> tuple:
+    """Stand der marktweiten Diagramme: neue Session, Quartalsabschluss oder geänderte Firmenmenge"""
+    return game.epoch, game.current_quarter, game.firms_version
+
+
+def cached_figure(name, build):
+    """Figure aus dem Cache; build() → go.Figure oder None (keine Daten) nur bei neuem Marktstand"""
+    key = market_figure_key()
+    cached = _figure_cache.get(name)
+    if cached is None or cached[0] != key:
+        with _figure_lock:
+            cached = _figure_cache.get(name)
+            if cached is None or cached[0] != key:
+                fig = build()
+                cached = (key, json.loads(fig.to_json()) if fig is not None else None)
+                _figure_cache[name] = cached
+    return cached[1]
+
 # ============ LAYOUT COMPONENTS ============
 
 def create_header():
@@ -405,6 +433,10 @@ def create_decision_form(firm_data):
             ),
             html.Small(f"Aktuell: {depr_rates.get('equipment', 1.0):.2f}%", className="text-muted d-block mb-3"),
 
+            # Live-Prognose (Was-wäre-wenn, aktualisiert bei jeder Eingabe)
+            html.H6("Prognose für diese Entscheidung", className="mt-4 mb-2"),
+            html.Div(id="decision-forecast", className="mb-3"),
+
             dbc.Button(
                 [html.I(className="fas fa-check me-2"), "Entscheidungen Anwenden"],
                 id="btn-submit-decision",
@@ -659,59 +691,67 @@ def create_market_volume_card():
         return dbc.Alert(f"Marktdaten konnten nicht geladen werden: {str(e)}", color="warning")
 
 
-def create_market_volume_graph():
-    """Marktvolumen über Zeit - Zeigt Gesamtmarktentwicklung"""
-    try:
-        # Hole alle Firmen direkt aus dem Speicher
-        firms = game.firms.values()
+def build_market_volume_figure():
+    """Marktvolumen über Zeit (None ohne historische Daten)"""
+    # Hole alle Firmen direkt aus dem Speicher
+    firms = game.firms.values()
 
-        # Sammle alle Quarter-Revenue Daten von allen Firmen
-        all_quarters = set()
-        firm_histories = {}
+    # Sammle alle Quarter-Revenue Daten von allen Firmen
+    all_quarters = set()
+    firm_histories = {}
 
-        for firm in firms:
-            # history ist direkt verfügbar im Objekt
-            history = firm.history
+    for firm in firms:
+        # history ist direkt verfügbar im Objekt
+        history = firm.history
 
-            if history:
-                # History ist eine Liste von Dicts
-                firm_histories[firm.name] = {h['quarter']: h['revenue'] for h in history}
-                all_quarters.update(h['quarter'] for h in history)
+        if history:
+            # History ist eine Liste von Dicts
+            firm_histories[firm.name] = {h['quarter']: h['revenue'] for h in history}
+            all_quarters.update(h['quarter'] for h in history)
 
-        if not all_quarters:
-            return dbc.Alert("Noch keine historischen Daten verfügbar", color="info", className="mb-4")
+    if not all_quarters:
+        return None
 
-        # Sortiere Quartale
-        quarters = sorted(list(all_quarters))
+    # Sortiere Quartale
+    quarters = sorted(list(all_quarters))
 
-        # Berechne Gesamtmarktvolumen pro Quartal
-        total_market_volumes = []
-        for q in quarters:
-            total = sum(firm_histories[firm_name].get(q, 0) for firm_name in firm_histories)
-            total_market_volumes.append(total)
+    # Berechne Gesamtmarktvolumen pro Quartal
+    total_market_volumes = []
+    for q in quarters:
+        total = sum(firm_histories[firm_name].get(q, 0) for firm_name in firm_histories)
+        total_market_volumes.append(total)
 
-        # Erstelle Plotly Line Chart
-        fig = go.Figure()
+    # Erstelle Plotly Line Chart
+    fig = go.Figure()
 
-        fig.add_trace(go.Scatter(
-            x=quarters,
-            y=total_market_volumes,
-            mode='lines+markers',
-            name='Gesamtmarktvolumen',
-            line=dict(color='steelblue', width=3),
-            marker=dict(size=10, color='steelblue'),
-            fill='tozeroy',
-            fillcolor='rgba(70, 130, 180, 0.2)'
-        ))
+    fig.add_trace(go.Scatter(
+        x=quarters,
+        y=total_market_volumes,
+        mode='lines+markers',
+        name='Gesamtmarktvolumen',
+        line=dict(color='steelblue', width=3),
+        marker=dict(size=10, color='steelblue'),
+        fill='tozeroy',
+        fillcolor='rgba(70, 130, 180, 0.2)'
+    ))
+
+    fig.update_layout(
+        height=300,
+        margin=dict(l=40, r=40, t=40, b=40),
+        xaxis_title="Quartal",
+        yaxis_title="Marktvolumen (€)",
+        hovermode='x unified',
+        showlegend=False
+    )
+    return fig
 
-        fig.update_layout(
-            height=300,
-            margin=dict(l=40, r=40, t=40, b=40),
-            xaxis_title="Quartal",
-            yaxis_title="Marktvolumen (€)",
-            hovermode='x unified',
-            showlegend=False
-        )
+
+def create_market_volume_graph():
+    """Marktvolumen über Zeit - Zeigt Gesamtmarktentwicklung"""
+    try:
+        fig = cached_figure("market_volume", build_market_volume_figure)
+        if fig is None:
+            return dbc.Alert("Noch keine historischen Daten verfügbar", color="info", className="mb-4")
 
         return dbc.Card([
             dbc.CardHeader(html.H5([
@@ -730,45 +770,54 @@ def create_market_volume_graph():
         return dbc.Alert(f"Fehler beim Laden der Marktdaten: {str(e)}", color="danger", className="mb-4")
 
 
+def build_market_share_figure():
+    """Pie Chart der Marktanteile (None ohne Firmen)"""
+    market_data = game.get_market_overview()
+
+    if not market_data:
+        return None
+
+    # Top 10 Firmen + Rest
+    top_firms = sorted(market_data, key=lambda x: x.get('market_share', 0), reverse=True)[:10]
+    other_share = sum(f.get('market_share', 0) for f in market_data[10:]) if len(market_data) > 10 else 0
+
+    labels = [f"{f['name']}" for f in top_firms]
+    values = [f['market_share'] for f in top_firms]
+
+    if other_share > 0:
+        labels.append("Andere")
+        values.append(other_share)
+
+    # Erstelle Pie Chart
+    fig = go.Figure(data=[go.Pie(
+        labels=labels,
+        values=values,
+        hovertemplate='%{label}<br>Marktanteil: %{value:.2f}%<br>%{percent}<extra></extra>',
+        textinfo='label+percent',
+        textposition='auto',
+        marker=dict(
+            colors=['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+                    '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf', '#aaaaaa']
+        )
+    )])
+
+    fig.update_layout(
+        height=400,
+        margin=dict(l=20, r=20, t=40, b=20),
+        showlegend=True,
+        legend=dict(orientation="v", yanchor="middle", y=0.5, xanchor="left", x=1.05)
+    )
+    return fig
+
+
 def create_market_share_pie_chart():
     """Pie Chart: Marktanteile aller Firmen"""
     try:
-        market_data = game.get_market_overview()
-        
-        if not market_data:
+        fig = cached_figure("market_share", build_market_share_figure)
+
+        if fig is None:
             return dbc.Alert("Keine Firmendaten verfügbar", color="info")
         
-        # Top 10 Firmen + Rest
-        top_firms = sorted(market_data, key=lambda x: x.get('market_share', 0), reverse=True)[:10]
-        other_share = sum(f.get('market_share', 0) for f in market_data[10:]) if len(market_data) > 10 else 0
-        
-        labels = [f"{f['name']}" for f in top_firms]
-        values = [f['market_share'] for f in top_firms]
-        
-        if other_share > 0:
-            labels.append("Andere")
-            values.append(other_share)
-        
-        # Erstelle Pie Chart
-        fig = go.Figure(data=[go.Pie(
-            labels=labels,
-            values=values,
-            hovertemplate='%{label}<br>Marktanteil: %{value:.2f}%<br>%{percent}<extra></extra>',
-            textinfo='label+percent',
-            textposition='auto',
-            marker=dict(
-                colors=['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', 
-                        '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf', '#aaaaaa']
-            )
-        )])
-        
-        fig.update_layout(
-            height=400,
-            margin=dict(l=20, r=20, t=40, b=20),
-            showlegend=True,
-            legend=dict(orientation="v", yanchor="middle", y=0.5, xanchor="left", x=1.05)
-        )
-        
         return dbc.Card([
             dbc.CardHeader(html.H5([
                 html.I(className="fas fa-chart-pie me-2"),
@@ -2045,6 +2094,87 @@ def submit_decision(n_clicks, firm_id, price, capacity, marketing, rd, quality,
         return dbc.Alert(f"Fehler: {str(e)}", color="danger")
 
 
+@app.callback(
+    Output("decision-forecast", "children"),
+    [Input("input-price", "value"),
+     Input("input-capacity", "value"),
+     Input("input-marketing", "value"),
+     Input("input-rd", "value"),
+     Input("input-quality", "value"),
+     Input("input-jit", "value")],
+    State("firm-id-store", "data")
+)
+def update_decision_forecast(price, capacity, marketing, rd, quality, jit, firm_id):
+    """Live-Prognose der geplanten Entscheidung (Monte Carlo über Bot-Szenarien)"""
+    if not firm_id or None in (price, capacity, marketing, rd, quality, jit):
+        return dash.no_update
+
+    try:
+        firm = game.get_firm_by_id(firm_id)
+        if not firm:
+            return dash.no_update
+
+        decision = DecisionInput(
+            product_price=price,
+            production_capacity=capacity,
+            marketing_budget=marketing,
+            rd_budget=rd,
+            quality_level=int(quality),
+            jit_safety_stock=jit
+        )
+        forecast = forecast_decision(game, firm, decision)
+        bands, expected = forecast["bands"], forecast["expected"]
+
+        def point_row(label, value, fmt):
+            """Szenariounabhängige Kennzahl: ein Wert statt Band"""
+            return html.Tr([
+                html.Td(label),
+                html.Td(fmt(value), colSpan=3, className="fw-bold text-center")
+            ])
+
+        def row(label, band, fmt):
+            return html.Tr([
+                html.Td(label),
+                html.Td(fmt(band["p5"])),
+                html.Td(fmt(band["p50"]), className="fw-bold"),
+                html.Td(fmt(band["p95"]))
+            ])
+
+        def euro(value):
+            return f"€{format_de(value)}" if value is not None else "-"
+
+        def ratio(value):
+            return f"{value:.2f}" if value is not None else "∞"
+
+        def percent(value):
+            return f"{value:.2f}%" if value is not None else "-"
+
+        return html.Div([
+            dbc.Table([
+                html.Thead(html.Tr([
+                    html.Th("Kennzahl"),
+                    html.Th("Pessimistisch (P5)"),
+                    html.Th("Median"),
+                    html.Th("Optimistisch (P95)")
+                ])),
+                html.Tbody([
+                    point_row("Umsatz", expected["revenue"], euro),
+                    point_row("Gewinn", expected["profit"], euro),
+                    point_row("Liquidität 1. Grades", expected["liquidity_1"], ratio),
+                    row("Cash (inkl. Kartellamt)", bands["cash"], euro),
+                    row("Marktanteil", bands["market_share"], percent)
+                ])
+            ], bordered=True, size="sm", className="mb-1"),
+            html.Small(
+                f"{forecast['scenarios']} Szenarien, Insolvenzrisiko {forecast['bankruptcy_risk'] * 100:.1f}%",
+                className="text-muted"
+            )
+        ])
+
+    except Exception as e:
+        return dbc.Alert(f"Prognose nicht möglich: {str(e)}", color="warning")
+
+
 @app.callback(
     [Output("kpi-container", "children"),
      Output("current-settings-container", "children"),
@@ -2353,25 +2483,27 @@ def leave_firm(n_clicks):
      Input("firm-id-store", "data")]
 )
 def load_acquisition_targets(pathname, firm_id):
-    """Lädt verfügbare Ziel-Firmen für M&A (alle außer eigene Firma)"""
+    """Lädt kartellrechtlich zulässige Ziel-Firmen für M&A (Kartellamt-Vorprüfung, nach Marktanteil)"""
     if not firm_id:
         return []
 
     try:
-        # Direkter Zugriff
-        firms = game.firms.values()
+        acquirer = game.get_firm_by_id(firm_id)
+        if not acquirer:
+            return []
 
-        # Filtere eigene Firma aus und sortiere nach Marktanteil
-        available_firms = [f for f in firms if f.id != firm_id]
-        available_firms.sort(key=lambda x: x.market_share, reverse=True)
+        # Nur Ziele, die Fusionskontrolle und Marktbeherrschungsgrenze bestehen - ohne Einzelprüfung je Firma
+        targets = [target for target in game.antitrust.permissible_targets(acquirer, dominance=True)
+                   if target["firm_id"] in game.firms]
 
         # Erstelle RadioItems mit detaillierten Informationen
         target_options = [
             {
-                "label": firm.name,
-                "value": firm.id
+                "label": game.firms[target["firm_id"]].name if target["max_percentage"] >= 100
+                else f"{game.firms[target['firm_id']].name} (max. {target['max_percentage']:.0f}%)",
+                "value": target["firm_id"]
             }
-            for firm in available_firms
+            for target in targets
         ]
 
         return target_options
@@ -2599,12 +2731,10 @@ def invest_innovation(n_clicks, firm_id, amount):
         if not firm:
             return dbc.Alert("Firma nicht gefunden", color="danger")
             
-        if firm.cash < amount:
-             return dbc.Alert(f"Nicht genug Cash. Verfügbar: €{format_de(firm.cash)}", color="danger")
-             
-        # Logic duplicated from main.py as it is not in models
-        firm.cash -= amount
-        firm.innovation_investment += amount
+        # Läuft als Firmenmethode (im Replikat in der Engine, auf deren aktuellem Cash-Stand)
+        success, message = firm.invest_in_innovation(amount)
+        if not success:
+            return dbc.Alert(message, color="danger")
 
         return dbc.Alert([
             html.I(className="fas fa-check-circle me-2"),
@@ -2615,3 +2745,9 @@ def invest_innovation(n_clicks, firm_id, amount):
 
     except Exception as e:
         return dbc.Alert(f"Fehler: {str(e)}", color="danger", dismissable=True)
+
+
+# Eigener Dashboard-Prozess (neben Engine mit STATE_ROLE=engine):
+#   STATE_ROLE=replica python dashboard.py  bzw.  STATE_ROLE=replica gunicorn -w 4 dashboard:server
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=int(os.getenv("DASH_PORT", 8050)), debug=False)
@@ -0,0 +1,109 @@
+"""
+BWL Planspiel - Delta-Kodierung der Quartals-Broadcasts
+Statt aller Absolutwerte werden pro Firma nur geänderte Felder gegenüber
+dem Vorquartal gesendet. Sequenznummern + regelmäßige Keyframes erlauben
+Clients, Lücken zu erkennen und per {"action": "resync"} neu aufzusetzen.
+"""
+from typing import Dict, List, Optional
+
+# Jedes n-te Quartal wird ein vollständiger Snapshot gesendet
+KEYFRAME_INTERVAL = 10
+
+# Vergleichsgenauigkeit (Nachkommastellen) - Rauschen unterhalb zählt nicht als Änderung
+DELTA_PRECISION = 2
+
+
+def flatten(values: Dict, prefix: str = "") -> Dict:
+    """Verschachtelte Dicts → flache Punkt-Pfade ({"costs": {"total": 1}} → {"costs.total": 1})"""
+    flat = {}
+    for key, value in values.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{path}."))
+        elif isinstance(value, float):
+            flat[path] = round(value, DELTA_PRECISION)
+        else:
+            flat[path] = value
+    return flat
+
+
+def diff(previous: Dict, current: Dict) -> Dict:
+    """Felder aus current, die in previous fehlen oder anders sind"""
+    return {key: value for key, value in current.items() if key not in previous or previous[key] != value}
+
+
+class QuarterDeltaEncoder:
+    """Merkt sich den letzten gesendeten Snapshot und erzeugt daraus Delta-Nachrichten"""
+
+    def __init__(self, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.reset()
+
+    def reset(self):
+        """Neues Spiel: nächste Nachricht ist ein Keyframe mit seq=1"""
+        self.seq = 0
+        self.quarter = 0
+        self.results: Dict[int, Dict] = {}
+        self.market: Dict[int, Dict] = {}
+        self.order: List[int] = []
+
+    def encode(self, quarter: int, results: Dict, market: List[Dict]) -> Dict:
+        """
+        Delta-Nachricht für einen Quartalsabschluss (aktualisiert den Snapshot)
+
+        Args:
+            results: {firm_id: Quartalsergebnis} wie GameSession.advance_quarter
+            market: Marktübersicht wie GameSession.get_market_overview (Rang = Position in "order")
+        """
+        results_now = {firm_id: flatten({k: v for k, v in result.items() if k != "quarter"})
+                       for firm_id, result in results.items()}
+        market_now = {row["id"]: flatten({k: v for k, v in row.items() if k != "rank"}) for row in market}
+        order_now = [row["id"] for row in market]
+
+        self.seq += 1
+        if (self.seq - 1) % self.keyframe_interval == 0:
+            self.quarter, self.results, self.market, self.order = quarter, results_now, market_now, order_now
+            return self.keyframe()
+
+        message = {
+            "type": "quarter_delta",
+            "seq": self.seq,
+            "base_seq": self.seq - 1,
+            "keyframe": False,
+            "quarter": quarter,
+            "results": {},
+            "removed": [firm_id for firm_id in self.results if firm_id not in results_now],
+            "market": {
+                "rows": {},
+                "removed": [firm_id for firm_id in self.market if firm_id not in market_now]
+            }
+        }
+        for firm_id, flat in results_now.items():
+            changed = diff(self.results.get(firm_id, {}), flat)
+            if changed:
+                message["results"][firm_id] = changed
+        for firm_id, row in market_now.items():
+            changed = diff(self.market.get(firm_id, {}), row)
+            if changed:
+                message["market"]["rows"][firm_id] = changed
+        if order_now != self.order:
+            message["market"]["order"] = order_now
+
+        self.quarter, self.results, self.market, self.order = quarter, results_now, market_now, order_now
+        return message
+
+    def keyframe(self) -> Optional[Dict]:
+        """Vollständiger Snapshot zum aktuellen seq (Resync / neue Clients); None vor dem ersten Quartal"""
+        if self.seq == 0:
+            return None
+        return {
+            "type": "quarter_delta",
+            "seq": self.seq,
+            "keyframe": True,
+            "quarter": self.quarter,
+            "results": dict(self.results),
+            "market": {
+                "order": list(self.order),
+                "rows": dict(self.market)
+            }
+        }
@@ -0,0 +1,154 @@
+"""
+BWL Planspiel - Monte-Carlo-Prognose für eine geplante Quartalsentscheidung
+Was-wäre-wenn: Die Entscheidung wird nicht angewendet, sondern gegen K
+zufällige Bot-Szenarien in einem vektorisierten Durchlauf durchgerechnet.
+"""
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from batch import firm_columns, broadcast_columns, apply_decision_columns, quarterly_results_batch, kartellamt_cash_effect
+from models import BOT_STRATEGY_RANGES, BusinessFirm, DecisionInput, GameSession
+
+# Perzentile der Verteilungsbänder
+BAND_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def _bands(values: np.ndarray) -> Dict:
+    """Verteilungsband (Perzentile + Mittelwert) einer Szenario-Kennzahl"""
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return {f"p{p}": None for p in BAND_PERCENTILES} | {"mean": None}
+    percentiles = np.percentile(finite, BAND_PERCENTILES)
+    band = {f"p{p}": round(float(v), 4) for p, v in zip(BAND_PERCENTILES, percentiles)}
+    band["mean"] = round(float(finite.mean()), 4)
+    return band
+
+
+def _point(value: float) -> Optional[float]:
+    """Punktschätzung (unendlich, z.B. Liquidität ohne Verbindlichkeiten → None)"""
+    return round(float(value), 4) if np.isfinite(value) else None
+
+
+def _strategy_row(ranges: Dict) -> tuple:
+    """Strategie-Spannweiten als flache Zeile (siehe _sample_bot_decisions)"""
+    quality = ranges["quality"] or (4, 9)
+    return (*ranges["price"], *ranges["capacity"], *ranges["marketing"], *ranges["rd"],
+            *quality, *ranges["jit"], ranges["quality"] is None)
+
+
+def _sample_bot_decisions(game: GameSession, bots: list, columns: Dict[str, np.ndarray], scenarios: int,
+                          avg_price: float, avg_quality: float, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """
+    Zieht K Szenarien der Bot-Entscheidungen (Form (K, B)) aus denselben
+    Strategie-Spannweiten wie GameSession.make_bot_decisions
+    """
+    rows = np.array([_strategy_row(BOT_STRATEGY_RANGES[game.select_bot_strategy(f)[0]]) for f in bots], dtype=float)
+    (price_lo, price_hi, cap_lo, cap_hi, mkt_share, mkt_lo, mkt_hi, rd_share, rd_lo, rd_hi,
+     quality_lo, quality_hi, jit_lo, jit_hi, balanced) = rows.T
+    shape = (scenarios, len(bots))
+
+    def uniform(lo, hi):
+        return lo + (hi - lo) * rng.random(shape)
+
+    cash = columns["cash"]
+    quality = np.floor(uniform(quality_lo, quality_hi + 1))  # randint(lo, hi) inkl. Obergrenze
+    balanced_quality = np.clip(np.trunc(avg_quality + rng.uniform(-1, 1, shape)), 4, 9)
+    return {
+        "price": avg_price * uniform(price_lo, price_hi),
+        "capacity": columns["max_capacity"] * uniform(cap_lo, cap_hi),
+        "marketing": np.minimum(cash * mkt_share, uniform(mkt_lo, mkt_hi)),
+        "rd": np.minimum(cash * rd_share, uniform(rd_lo, rd_hi)),
+        "quality": np.where(balanced > 0, balanced_quality, quality),
+        "jit_safety": uniform(jit_lo, jit_hi),
+    }
+
+
+def forecast_decision(game: GameSession, firm: BusinessFirm, decision: DecisionInput,
+                      scenarios: int = 200, seed: Optional[int] = None) -> Dict:
+    """
+    Prognostiziert das Quartalsergebnis einer Firma für eine geplante Entscheidung
+
+    Die Firmen werden nur gelesen (Spalten-Snapshot), nicht kopiert oder
+    verändert. Umsatz und Gewinn hängen im Nachfragemodell nur von der eigenen
+    Entscheidung ab; die Streuung entsteht über Marktanteil und die daran
+    gekoppelten Kartellamt-Maßnahmen (Bußgeld/Subvention → Cash).
+
+    Returns: Punktschätzung für Umsatz, Gewinn und Liquidität (szenariounabhängig),
+    Verteilungsbänder für Cash und Marktanteil
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+
+    others = [f for f in game.firms.values() if f.id != firm.id]
+    bots = [f for f in others if f.is_bot()]
+    humans = [f for f in others if not f.is_bot()]
+
+    # 1. Eigene Entscheidung (deterministisch)
+    own = apply_decision_columns(
+        firm_columns([firm]),
+        price=decision.product_price,
+        capacity=decision.production_capacity,
+        marketing=decision.marketing_budget,
+        rd=decision.rd_budget,
+        quality=decision.quality_level,
+        jit_safety=decision.jit_safety_stock,
+        process_opt=decision.process_optimization or 0,
+        supplier_neg=decision.supplier_negotiation or 0,
+        overhead_red=decision.overhead_reduction or 0,
+        buildings_depr=decision.buildings_depreciation,
+        machines_depr=decision.machines_depreciation,
+        equipment_depr=decision.equipment_depreciation
+    )
+    own_result = quarterly_results_batch(own)
+
+    # 2. Andere Spieler behalten ihre aktuellen Entscheidungen
+    human_revenue = float(quarterly_results_batch(firm_columns(humans))["revenue"].sum()) if humans else 0.0
+
+    # 3. Bots: K Szenarien (Marktdurchschnitt inkl. eigener geplanter Entscheidung)
+    if bots:
+        active = [f for f in others if f.revenue > 0 or game.current_quarter == 0]
+        prices = [f.product_price for f in active] + [float(own["product_price"][0])]
+        qualities = [f.quality_level for f in active] + [float(own["quality_level"][0])]
+        avg_price = sum(prices) / len(prices)
+        avg_quality = sum(qualities) / len(qualities)
+
+        bot_columns = firm_columns(bots)
+        sampled = _sample_bot_decisions(game, bots, bot_columns, scenarios, avg_price, avg_quality, rng)
+        bot_scenarios = apply_decision_columns(broadcast_columns(bot_columns, (scenarios, len(bots))), **sampled)
+        bot_revenue = quarterly_results_batch(bot_scenarios)["revenue"].sum(axis=1)
+    else:
+        bot_revenue = np.zeros(scenarios)
+
+    # 4. Marktanteil + Kartellamt je Szenario (Umsatz/Gewinn gelten in jedem Szenario)
+    revenue = float(own_result["revenue"][0])
+    profit = float(own_result["profit"][0])
+    total_revenue = revenue + human_revenue + bot_revenue
+    market_share = np.divide(revenue, total_revenue, out=np.zeros(scenarios), where=total_revenue > 0)
+    cash = own_result["cash"][0] + kartellamt_cash_effect(market_share, np.full(scenarios, revenue), np.full(scenarios, profit))
+
+    return {
+        "firm_id": firm.id,
+        "quarter": game.current_quarter + 1,
+        "scenarios": scenarios,
+        "decision": {
+            "product_price": round(float(own["product_price"][0]), 2),
+            "production_capacity": round(float(own["production_capacity"][0]), 2),
+            "marketing_budget": round(float(own["marketing_budget"][0]), 2),
+            "rd_budget": round(float(own["rd_budget"][0]), 2),
+            "quality_level": int(own["quality_level"][0]),
+            "safety_stock_percentage": round(float(own["safety_stock_percentage"][0]) * 100, 1)
+        },
+        "expected": {
+            "revenue": _point(revenue),
+            "profit": _point(profit),
+            "liquidity_1": _point(own_result["liquidity_1"][0])
+        },
+        "bands": {
+            "cash": _bands(cash),
+            "market_share": _bands(market_share * 100)
+        },
+        "bankruptcy_risk": round(float((cash <= 0).mean()), 4),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
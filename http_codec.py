@@ -0,0 +1,132 @@
+"""
+BWL Planspiel - HTTP-Antwortkodierung
+Schnelles JSON (orjson, inf/nan → null) als Standard-Response der API und
+Kompression (Brotli falls installiert, sonst GZip) ab einer Mindestgröße -
+als ASGI-Middleware auch für das eingehängte Dash-Dashboard.
+"""
+import gzip
+import os
+from typing import Any, Optional
+
+import orjson
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+try:  # optional: pip install brotli
+    import brotli
+except ImportError:
+    brotli = None
+
+# Antworten unter dieser Größe (Bytes) werden unkomprimiert gesendet
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1000"))
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # dynamische Antworten: guter Kompromiss aus Rate und CPU
+
+# Ab dieser Größe im Threadpool komprimieren (blockiert sonst die Event-Loop)
+THREAD_MIN_SIZE = 128 * 1024
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/javascript", "application/x-javascript",
+    "application/xml", "image/svg+xml", "text/",
+)
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson-Response: schneller als json.dumps, numpy-Werte direkt, inf/nan → null statt Fehler"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Beste unterstützte Kodierung aus dem Accept-Encoding-Header (br vor gzip, q=0 = abgelehnt)"""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip()] = quality
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _is_compressible(start: dict) -> bool:
+    if start["status"] in (204, 206, 304):
+        return False
+    headers = Headers(raw=start["headers"])
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    ASGI-Middleware: puffert komprimierbare Antworten und sendet sie als br/gzip
+
+    Gilt für alle HTTP-Routen inkl. gemounteter WSGI-App (Dash); WebSockets bleiben unberührt.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+        chunks = []
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                passthrough = not _is_compressible(message)
+                if passthrough:
+                    await send(message)
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            headers = MutableHeaders(raw=start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if len(body) >= self.minimum_size:
+                if len(body) >= THREAD_MIN_SIZE:
+                    body = await run_in_threadpool(compress, body, encoding)
+                else:
+                    body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,591 @@
+"""
+BWL Planspiel - Quartals-Kernel
+Reine Berechnung des Quartalsabschlusses einer Firma: unveränderlicher
+Zustand (inkl. Entscheidungen) rein, Ergebnis + Folgezustand raus.
+Keine Seiteneffekte - dadurch memoisierbar, in Worker-Prozessen ausführbar
+und spekulativ auswertbar (BusinessFirm wendet das Ergebnis nur noch an).
+"""
+import math
+from dataclasses import dataclass, field, replace
+from typing import Dict, Mapping
+
+
+@dataclass(frozen=True)
+class QuarterState:
+    """
+    Alle Firmenfelder, die der Quartalsabschluss liest oder schreibt
+    (Attributnamen 1:1 wie BusinessFirm). Hashbar → als Cache-Schlüssel nutzbar.
+    """
+    # Entscheidungen
+    product_price: float
+    production_capacity: float
+    marketing_budget: float
+    rd_budget: float
+    quality_level: int
+    safety_stock_percentage: float
+    process_optimization_investment: float
+    supplier_negotiation_investment: float
+    overhead_reduction_investment: float
+    innovation_investment: float
+
+    # Finanzen & Bestände
+    cash: float
+    debt: float
+    equity: float
+    inventory_level: float
+    retained_earnings: float
+    market_share: float
+    current_quarter: int
+
+    # Anlagen & Abschreibung
+    buildings_value: float
+    machines_value: float
+    equipment_value: float
+    buildings_depreciation_rate: float
+    machines_depreciation_rate: float
+    equipment_depreciation_rate: float
+
+    # Effizienz & Maschinen
+    variable_cost_efficiency: float
+    material_cost_reduction: float
+    overhead_efficiency: float
+    machines_efficiency_factor: float
+    machine_energy_cost_factor: float
+
+    # Personal
+    personnel_ungelernt: int
+    personnel_angelernt: int
+    personnel_facharbeiter: int
+    cost_ungelernt: float
+    cost_angelernt: float
+    cost_facharbeiter: float
+
+    # Produktlebenszyklus
+    product_lifecycle_stage: str
+    product_age_quarters: int
+    product_innovation_level: int
+
+    # Vorquartal
+    prev_revenue: float
+    prev_profit: float
+    prev_market_share: float
+
+    # Ergebnisse (werden vom Kernel neu gesetzt)
+    revenue: float = 0.0
+    profit: float = 0.0
+    ebit: float = 0.0
+    ebitda: float = 0.0
+    roi: float = 0.0
+    roe: float = 0.0
+    roa: float = 0.0
+    units_sold: float = 0.0
+    gross_margin: float = 0.0
+    operating_margin: float = 0.0
+    net_margin: float = 0.0
+    contribution_margin: float = 0.0
+    asset_turnover: float = 0.0
+    inventory_turnover: float = 0.0
+    capacity_utilization: float = 0.0
+    debt_to_equity: float = 0.0
+    equity_ratio: float = 0.0
+    debt_ratio: float = 0.0
+    interest_coverage: float = 0.0
+    revenue_growth: float = 0.0
+    profit_growth: float = 0.0
+    market_share_growth: float = 0.0
+    liquidity_1: float = float('inf')
+    liquidity_2: float = float('inf')
+    liquidity_3: float = float('inf')
+    current_liabilities: float = 0.0
+    current_assets: float = 0.0
+    fixed_assets: float = 0.0
+    long_term_liabilities: float = 0.0
+    total_revenue: float = 0.0
+    total_costs: float = 0.0
+    net_income: float = 0.0
+    variable_costs_total: float = 0.0
+    fixed_costs_total: float = 0.0
+    contribution_margin_total: float = 0.0
+    contribution_margin_per_unit: float = 0.0
+
+    # Kredite dieses Quartals aus dem Tilgungsplan (loans.LoanLedger.quarter_terms, keine Firmenattribute)
+    loan_payments: float = 0.0  # fällige Quartalsraten (Tilgung + Zinsen)
+    loan_interest: float = 0.0  # fällige Kreditzinsen
+    loan_debt: float = 0.0  # Restschuld aller Kredite nach dem Quartal
+
+
+@dataclass(frozen=True)
+class QuarterOutcome:
+    """Ergebnis des Kernels: Folgezustand + Kostenaufschlüsselung + Absatzdaten"""
+    state: QuarterState
+    cost_breakdown: Dict = field(default_factory=dict)
+    effective_price: float = 0.0
+    quality_premium: float = 1.0
+
+    def result(self) -> Dict:
+        """Quartalsergebnis im Format von BusinessFirm.calculate_quarterly_results"""
+        s = self.state
+        costs = self.cost_breakdown
+        return {
+            "quarter": s.current_quarter,
+            "revenue": s.revenue,
+            "profit": s.profit,
+            "ebit": s.ebit,
+            "cash": s.cash,
+            "inventory": s.inventory_level,
+            "roi": s.roi,
+            "market_share": s.market_share,
+            "costs": {
+                "variable": costs["variable"],
+                "inventory": costs["inventory"],
+                "depreciation": costs["depreciation"],
+                "overhead": costs["overhead"],
+                "marketing": s.marketing_budget,
+                "rd": s.rd_budget,
+                "interest": costs["interest"],
+                "total": costs["total"]
+            },
+            "sales": {
+                "units_sold": s.units_sold,
+                "effective_price": self.effective_price,
+                "quality_premium": self.quality_premium
+            }
+        }
+
+
+class ScalarOps:
+    """Rechenoperationen von quarter_formulas für eine Firma (float) - numpy-Gegenstück: batch.ArrayOps"""
+    minimum = staticmethod(min)
+    maximum = staticmethod(max)
+    log = staticmethod(math.log)
+
+    @staticmethod
+    def where(condition, if_true, if_false):
+        return if_true if condition else if_false
+
+    @staticmethod
+    def ratio(numerator, denominator):
+        """Kennzahl mit kurzfristigen Verbindlichkeiten im Nenner (keine → unendlich)"""
+        return numerator / denominator if denominator > 0 else float('inf')
+
+
+def quarter_formulas(v: Mapping, personnel_costs, ops=ScalarOps) -> Dict:
+    """
+    Umsatz-, Kosten-, Gewinn- und Liquiditätsformeln des Quartalsabschlusses
+
+    Elementweise: v liefert je Feldname (wie QuarterState) einen Wert - float für
+    run_quarter, numpy-Arrays für batch.quarterly_results_batch (ops=batch.ArrayOps).
+    Beide Wege rechnen damit dieselben Formeln in derselben Reihenfolge.
+    """
+    # 1. REVENUE CALCULATION
+    # Basis-Nachfrage berechnen (Price-Elasticity: +10% Preis → -15% Absatz)
+    base_demand = v["production_capacity"]
+    price_factor = (100.0 / v["product_price"]) ** 1.5  # Elastizität
+
+    # Marketing-Effekt (logarithmische Sättigung ab 50M€)
+    marketing_factor = 1.0 + ops.minimum(0.5, ops.log(1 + v["marketing_budget"] / 1_000_000) * 0.05)
+
+    # Qualitätsprämie (Level 5 → bis +12.5% Preisaufschlag)
+    quality_premium = 1.0 + (v["quality_level"] / 10.0) * 0.125
+
+    effective_demand = base_demand * price_factor * marketing_factor
+    actual_sales = ops.minimum(effective_demand, v["inventory_level"] + v["production_capacity"])
+
+    # Stockout-Risiko bei niedrigem Safety Stock (sonst Faktor 1.0 - Absatz unverändert)
+    stockout_risk = ops.where(v["safety_stock_percentage"] < 0.1,
+                              0.15 * (0.1 - v["safety_stock_percentage"]) / 0.1, 0.0)
+    actual_sales = actual_sales * (1.0 - stockout_risk)
+
+    effective_price = v["product_price"] * quality_premium
+    revenue = actual_sales * effective_price
+
+    # 2. COST CALCULATION
+    # Variable Kosten: Material + Produktion (MIT EFFIZIENZFAKTOREN + MASCHINENKLASSE!)
+    base_material_cost_per_unit = 30.0  # €30 Material pro Einheit (Basis)
+    base_production_cost_per_unit = 20.0  # €20 Produktion pro Einheit (Basis)
+
+    material_cost_per_unit = base_material_cost_per_unit * v["material_cost_reduction"]
+    production_cost_per_unit = base_production_cost_per_unit * v["variable_cost_efficiency"] * (2.0 - v["machines_efficiency_factor"])  # Bessere Maschinen = niedrigere Produktionskosten
+
+    # ENERGIEKOSTEN (abhängig von Maschinenklasse)
+    energy_cost_per_unit = 5.0 * v["machine_energy_cost_factor"]  # Basic: 6€, Pro: 5€, Premium: 3.5€
+    energy_costs = v["production_capacity"] * energy_cost_per_unit
+
+    variable_costs = v["production_capacity"] * (material_cost_per_unit + production_cost_per_unit) + energy_costs
+
+    # Lagerkosten: 2% des Lagerwerts pro Quartal
+    avg_inventory_value = (v["inventory_level"] * material_cost_per_unit)
+    inventory_costs = avg_inventory_value * 0.02
+
+    # Fixkosten: Abschreibungen
+    depreciation_buildings = v["buildings_value"] * v["buildings_depreciation_rate"]
+    depreciation_machines = v["machines_value"] * v["machines_depreciation_rate"]
+    depreciation_equipment = v["equipment_value"] * v["equipment_depreciation_rate"]
+    total_depreciation = depreciation_buildings + depreciation_machines + depreciation_equipment
+
+    # Gemeinkosten (Verwaltung, Vertrieb) - MIT EFFIZIENZFAKTOR
+    base_overhead_costs = 50_000.0  # 50k€ pro Quartal (REDUZIERT: Game Balance Fix)
+    overhead_costs = base_overhead_costs * v["overhead_efficiency"]  # Reduzierbar durch Investitionen
+
+    # KREDITZINSEN: Altschulden + fällige Zinsen laut Tilgungsplan
+    interest_costs = v["debt"] * 0.025  # Alte Schulden: 10% p.a. = 2.5% pro Quartal
+    interest_costs += v["loan_interest"]
+    loan_payments = v["loan_payments"]
+
+    # Effizienz-Investitionen (einmalige Kosten dieses Quartals)
+    efficiency_investments = (
+        v["process_optimization_investment"] +
+        v["supplier_negotiation_investment"] +
+        v["overhead_reduction_investment"]
+    )
+
+    # Total Costs (ERWEITERT mit Personalkosten, Kreditzahlungen, Innovation)
+    total_costs = (
+        variable_costs +
+        inventory_costs +
+        total_depreciation +
+        overhead_costs +
+        personnel_costs +  # NEUE KOSTEN: Personal
+        v["marketing_budget"] +
+        v["rd_budget"] +
+        interest_costs +
+        loan_payments +  # NEUE KOSTEN: Kredittilgung
+        efficiency_investments +  # Einmalige Investitionen
+        v["innovation_investment"]  # NEUE KOSTEN: Produktinnovation
+    )
+
+    # 3. PROFIT CALCULATION
+    gross_profit = revenue - variable_costs
+    ebit = gross_profit - overhead_costs - personnel_costs - total_depreciation - v["marketing_budget"] - v["rd_budget"]
+    ebt = ebit - interest_costs  # Earnings Before Tax
+
+    # Steuern (33.33% = 1/3)
+    taxes = ops.maximum(0, ebt * 0.3333)
+    net_profit = ebt - taxes
+
+    # 3.8 LIQUIDITÄTSKENNZAHLEN (mit Cash vor Gewinnverbuchung)
+    # Kurzfristige Verbindlichkeiten = Quartalszahlungen + kleine Kredite
+    current_liabilities = loan_payments + overhead_costs + personnel_costs
+    # Forderungen vereinfacht: 50% des Lagerwerts
+    receivables = v["inventory_level"] * material_cost_per_unit * 0.5
+    inventory_value = v["inventory_level"] * material_cost_per_unit
+
+    return {
+        "actual_sales": actual_sales,
+        "quality_premium": quality_premium,
+        "effective_price": effective_price,
+        "revenue": revenue,
+        "material_cost_per_unit": material_cost_per_unit,
+        "energy_costs": energy_costs,
+        "variable_costs": variable_costs,
+        "inventory_costs": inventory_costs,
+        "depreciation_buildings": depreciation_buildings,
+        "depreciation_machines": depreciation_machines,
+        "depreciation_equipment": depreciation_equipment,
+        "total_depreciation": total_depreciation,
+        "overhead_costs": overhead_costs,
+        "interest_costs": interest_costs,
+        "loan_payments": loan_payments,
+        "efficiency_investments": efficiency_investments,
+        "total_costs": total_costs,
+        "gross_profit": gross_profit,
+        "ebit": ebit,
+        "net_profit": net_profit,
+        "current_liabilities": current_liabilities,
+        # Liquidität 1. Grades (Barliquidität): Cash / kurzfr. Verbindlichkeiten
+        "liquidity_1": ops.ratio(v["cash"], current_liabilities),
+        # Liquidität 2. Grades: (Cash + Forderungen) / kurzfr. Verbindlichkeiten
+        "liquidity_2": ops.ratio(v["cash"] + receivables, current_liabilities),
+        # Liquidität 3. Grades: (Cash + Forderungen + Vorräte) / kurzfr. Verbindlichkeiten
+        "liquidity_3": ops.ratio(v["cash"] + receivables + inventory_value, current_liabilities),
+    }
+
+
+def run_quarter(s: QuarterState) -> QuarterOutcome:
+    """Berechnet Quartalsergebnisse basierend auf Entscheidungen (rein funktional)"""
+
+    # PERSONALKOSTEN (Variable, abhängig von Qualifikation)
+    personnel_costs = (
+        s.personnel_ungelernt * s.cost_ungelernt +
+        s.personnel_angelernt * s.cost_angelernt +
+        s.personnel_facharbeiter * s.cost_facharbeiter
+    )
+
+    # 1.-3. UMSATZ, KOSTEN, GEWINN, LIQUIDITÄT (gemeinsame Formeln mit batch.py)
+    f = quarter_formulas(vars(s), personnel_costs)
+    actual_sales = f["actual_sales"]
+    quality_premium = f["quality_premium"]
+    effective_price = f["effective_price"]
+    revenue = f["revenue"]
+    material_cost_per_unit = f["material_cost_per_unit"]
+    energy_costs = f["energy_costs"]
+    variable_costs = f["variable_costs"]
+    inventory_costs = f["inventory_costs"]
+    depreciation_buildings = f["depreciation_buildings"]
+    depreciation_machines = f["depreciation_machines"]
+    depreciation_equipment = f["depreciation_equipment"]
+    total_depreciation = f["total_depreciation"]
+    overhead_costs = f["overhead_costs"]
+    interest_costs = f["interest_costs"]
+    loan_payments = f["loan_payments"]
+    efficiency_investments = f["efficiency_investments"]
+    total_costs = f["total_costs"]
+    gross_profit = f["gross_profit"]
+    ebit = f["ebit"]
+    net_profit = f["net_profit"]
+
+    # Store cost breakdown for transparency (UMFASSEND ERWEITERT)
+    cost_breakdown = {
+        "variable": variable_costs,
+        "energy": energy_costs,
+        "inventory": inventory_costs,
+        "depreciation": total_depreciation,
+        "depreciation_buildings": depreciation_buildings,
+        "depreciation_machines": depreciation_machines,
+        "depreciation_equipment": depreciation_equipment,
+        "overhead": overhead_costs,
+        "personnel": personnel_costs,
+        "personnel_ungelernt": s.personnel_ungelernt * s.cost_ungelernt,
+        "personnel_angelernt": s.personnel_angelernt * s.cost_angelernt,
+        "personnel_facharbeiter": s.personnel_facharbeiter * s.cost_facharbeiter,
+        "marketing": s.marketing_budget,
+        "rd": s.rd_budget,
+        "interest": interest_costs,
+        "loan_payments": loan_payments,
+        "innovation": s.innovation_investment,
+        "efficiency_investments": efficiency_investments,
+        "total": total_costs
+    }
+
+    # DECKUNGSBEITRAG (Contribution Margin Calculation)
+    variable_costs_total = variable_costs + energy_costs + personnel_costs
+    fixed_costs_total = total_depreciation + overhead_costs + s.marketing_budget + s.rd_budget + interest_costs
+    contribution_margin_total = revenue - variable_costs_total
+    contribution_margin_per_unit = contribution_margin_total / actual_sales if actual_sales > 0 else 0.0
+
+    # 3.5 CALCULATE ALL BWL KENNZAHLEN (Business Metrics)
+
+    # EBITDA (EBIT + Depreciation)
+    ebitda = ebit + total_depreciation
+
+    # Profitability Ratios (Rentabilitätskennzahlen)
+    if revenue > 0:
+        gross_margin = (gross_profit / revenue) * 100  # in %
+        operating_margin = (ebit / revenue) * 100  # in %
+        net_margin = (net_profit / revenue) * 100  # in %
+        contribution_margin = ((revenue - variable_costs) / revenue) * 100  # in %
+    else:
+        gross_margin = 0.0
+        operating_margin = 0.0
+        net_margin = 0.0
+        contribution_margin = 0.0
+
+    # Efficiency Ratios (Effizienzkennzahlen)
+    total_assets = s.cash + s.buildings_value + s.machines_value + s.equipment_value
+    if total_assets > 0:
+        asset_turnover = revenue / total_assets  # Kapitalumschlag
+        roa = (net_profit / total_assets) * 100  # Return on Assets in %
+    else:
+        asset_turnover = 0.0
+        roa = 0.0
+
+    # Inventory Turnover (Lagerumschlag)
+    avg_inventory = (s.inventory_level + (s.inventory_level + s.production_capacity - actual_sales)) / 2
+    if avg_inventory > 0:
+        cogs = variable_costs  # Cost of Goods Sold
+        inventory_turnover = cogs / (avg_inventory * material_cost_per_unit)
+    else:
+        inventory_turnover = 0.0
+
+    # Capacity Utilization (Kapazitätsauslastung)
+    max_capacity = 120_000.0  # Maximum production capacity
+    capacity_utilization = (s.production_capacity / max_capacity) * 100  # in %
+
+    # Leverage Ratios (Verschuldungskennzahlen)
+    if s.equity > 0:
+        debt_to_equity = s.debt / s.equity
+        roe = (net_profit / s.equity) * 100  # Return on Equity in %
+    else:
+        debt_to_equity = 0.0
+        roe = 0.0
+
+    if total_assets > 0:
+        equity_ratio = (s.equity / total_assets) * 100  # Eigenkapitalquote in %
+        debt_ratio = (s.debt / total_assets) * 100  # Fremdkapitalquote in %
+    else:
+        equity_ratio = 0.0
+        debt_ratio = 0.0
+
+    if interest_costs > 0:
+        interest_coverage = ebit / interest_costs  # Zinsdeckungsgrad
+    else:
+        interest_coverage = float('inf') if ebit > 0 else 0.0
+
+    # Growth Metrics (Wachstumskennzahlen) - compare to previous quarter
+    if s.prev_revenue > 0:
+        revenue_growth = ((revenue - s.prev_revenue) / s.prev_revenue) * 100
+    else:
+        revenue_growth = 0.0
+
+    if s.prev_profit != 0:
+        profit_growth = ((net_profit - s.prev_profit) / abs(s.prev_profit)) * 100
+    else:
+        profit_growth = 0.0 if net_profit == 0 else 100.0
+
+    if s.prev_market_share > 0:
+        market_share_growth = ((s.market_share - s.prev_market_share) / s.prev_market_share) * 100
+    else:
+        market_share_growth = 0.0
+
+    # 3.5 EFFICIENCY IMPROVEMENTS basierend auf Investitionen
+    variable_cost_efficiency = s.variable_cost_efficiency
+    process_optimization_investment = s.process_optimization_investment
+    material_cost_reduction = s.material_cost_reduction
+    supplier_negotiation_investment = s.supplier_negotiation_investment
+    overhead_efficiency = s.overhead_efficiency
+    overhead_reduction_investment = s.overhead_reduction_investment
+
+    # Prozessoptimierung: €2M → -5% variable Kosten (max -20%)
+    if process_optimization_investment >= 2_000_000:
+        variable_cost_efficiency = max(0.8, variable_cost_efficiency - 0.05)
+        process_optimization_investment = 0  # Investment verbraucht
+
+    # Lieferantenverhandlungen: €1.5M → -5% Materialkosten (max -30%)
+    if supplier_negotiation_investment >= 1_500_000:
+        material_cost_reduction = max(0.7, material_cost_reduction - 0.05)
+        supplier_negotiation_investment = 0  # Investment verbraucht
+
+    # Verwaltungsoptimierung: €1M → -10% Overhead (max -50%)
+    if overhead_reduction_investment >= 1_000_000:
+        overhead_efficiency = max(0.5, overhead_efficiency - 0.10)
+        overhead_reduction_investment = 0  # Investment verbraucht
+
+    # 3.6 PRODUKTLEBENSZYKLUS (Product Lifecycle Management)
+    product_age_quarters = s.product_age_quarters + 1
+    product_innovation_level = s.product_innovation_level
+    innovation_investment = s.innovation_investment
+
+    # Produktinnovation: €5M → neues Produkt (Generation++)
+    if innovation_investment >= 5_000_000:
+        product_innovation_level += 1
+        product_age_quarters = 0
+        innovation_investment = 0
+
+    # Automatische Lifecycle-Übergänge
+    # (Nachfrage-Faktoren je Phase: 70% / 130% / 100% / 60%, wirksam ab nächstem Quartal)
+    if product_age_quarters <= 4:
+        product_lifecycle_stage = "introduction"
+    elif product_age_quarters <= 12:
+        product_lifecycle_stage = "growth"
+    elif product_age_quarters <= 24:
+        product_lifecycle_stage = "maturity"
+    else:
+        product_lifecycle_stage = "decline"
+
+    # 3.7 KREDITABWICKLUNG (Loan Processing): Tilgungsplan im Kreditbuch (loans.py)
+    debt = s.loan_debt
+
+    # 3.8 LIQUIDITÄTSKENNZAHLEN (Liquidity Ratios nach BWL-Vorlesung, siehe quarter_formulas)
+    current_liabilities = f["current_liabilities"]
+    liquidity_1 = f["liquidity_1"]
+    liquidity_2 = f["liquidity_2"]
+    liquidity_3 = f["liquidity_3"]
+
+    # 3.9 BILANZ-KOMPONENTEN (Balance Sheet Components)
+    current_assets = s.cash + (s.inventory_level * material_cost_per_unit)
+
+    # 4. UPDATE CASH & INVENTORY
+    cash = s.cash + net_profit
+    inventory_level = max(0, s.inventory_level + s.production_capacity - actual_sales)
+
+    # 5. UPDATE ASSETS (Abschreibung)
+    buildings_value = s.buildings_value - depreciation_buildings
+    machines_value = s.machines_value - depreciation_machines
+    equipment_value = s.equipment_value - depreciation_equipment
+
+    # 6. CALCULATE ROI
+    roi = s.roi
+    total_assets = cash + buildings_value + machines_value + equipment_value
+    if total_assets > 0:
+        roi = (ebit / total_assets) * 100  # ROI in %
+
+    # 7. UPDATE QUALITY (F&E Investment)
+    quality_level = s.quality_level
+    rd_budget = s.rd_budget
+    if rd_budget > 0:
+        # Level 6 kostet €12M
+        cost_per_level = 12_000_000.0
+        if rd_budget >= cost_per_level and quality_level < 10:
+            quality_level += 1
+            rd_budget -= cost_per_level
+
+    next_state = replace(
+        s,
+        revenue=revenue,
+        profit=net_profit,
+        ebit=ebit,
+        units_sold=actual_sales,
+        variable_costs_total=variable_costs_total,
+        fixed_costs_total=fixed_costs_total,
+        contribution_margin_total=contribution_margin_total,
+        contribution_margin_per_unit=contribution_margin_per_unit,
+        ebitda=ebitda,
+        gross_margin=gross_margin,
+        operating_margin=operating_margin,
+        net_margin=net_margin,
+        contribution_margin=contribution_margin,
+        asset_turnover=asset_turnover,
+        roa=roa,
+        inventory_turnover=inventory_turnover,
+        capacity_utilization=capacity_utilization,
+        debt_to_equity=debt_to_equity,
+        roe=roe,
+        equity_ratio=equity_ratio,
+        debt_ratio=debt_ratio,
+        interest_coverage=interest_coverage,
+        revenue_growth=revenue_growth,
+        profit_growth=profit_growth,
+        market_share_growth=market_share_growth,
+        # Update previous quarter values for next calculation
+        prev_revenue=revenue,
+        prev_profit=net_profit,
+        prev_market_share=s.market_share,
+        variable_cost_efficiency=variable_cost_efficiency,
+        process_optimization_investment=process_optimization_investment,
+        material_cost_reduction=material_cost_reduction,
+        supplier_negotiation_investment=supplier_negotiation_investment,
+        overhead_efficiency=overhead_efficiency,
+        overhead_reduction_investment=overhead_reduction_investment,
+        product_age_quarters=product_age_quarters,
+        product_innovation_level=product_innovation_level,
+        product_lifecycle_stage=product_lifecycle_stage,
+        innovation_investment=innovation_investment,
+        debt=debt,
+        current_liabilities=current_liabilities,
+        liquidity_1=liquidity_1,
+        liquidity_2=liquidity_2,
+        liquidity_3=liquidity_3,
+        current_assets=current_assets,
+        fixed_assets=s.buildings_value + s.machines_value + s.equipment_value,
+        long_term_liabilities=debt,
+        total_revenue=revenue,
+        total_costs=total_costs,
+        net_income=net_profit,
+        retained_earnings=s.retained_earnings + net_profit,  # Kumuliere Gewinne/Verluste für Bilanz
+        cash=cash,
+        inventory_level=inventory_level,
+        buildings_value=buildings_value,
+        machines_value=machines_value,
+        equipment_value=equipment_value,
+        roi=roi,
+        quality_level=quality_level,
+        rd_budget=rd_budget,
+        current_quarter=s.current_quarter + 1
+    )
+
+    return QuarterOutcome(
+        state=next_state,
+        cost_breakdown=cost_breakdown,
+        effective_price=effective_price,
+        quality_premium=quality_premium
+    )
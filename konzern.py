@@ -0,0 +1,195 @@
+"""
+BWL Planspiel - Konzernabschluss (Vollkonsolidierung, vereinfacht nach HGB §§ 290 ff.)
+Tochtergesellschaften sind Firmen, an denen eine Firma direkt mehr als 50% hält;
+Enkel kommen über die Töchter hinzu. Der Abschluss wird bottom-up über den
+Beteiligungsgraph aufgebaut: jede Firma liefert einen Baustein (eigene Bilanz +
+GuV zuzüglich der Bausteine ihrer Töchter, Anteile anderer Gesellschafter
+ausgewiesen). Bausteine werden je Quartal und Stand des Beteiligungsgraphs
+vorgehalten und gelten, solange sich weder die Firma noch ein Baustein ihrer
+Töchter geändert hat - eine Mutter setzt ihren Abschluss aus den Bausteinen
+der Töchter zusammen, statt deren Statements erneut zu addieren.
+"""
+from typing import Dict, List, NamedTuple, Tuple
+
+from ownership import CONTROL_THRESHOLD
+
+
+class Contribution(NamedTuple):
+    """Baustein einer Firma samt ihrer Töchter (Werte zu 100%, Minderheiten separat)"""
+    balance_sheet: Dict[str, float]  # flach: "aktiva.umlaufvermoegen.kasse_bank" → Betrag
+    income_statement: Dict[str, float]
+    minority_equity: float  # Anteile anderer Gesellschafter am Eigenkapital
+    minority_income: float  # Anteile anderer Gesellschafter am Jahresüberschuss
+    members: Tuple[Tuple[int, int, float, float], ...]  # (firm_id, Mutter-ID, direkter %, durchgerechneter %)
+    version: int  # höchster Versionsstand der einbezogenen Firmen (Änderungsuhr)
+
+
+def _flatten(values: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in values.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def _nest(flat: Dict[str, float]) -> Dict:
+    nested: Dict = {}
+    for path, value in flat.items():
+        *parents, key = path.split(".")
+        node = nested
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[key] = value
+    return nested
+
+
+def _add(total: Dict[str, float], values: Dict[str, float]) -> Dict[str, float]:
+    result = dict(total)  # Reihenfolge der Positionen wie in der Einzelbilanz
+    for key, value in values.items():
+        result[key] = result.get(key, 0.0) + value
+    return result
+
+
+class ConsolidationEngine:
+    """Konzernabschlüsse einer GameSession, Bausteine je (Quartal, Beteiligungsgraph-Stand)"""
+
+    def __init__(self, game):
+        self.game = game
+        self._cache: Dict[int, Tuple[tuple, int, tuple, Contribution]] = {}  # (Stand, Version, Töchter-Bausteine, Baustein)
+
+    def clear(self):
+        self._cache.clear()
+
+    def _stamp(self) -> tuple:
+        game = self.game
+        return game.epoch, game.current_quarter, game.ownership.version
+
+    def subsidiaries(self, firm_id: int) -> List[Tuple[int, float]]:
+        """Direkte Töchter: (firm_id, direkter Anteil %) mit Mehrheitsbeteiligung, O(Grad)"""
+        firms = self.game.firms
+        return [(target_id, percentage)
+                for target_id, percentage in self.game.ownership.direct_holdings(firm_id).items()
+                if percentage > CONTROL_THRESHOLD and target_id in firms and not firms[target_id].is_bankrupt]
+
+    def controlled(self, firm_id: int) -> set:
+        """Alle über Mehrheitsketten beherrschten Firmen (Töchter, Enkel, ...), O(Konsolidierungskreis)"""
+        found = set()
+        pending = [firm_id]
+        while pending:
+            for target_id, _ in self.subsidiaries(pending.pop()):
+                if target_id != firm_id and target_id not in found:
+                    found.add(target_id)
+                    pending.append(target_id)
+        return found
+
+    def controlling(self, firm_id: int) -> List[int]:
+        """Beherrschende Firmen entlang der Mehrheitskette nach oben (Mutter, Großmutter, ...)"""
+        firms = self.game.firms
+        chain = []
+        current = firms.get(firm_id)
+        while current is not None and not current.is_bankrupt:
+            parent_id = next((owner_id for owner_id, percentage in self.game.ownership.direct_holders(current.id).items()
+                              if percentage > CONTROL_THRESHOLD and owner_id in firms), None)
+            if parent_id is None or parent_id == firm_id or parent_id in chain:
+                break
+            chain.append(parent_id)
+            current = firms[parent_id]
+        return chain
+
+    def contribution(self, firm) -> Contribution:
+        return self._build(firm, set(), self._stamp())[0]
+
+    def scope_version(self, firm) -> int:
+        """Versionsstand des Konzernabschlusses von firm (ETag): ändert sich mit jeder einbezogenen Firma"""
+        return self.contribution(firm).version
+
+    def _build(self, firm, path: set, stamp: tuple) -> Tuple[Contribution, bool]:
+        """
+        (Baustein, abgeschnitten) - abgeschnitten: Ringbeteiligung übersprungen, Baustein hängt vom Pfad ab
+
+        Die Töchter werden immer durchlaufen (O(Konsolidierungskreis)); neu addiert wird nur,
+        wo sich die Firma selbst oder ein Töchter-Baustein geändert hat.
+        """
+        path.add(firm.id)
+        children = []
+        truncated = False
+        for target_id, percentage in self.subsidiaries(firm.id):
+            if target_id in path:  # Ringbeteiligung: Firma ist schon im Konsolidierungskreis
+                truncated = True
+                continue
+            child, child_truncated = self._build(self.game.firms[target_id], path, stamp)
+            truncated |= child_truncated
+            children.append((target_id, percentage, child))
+        path.discard(firm.id)
+
+        cached = self._cache.get(firm.id)
+        if (cached is not None and cached[0] == stamp and cached[1] == firm.version and len(cached[2]) == len(children)
+                and all(old[0] == new[0] and old[1] == new[1] and old[2] is new[2]
+                        for old, new in zip(cached[2], children))):
+            return cached[3], truncated
+
+        balance_sheet = _flatten(firm.generate_balance_sheet())
+        income_statement = _flatten(firm.generate_income_statement())
+        minority_equity = minority_income = 0.0
+        members = []
+        version = firm.version
+        for target_id, percentage, child in children:
+            version = max(version, child.version)
+            share = min(percentage, 100.0) / 100.0
+            balance_sheet = _add(balance_sheet, child.balance_sheet)
+            income_statement = _add(income_statement, child.income_statement)
+            # Fremdanteile: Minderheiten der Tochter + (1 - Anteil) am konzernzurechenbaren Ergebnis der Tochter
+            child_equity = child.balance_sheet.get("passiva.eigenkapital.summe", 0.0)
+            child_income = child.income_statement.get("jahresueberschuss", 0.0)
+            minority_equity += child.minority_equity + (1 - share) * (child_equity - child.minority_equity)
+            minority_income += child.minority_income + (1 - share) * (child_income - child.minority_income)
+            members.append((target_id, firm.id, percentage, percentage))
+            members.extend((member_id, parent_id, direct, integrated * share)
+                           for member_id, parent_id, direct, integrated in child.members)
+
+        contribution = Contribution(balance_sheet, income_statement, minority_equity, minority_income,
+                                    tuple(members), version)
+        if not truncated:
+            self._cache[firm.id] = (stamp, firm.version, tuple(children), contribution)
+        return contribution, truncated
+
+    # ============ ABSCHLÜSSE ============
+
+    def _scope(self, firm, contribution: Contribution) -> Dict:
+        firms = self.game.firms
+        return {
+            "mutterunternehmen": {"firm_id": firm.id, "firm_name": firm.name},
+            "tochterunternehmen": [
+                {
+                    "firm_id": member_id,
+                    "firm_name": firms[member_id].name if member_id in firms else None,
+                    "mutter_id": parent_id,
+                    "beteiligung": round(direct, 2),
+                    "konzernanteil": round(integrated, 2)
+                }
+                for member_id, parent_id, direct, integrated in contribution.members
+            ],
+            "konsolidierungskreis": 1 + len(contribution.members),
+            "quartal": self.game.current_quarter
+        }
+
+    def balance_sheet(self, firm) -> Dict:
+        """Konzernbilanz: Summenbilanz der Mutter und aller Töchter, Eigenkapital mit Fremdanteilen"""
+        contribution = self.contribution(firm)
+        statement = _nest(contribution.balance_sheet)
+        equity = statement["passiva"]["eigenkapital"]
+        equity["anteile_anderer_gesellschafter"] = contribution.minority_equity
+        equity["konzernanteil"] = equity["summe"] - contribution.minority_equity
+        statement["konzern"] = self._scope(firm, contribution)
+        return statement
+
+    def income_statement(self, firm) -> Dict:
+        """Konzern-GuV: Summe der Einzel-GuVs, Jahresüberschuss mit Fremdanteilen"""
+        contribution = self.contribution(firm)
+        statement = _nest(contribution.income_statement)
+        statement["anteile_anderer_gesellschafter"] = contribution.minority_income
+        statement["konzernjahresueberschuss"] = statement["jahresueberschuss"] - contribution.minority_income
+        statement["konzern"] = self._scope(firm, contribution)
+        return statement
@@ -0,0 +1,217 @@
+"""
+BWL Planspiel - Kreditbuch
+Alle Kredite einer Spielsession als Spalten (Firma, Betrag, Zinssatz, Laufzeit,
+Stand) plus vollständigem Tilgungsplan je Kredit. Der Plan wird bei der
+Kreditaufnahme einmal berechnet - mit denselben Rechenschritten wie bisher
+die Kreditabwicklung im Quartals-Kernel, also auf das Bit gleich:
+
+    Zinsen  = Restbetrag × Zinssatz / 4
+    Tilgung = Restbetrag / (Restlaufzeit + 1), Quartalsrate = Tilgung + Zinsen
+    fällig wird die Rate des Vorquartals; mit Restlaufzeit 0 entfällt der Kredit
+
+Der Quartalsabschluss liest Raten, Zinsen und Restschuld aller Kredite in einem
+numpy-Durchlauf aus dem Plan und rückt danach alle Kredite um ein Quartal vor.
+Änderungen laufen unter lock - in einer Session deren Lock, damit keine
+Kreditaufnahme zwischen Auslesen und Vorrücken im Quartalsabschluss landet.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Anfangskapazität (Kredite) bzw. Planlänge (Quartale); beides verdoppelt sich bei Bedarf
+INITIAL_CAPACITY = 64
+INITIAL_TERM = 12
+
+
+def amortization_schedule(amount: float, interest_rate: float, quarters: int) -> Tuple[List[float], List[float], List[float]]:
+    """
+    Tilgungsplan eines Kredits: (Restbetrag, Zinsen, Quartalsrate) je Quartal
+
+    Restbetrag[k] = Stand nach k Quartalen (Restbetrag[0] = Kreditbetrag),
+    Zinsen[k] / Quartalsrate[k] = im (k+1)-ten Quartal berechnet, fällig im Quartal danach.
+    """
+    balances, interest, payments = [amount], [], []
+    quarterly_interest_rate = interest_rate / 4.0  # p.a. → pro Quartal
+    for quarters_remaining in range(quarters - 1, 0, -1):
+        balance = balances[-1]
+        interest_payment = balance * quarterly_interest_rate
+        principal_payment = balance / (quarters_remaining + 1)
+        balances.append(balance - principal_payment)
+        interest.append(interest_payment)
+        payments.append(principal_payment + interest_payment)
+    return balances, interest, payments
+
+
+class LoanLedger:
+    """Kredite aller Firmen einer Session, Zeile = Kredit (freie Zeilen: firm = -1)"""
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY, term: int = INITIAL_TERM, lock=None):
+        self.lock = lock if lock is not None else threading.RLock()  # GameSession: Session-Lock
+        self.firm = np.full(capacity, -1, dtype=np.int64)
+        self.original_amount = np.zeros(capacity)
+        self.interest_rate = np.zeros(capacity)
+        self.quarters = np.zeros(capacity, dtype=np.int64)  # Laufzeit bei Aufnahme
+        self.step = np.zeros(capacity, dtype=np.int64)  # abgewickelte Quartale
+        self.start_quarter = np.zeros(capacity, dtype=np.int64)
+        self.balance = np.zeros((capacity, term))  # Restbetrag nach k Quartalen
+        self.interest = np.zeros((capacity, term))  # Zinsen aus Quartal k+1
+        self.payment = np.zeros((capacity, term))  # Quartalsrate aus Quartal k+1
+        self.rows: Dict[int, List[int]] = {}  # firm_id → Zeilen (Reihenfolge der Aufnahme)
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+
+    def clear(self):
+        self.__init__(len(self.firm), self.balance.shape[1], self.lock)
+
+    def __getstate__(self):
+        # Snapshots (state_service.py): Lock bleibt im Prozess, GameSession setzt ihren wieder ein
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+
+    # ============ ÄNDERUNGEN ============
+
+    def add(self, firm_id: int, amount: float, interest_rate: float, quarters: int, start_quarter: int = 0) -> int:
+        """Neuer Kredit inkl. Tilgungsplan → Zeile"""
+        with self.lock:
+            return self._add(firm_id, amount, interest_rate, quarters, start_quarter)
+
+    def _add(self, firm_id: int, amount: float, interest_rate: float, quarters: int, start_quarter: int) -> int:
+        if not self._free:
+            self._grow_rows()
+        if quarters > self.balance.shape[1]:
+            self._grow_term(quarters)
+        row = self._free.pop()
+        balances, interest, payments = amortization_schedule(amount, interest_rate, quarters)
+        self.firm[row] = firm_id
+        self.original_amount[row] = amount
+        self.interest_rate[row] = interest_rate
+        self.quarters[row] = quarters
+        self.step[row] = 0
+        self.start_quarter[row] = start_quarter
+        self.balance[row] = 0.0
+        self.interest[row] = 0.0
+        self.payment[row] = 0.0
+        self.balance[row, :len(balances)] = balances
+        self.interest[row, :len(interest)] = interest
+        self.payment[row, :len(payments)] = payments
+        self.rows.setdefault(firm_id, []).append(row)
+        return row
+
+    def remove_firm(self, firm_id: int):
+        with self.lock:
+            for row in self.rows.pop(firm_id, ()):
+                self._release(row)
+
+    def _release(self, row: int):
+        self.firm[row] = -1
+        self._free.append(row)
+
+    def _grow_rows(self):
+        old = len(self.firm)
+        self.firm = np.concatenate([self.firm, np.full(old, -1, dtype=np.int64)])
+        for name in ("original_amount", "interest_rate", "quarters", "step", "start_quarter",
+                     "balance", "interest", "payment"):
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column, np.zeros_like(column)]))
+        self._free.extend(range(old * 2 - 1, old - 1, -1))
+
+    def _grow_term(self, quarters: int):
+        term = self.balance.shape[1]
+        while term < quarters:
+            term *= 2
+        for name in ("balance", "interest", "payment"):
+            column = getattr(self, name)
+            wide = np.zeros((len(column), term))
+            wide[:, :column.shape[1]] = column
+            setattr(self, name, wide)
+
+    # ============ QUARTALSABSCHLUSS ============
+
+    def _active(self, firm_ids: Optional[Iterable[int]] = None) -> np.ndarray:
+        if firm_ids is None:
+            return np.flatnonzero(self.firm >= 0)
+        return np.array(sorted(row for firm_id in firm_ids for row in self.rows.get(firm_id, ())), dtype=np.int64)
+
+    def _terms(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Je Kredit: fällige Rate, fällige Zinsen, Restschuld nach diesem Quartal"""
+        step = self.step[rows]
+        due = step > 0
+        previous = np.maximum(step - 1, 0)
+        payments = np.where(due, self.payment[rows, previous], 0.0)
+        interest = np.where(due, self.interest[rows, previous], 0.0)
+        following = step + 1
+        running = following < self.quarters[rows]
+        debt = np.where(running, self.balance[rows, np.minimum(following, self.balance.shape[1] - 1)], 0.0)
+        return payments, interest, debt
+
+    def quarter_terms(self, firm_ids: Optional[Iterable[int]] = None) -> Dict[int, Tuple[float, float, float]]:
+        """
+        {firm_id: (fällige Raten, fällige Zinsen, Restschuld nach dem Quartal)} für alle
+        Firmen mit Krediten - ein Durchlauf über alle Kredite (bzw. die der firm_ids)
+        """
+        rows = self._active(firm_ids)
+        if not len(rows):
+            return {}
+        payments, interest, debt = self._terms(rows)
+        firms, index = np.unique(self.firm[rows], return_inverse=True)
+        totals = [np.bincount(index, weights=values, minlength=len(firms)) for values in (payments, interest, debt)]
+        return {int(firm_id): (float(p), float(i), float(d)) for firm_id, p, i, d in zip(firms, *totals)}
+
+    def advance(self, firm_ids: Optional[Iterable[int]] = None):
+        """Alle (bzw. die Kredite der firm_ids) um ein Quartal vorrücken; abbezahlte Kredite entfallen"""
+        with self.lock:
+            rows = self._active(firm_ids)
+            if not len(rows):
+                return
+            self.step[rows] += 1
+            for row in rows[self.step[rows] >= self.quarters[rows]].tolist():
+                firm_rows = self.rows[int(self.firm[row])]
+                firm_rows.remove(row)
+                if not firm_rows:
+                    del self.rows[int(self.firm[row])]
+                self._release(row)
+
+    # ============ ABFRAGEN ============
+
+    def has_loans(self, firm_id: int) -> bool:
+        return firm_id in self.rows
+
+    def loans(self, firm_id: int) -> List[Dict]:
+        """Laufende Kredite einer Firma im bisherigen Dict-Format (BusinessFirm.loans)"""
+        result = []
+        for row in self.rows.get(firm_id, ()):
+            step = int(self.step[row])
+            result.append({
+                "amount": float(self.balance[row, step]),
+                "original_amount": float(self.original_amount[row]),
+                "interest_rate": float(self.interest_rate[row]),
+                "quarters_remaining": int(self.quarters[row]) - step,
+                "quarterly_payment": float(self.payment[row, step - 1]) if step else 0,
+                "interest_payment": float(self.interest[row, step - 1]) if step else 0
+            })
+        return result
+
+    def schedule(self, firm_id: int) -> List[List[Dict]]:
+        """Verbleibender Tilgungsplan je Kredit: fällige Raten ab dem nächsten Quartalsabschluss"""
+        schedules = []
+        for row in self.rows.get(firm_id, ()):
+            step, quarters, start = int(self.step[row]), int(self.quarters[row]), int(self.start_quarter[row])
+            entries = []
+            for k in range(step, quarters):  # Abschluss Nr. k+1 (ab Aufnahme) verbucht die Rate aus Quartal k
+                due = k > 0
+                interest = float(self.interest[row, k - 1]) if due else 0.0
+                payment = float(self.payment[row, k - 1]) if due else 0.0
+                entries.append({
+                    "quarter": start + k + 1,
+                    "payment": round(payment, 2),
+                    "interest": round(interest, 2),
+                    "principal": round(payment - interest, 2),
+                    "remaining_amount": round(float(self.balance[row, k + 1]) if k + 1 < quarters else 0.0, 2)
+                })
+            schedules.append(entries)
+        return schedules
@@ -3,27 +3,62 @@ BWL Planspiel - FastAPI Backend
 Mit Debug-Modus und WebSocket für Live-Updates
 """
 import os
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+import time
+import uuid
+_IMPORT_STARTED = time.perf_counter()
+import importlib
+import sys
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 import uvicorn
 import asyncio
 from fastapi.middleware.wsgi import WSGIMiddleware
-from dashboard import app as dash_app
-from models import GameSession, BusinessFirm, FirmCreate, DecisionInput, JoinFirmInput
+from starlette.concurrency import run_in_threadpool
+from models import CHANGE_CLOCK, GameSession, BusinessFirm, FirmCreate, DecisionInput, JoinFirmInput
+from forecast import forecast_decision
+from sweep import sweep_decisions
+from parallel import shutdown_pool
+from delta import QuarterDeltaEncoder
+from http_codec import CompressionMiddleware, FastJSONResponse
+from market_index import MarketIndex
+from transactions import Transaction
+from state_service import STATE_ROLE, STATE_SOCKET, ForwardWritesMiddleware, StateServer, subscribe
+from views import (
+    ViewContext, CROSS_FIRM_VIEWS, build_bundle, parse_views, liquidity_view, machines_view,
+    personnel_view, product_lifecycle_view, valuation_view, ownership_view
+)
+from wire import DEFAULT_FORMAT, WireMessage, decode, parse_format
 from state import game
 
 # DEBUG Mode (from environment)
 DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"
 
+# Nur API, kein Dashboard (Dash/Plotly werden nie importiert)
+API_ONLY = os.getenv("API_ONLY", "false").lower() == "true"
+
+# Erlaubte Importzeit von main.py in Sekunden (Warnung beim Start, Prüfung per --check-import-budget)
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.0"))
+
+# Prozesse für den Quartalsabschluss (0/1 = sequentiell)
+TICK_WORKERS = int(os.getenv("TICK_WORKERS", "0"))
+
 # FastAPI App
 app = FastAPI(
     title="BWL Planspiel API",
     description="Backend API fuer das BWL Planspiel mit integriertem Dashboard",
-    version="2.0"
+    version="2.0",
+    default_response_class=FastJSONResponse
 )
 
+# Kompression (br/gzip) für API-Antworten und Dashboard
+app.add_middleware(CompressionMiddleware)
+
+# Replikat: schreibende API-Anfragen beantwortet der Engine-Prozess (state_service.py)
+if STATE_ROLE == "replica":
+    app.add_middleware(ForwardWritesMiddleware, path=STATE_SOCKET)
+
 # CORS Middleware (fuer Entwicklung)
 if DEBUG_MODE:
     app.add_middleware(
@@ -34,31 +69,163 @@ if DEBUG_MODE:
         allow_headers=["*"],
     )
 
+# WebSocket Topics: market (Marktereignisse), quarter (Quartalsabschluss), firm:{id} (Firmenereignisse)
+TOPIC_MARKET = "market"
+TOPIC_QUARTER = "quarter"
+DEFAULT_TOPICS = (TOPIC_MARKET, TOPIC_QUARTER)  # Firmen-Topics nur auf ausdrückliches Abo
+
+
+def firm_topic(firm_id: int) -> str:
+    return f"firm:{firm_id}"
+
+
+def parse_topics(topics) -> set:
+    """Prüft Topic-Namen (Liste oder kommagetrennter String)"""
+    if isinstance(topics, str):
+        topics = topics.split(",")
+    parsed = set()
+    for topic in topics or []:
+        topic = str(topic).strip()
+        if not topic:
+            continue
+        if topic in (TOPIC_MARKET, TOPIC_QUARTER):
+            parsed.add(topic)
+        elif topic.startswith("firm:") and topic[5:].isdigit():
+            parsed.add(firm_topic(int(topic[5:])))
+        else:
+            raise ValueError(f"Unbekanntes Topic '{topic}' (erlaubt: market, quarter, firm:<id>)")
+    return parsed
+
+
 # WebSocket Connection Manager
 class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        self.formats: Dict[WebSocket, tuple] = {}  # ausgehandelte (Kodierung, Schema) je Verbindung
+        self.subscriptions: Dict[WebSocket, set] = {}  # Verbindung → Topics
+        self.topic_index: Dict[str, set] = {}  # Topic → Verbindungen
+        self.delta_clients: set = set()  # Verbindungen mit Delta-kodierten Quartals-Broadcasts
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, wire_format: tuple = DEFAULT_FORMAT, topics=DEFAULT_TOPICS,
+                      delta: bool = False):
         await websocket.accept()
         self.active_connections.append(websocket)
+        self.formats[websocket] = wire_format
+        if delta:
+            self.delta_clients.add(websocket)
+        self.subscriptions[websocket] = set()
+        self.subscribe(websocket, topics)
 
     def disconnect(self, websocket: WebSocket):
         self.active_connections.remove(websocket)
+        self.formats.pop(websocket, None)
+        self.delta_clients.discard(websocket)
+        self.unsubscribe(websocket, self.subscriptions.pop(websocket, set()))
+
+    def subscribe(self, websocket: WebSocket, topics):
+        for topic in topics:
+            self.subscriptions.setdefault(websocket, set()).add(topic)
+            self.topic_index.setdefault(topic, set()).add(websocket)
+
+    def unsubscribe(self, websocket: WebSocket, topics):
+        for topic in list(topics):
+            self.subscriptions.get(websocket, set()).discard(topic)
+            subscribers = self.topic_index.get(topic)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self.topic_index[topic]
+
+    async def send(self, websocket: WebSocket, message: dict):
+        await self._send_payload(websocket, WireMessage(message).payload(*self.formats.get(websocket, DEFAULT_FORMAT)))
+
+    async def broadcast(self, message: dict, *topics: str, delta: Optional[dict] = None):
+        """
+        Ohne Topic an alle Verbindungen, sonst nur an Abonnenten mindestens eines Topics
+        delta: Alternative Nachricht für Verbindungen mit ?delta=true
+        """
+        if state_server is not None:
+            state_server.publish(message, topics, delta)  # Replikate verteilen an ihre eigenen Clients
+
+        if topics:
+            connections = set().union(*(self.topic_index.get(topic, ()) for topic in topics))
+        else:
+            connections = list(self.active_connections)
 
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
+        wire = WireMessage(message)  # jede Variante wird nur einmal kodiert
+        delta_wire = WireMessage(delta) if delta is not None else wire
+        for connection in connections:
+            selected = delta_wire if connection in self.delta_clients else wire
             try:
-                await connection.send_json(message)
+                await self._send_payload(connection, selected.payload(*self.formats.get(connection, DEFAULT_FORMAT)))
             except:
                 pass
 
+    @staticmethod
+    async def _send_payload(websocket: WebSocket, payload):
+        if isinstance(payload, bytes):
+            await websocket.send_bytes(payload)
+        else:
+            await websocket.send_text(payload)
+
 manager = ConnectionManager()
+quarter_deltas = QuarterDeltaEncoder()
+
+
+async def broadcast_quarter_completed(results: Dict):
+    """Quartalsabschluss an alle Clients (einmal kodiert je Kodierung/Schema; Delta-Clients bekommen nur Änderungen)"""
+    market = game.get_market_overview()
+    await manager.broadcast({
+        "type": "quarter_completed",
+        "quarter": game.current_quarter,
+        "results": results,
+        "market": market
+    }, TOPIC_QUARTER, delta=quarter_deltas.encode(game.current_quarter, results, market))
+    actions = game.kartellamt_actions
+    if actions:
+        await manager.broadcast({
+            "type": "kartellamt",
+            "quarter": game.current_quarter,
+            "actions": actions
+        }, TOPIC_MARKET, *{firm_topic(action["firm_id"]) for action in actions})
 
 
 # Game Session (Shared State)
 from state import game
 
+# Vorberechnete Firmenliste für GET /api/firms
+market_index = MarketIndex(game)
+
+# Engine: GameSession per Unix-Socket für API-/Dashboard-Replikate bereitstellen
+state_server = StateServer(game, STATE_SOCKET, asgi_app=app) if STATE_ROLE == "engine" else None
+
+# ============ ETAGS ============
+
+def firm_etag(firm: BusinessFirm) -> str:
+    """ETag einer Firma (Session + Versionsstand der Firma)"""
+    return f'W/"{game.epoch}-f{firm.id}-{firm.version}"'
+
+
+def konzern_etag(firm: BusinessFirm) -> str:
+    """ETag eines Konzernabschlusses (Quartal, Stand des Beteiligungsgraphs, Versionsstand aller einbezogenen Firmen)"""
+    return (f'W/"{game.epoch}-k{firm.id}-q{game.current_quarter}-o{game.ownership.version}'
+            f'-v{game.konzern.scope_version(firm)}"')
+
+
+def market_etag() -> str:
+    """ETag des Gesamtmarkts (jede Firmenänderung, Firmenanzahl und Quartal)"""
+    return f'W/"{game.epoch}-m{CHANGE_CLOCK.value}-{len(game.firms)}-q{game.current_quarter}"'
+
+
+def check_etag(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """304-Antwort bei passendem If-None-Match, sonst ETag-Header setzen und None"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
+
+
 # ============ API ENDPOINTS ============
 
 @app.get("/health")
@@ -70,7 +237,8 @@ async def health():
         "current_quarter": game.current_quarter,
         "quarter_duration": game.quarter_duration,
         "is_active": game.is_active,
-        "game_object_id": id(game)
+        "game_object_id": id(game),
+        "state_role": STATE_ROLE
     }
 
 
@@ -89,7 +257,7 @@ async def create_firm(firm_data: FirmCreate):
     await manager.broadcast({
         "type": "firm_created",
         "firm": firm.to_dict()
-    })
+    }, TOPIC_MARKET)
 
     return {
         "success": True,
@@ -98,16 +266,82 @@ async def create_firm(firm_data: FirmCreate):
     }
 
 
+# Maximale Firmenanzahl pro Bulk-Anfrage
+BULK_MAX_FIRMS = 100
+
+
+@app.get("/api/firms/bulk")
+async def get_firms_bulk(request: Request, response: Response, ids: str, views: Optional[str] = None):
+    """
+    Mehrere Sichten für mehrere Firmen in einer Anfrage
+
+    Query: ids=1,2,3 & views=firm,liquidity,... (Standard: alle Sichten)
+    (muss vor /api/firms/{firm_id} registriert sein)
+    """
+    try:
+        firm_ids = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+        selected = parse_views(views)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(firm_ids) > BULK_MAX_FIRMS:
+        raise HTTPException(status_code=400, detail=f"Maximal {BULK_MAX_FIRMS} Firmen pro Anfrage")
+
+    not_modified = check_etag(request, response, market_etag())
+    if not_modified:
+        return not_modified
+
+    ctx = ViewContext(game)  # gemeinsame Zwischenergebnisse über alle Firmen
+    firms = {}
+    missing = []
+    for firm_id in firm_ids:
+        firm = game.get_firm_by_id(firm_id)
+        if firm:
+            firms[firm_id] = build_bundle(ctx, firm, selected)
+        else:
+            missing.append(firm_id)
+
+    return {"views": selected, "firms": firms, "missing": missing}
+
+
 @app.get("/api/firms/{firm_id}")
-async def get_firm(firm_id: int):
+async def get_firm(firm_id: int, request: Request, response: Response):
     """Holt Firmendaten"""
     firm = game.get_firm_by_id(firm_id)
     if not firm:
         raise HTTPException(status_code=404, detail="Firma nicht gefunden")
 
+    not_modified = check_etag(request, response, firm_etag(firm))
+    if not_modified:
+        return not_modified
+
     return firm.to_dict()
 
 
+@app.get("/api/firms/{firm_id}/bundle")
+async def get_firm_bundle(firm_id: int, request: Request, response: Response, views: Optional[str] = None):
+    """
+    Mehrere Sichten einer Firma in einer Anfrage
+
+    Query: views=firm,balance_sheet,income_statement,liquidity,machines,personnel,
+           product_lifecycle,valuation,ownership (Standard: alle)
+    """
+    firm = game.get_firm_by_id(firm_id)
+    if not firm:
+        raise HTTPException(status_code=404, detail="Firma nicht gefunden")
+    try:
+        selected = parse_views(views)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Ownership liest andere Firmen → marktweiter ETag, sonst Versionsstand der Firma
+    etag = market_etag() if CROSS_FIRM_VIEWS.intersection(selected) else firm_etag(firm)
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+
+    return build_bundle(ViewContext(game), firm, selected)
+
+
 @app.get("/api/firms/user/{user_name}")
 async def get_firm_by_user(user_name: str):
     """Holt Firma eines Users"""
@@ -119,18 +353,21 @@ async def get_firm_by_user(user_name: str):
 
 
 @app.get("/api/firms")
-async def list_all_firms():
-    """Liste aller Firmen (inkl. Bot-Firmen)"""
-    firms = []
-    for firm in game.firms.values():
-        firms.append({
-            "id": firm.id,
-            "name": firm.name,
-            "user_count": len(firm.user_names),
-            "market_share": round(firm.market_share * 100, 2),
-            "cash": round(firm.cash, 0)
-        })
-    return {"firms": firms}
+async def list_all_firms(request: Request, response: Response, fields: Optional[str] = None, sort: str = "id",
+                         limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    Liste aller Firmen (inkl. Bot-Firmen) aus dem Marktindex
+
+    Query: fields=id,name,cash (Projektion), sort=-market_share (Präfix "-" = absteigend),
+    limit=50 & cursor=<next_cursor> (Keyset-Paginierung). Ohne Parameter: alle Firmen mit Standardfeldern.
+    """
+    not_modified = check_etag(request, response, market_etag())
+    if not_modified:
+        return not_modified
+    try:
+        return market_index.page(fields=fields, sort=sort, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.post("/api/firms/{firm_id}/join")
@@ -154,7 +391,7 @@ async def join_firm(firm_id: int, data: JoinFirmInput):
         "firm_id": firm_id,
         "user_name": data.user_name,
         "firm": firm.to_dict()
-    })
+    }, firm_topic(firm_id))
 
     return {
         "success": True,
@@ -184,7 +421,7 @@ async def acquire_firm(firm_id: int, target_firm_id: int):
             "target_firm_id": target_firm_id,
             "acquisition_info": acquisition_info,
             "market": game.get_market_overview()
-        })
+        }, TOPIC_MARKET, firm_topic(firm_id), firm_topic(target_firm_id))
 
         return {
             "success": True,
@@ -217,7 +454,7 @@ async def get_acquisition_cost(firm_id: int, target_firm_id: int):
             "acquisition_cost": round(acquisition_cost, 2),
             "your_cash": round(acquiring_firm.cash, 2),
             "can_afford": can_afford,
-            "target_inventory": round(target_firm.inventory, 0),
+            "target_inventory": round(target_firm.inventory_level, 0),
             "target_capacity": round(target_firm.production_capacity, 0),
             "target_revenue": round(target_firm.revenue, 2),
             "target_market_share": round(target_firm.market_share * 100, 2)
@@ -254,7 +491,7 @@ async def submit_decision(firm_id: int, decision: DecisionInput):
         "type": "decision_submitted",
         "firm_id": firm_id,
         "firm": firm.to_dict()
-    })
+    }, firm_topic(firm_id))
 
     return {
         "success": True,
@@ -263,15 +500,91 @@ async def submit_decision(firm_id: int, decision: DecisionInput):
     }
 
 
+@app.post("/api/firms/{firm_id}/forecast")
+async def get_decision_forecast(firm_id: int, decision: DecisionInput, scenarios: int = 200):
+    """Was-wäre-wenn-Prognose einer geplanten Entscheidung (wird NICHT angewendet)"""
+    firm = game.get_firm_by_id(firm_id)
+    if not firm:
+        raise HTTPException(status_code=404, detail="Firma nicht gefunden")
+
+    scenarios = max(10, min(2000, scenarios))
+    return forecast_decision(game, firm, decision, scenarios=scenarios)
+
+
+class SensitivityInput(BaseModel):
+    method: str = "grid"  # "grid" oder "lhs" (Latin Hypercube)
+    samples: int = 100_000
+    ranges: Optional[Dict[str, List[float]]] = None  # {parameter: [min, max]}
+    surface: List[str] = ["product_price", "production_capacity"]
+    seed: Optional[int] = None
+
+
+@app.post("/api/firms/{firm_id}/sensitivity")
+async def get_sensitivity_analysis(firm_id: int, sweep: SensitivityInput):
+    """Sensitivitätsanalyse: Gewinnfläche + optimale Entscheidung über den Entscheidungsraum"""
+    firm = game.get_firm_by_id(firm_id)
+    if not firm:
+        raise HTTPException(status_code=404, detail="Firma nicht gefunden")
+
+    try:
+        return sweep_decisions(
+            firm,
+            method=sweep.method,
+            samples=max(100, min(1_000_000, sweep.samples)),
+            ranges=sweep.ranges,
+            surface=sweep.surface,
+            seed=sweep.seed
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.get("/api/market")
-async def get_market_overview():
+async def get_market_overview(request: Request, response: Response):
     """Marktübersicht mit allen Firmen"""
+    not_modified = check_etag(request, response, market_etag())
+    if not_modified:
+        return not_modified
+
     return {
         "quarter": game.current_quarter,
         "firms": game.get_market_overview()
     }
 
 
+@app.get("/api/market/concentration")
+async def get_market_concentration(request: Request, response: Response, top: int = 10):
+    """Marktkonzentration: HHI, CR4/CR8 und HHI-Beitrag der größten Firmen"""
+    not_modified = check_etag(request, response, market_etag())
+    if not_modified:
+        return not_modified
+
+    concentration = game.concentration
+    return {
+        "quarter": game.current_quarter,
+        **concentration.summary(),
+        "top_firms": [
+            {
+                "firm_id": firm_id,
+                "firm_name": game.firms[firm_id].name,
+                "market_share": round(share * 100, 2),
+                "hhi_contribution": round(concentration.contribution(firm_id), 2)
+            }
+            for firm_id, share in concentration.top(max(0, min(top, 100)))
+        ]
+    }
+
+
+@app.get("/api/market/kartellamt")
+async def get_kartellamt_actions(firm_id: Optional[int] = None, limit: int = 50):
+    """Maßnahmen-Feed des Kartellamts (neueste zuerst), optional nur für eine Firma"""
+    actions = [action for action in reversed(game.kartellamt_log) if firm_id is None or action["firm_id"] == firm_id]
+    return {
+        "quarter": game.current_quarter,
+        "actions": actions[:max(0, min(limit, 200))]
+    }
+
+
 @app.get("/api/quarter")
 async def get_quarter_status():
     """Aktueller Quartalsstatus"""
@@ -292,17 +605,13 @@ async def advance_quarter():
     results = game.advance_quarter()
 
     # Broadcast quarter results
-    await manager.broadcast({
-        "type": "quarter_completed",
-        "quarter": game.current_quarter,
-        "results": results,
-        "market": game.get_market_overview()
-    })
+    await broadcast_quarter_completed(results)
 
     return {
         "success": True,
         "quarter": game.current_quarter,
-        "results": results
+        "results": results,
+        "kartellamt": game.kartellamt_actions
     }
 
 
@@ -327,9 +636,20 @@ async def reset_game():
         raise HTTPException(status_code=403, detail="Nur im Debug-Modus verfügbar")
 
     game.firms.clear()
+    game.epoch = uuid.uuid4().hex[:8]  # neue Session-Kennung: ETags, Dashboard-Charts & Co. von vorher gelten nicht mehr
+    game.antitrust.invalidate()
+    game.ownership.clear()
+    game.exchange.clear()
+    game.valuations.clear()
+    game.concentration.clear()
+    game.konzern.clear()
+    game.loan_ledger.clear()
+    game.kartellamt_actions = []
+    game.kartellamt_log.clear()
     game.current_quarter = 0
     game.is_active = False
     game.next_firm_id = 1
+    quarter_deltas.reset()
 
     await manager.broadcast({"type": "game_reset"})
 
@@ -339,34 +659,87 @@ async def reset_game():
 # ============ WEBSOCKET ============
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket für Live-Updates"""
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, encoding: str = "json", schema: str = "full",
+                             topics: Optional[str] = None, delta: bool = False):
+    """
+    WebSocket für Live-Updates
+
+    Query-Parameter: encoding=json|msgpack (msgpack als Binär-Frames),
+    schema=full|slim (slim: Firmen/Markt/Ergebnisse nur mit Kernkennzahlen),
+    topics=market,quarter,firm:<id> (Standard: market,quarter),
+    delta=true (Quartalsabschluss als quarter_delta mit seq/Keyframes)
+
+    Abos zur Laufzeit: {"action": "subscribe"|"unsubscribe", "topics": [...]}
+    Lücke in seq erkannt: {"action": "resync"} → aktueller Keyframe
+    """
+    try:
+        wire_format = parse_format(encoding, schema)
+        initial_topics = parse_topics(topics) if topics is not None else set(DEFAULT_TOPICS)
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+
+    await manager.connect(websocket, wire_format, initial_topics, delta=delta)
     try:
         # Send initial state
-        await websocket.send_json({
+        await manager.send(websocket, {
             "type": "connected",
             "quarter": game.current_quarter,
-            "firms_count": len(game.firms)
+            "firms_count": len(game.firms),
+            "encoding": wire_format[0],
+            "schema": wire_format[1],
+            "topics": sorted(manager.subscriptions[websocket]),
+            "delta": delta
         })
+        if delta and quarter_deltas.keyframe() is not None:
+            await manager.send(websocket, quarter_deltas.keyframe())
 
         while True:
-            # Keep connection alive & check for quarter advance
-            await asyncio.sleep(1)
+            # Keep connection alive & check for quarter advance (Client-Nachrichten = Abo-Änderungen)
+            try:
+                frame = await asyncio.wait_for(websocket.receive(), timeout=1)
+            except asyncio.TimeoutError:
+                frame = None
+
+            if frame is not None:
+                if frame["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(frame.get("code", 1000))
+                await handle_client_message(websocket, frame.get("bytes") or frame.get("text"))
 
             if game.is_active and game.should_advance_quarter():
                 results = game.advance_quarter()
-                await manager.broadcast({
-                    "type": "quarter_completed",
-                    "quarter": game.current_quarter,
-                    "results": results,
-                    "market": game.get_market_overview()
-                })
+                await broadcast_quarter_completed(results)
 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
 
+async def handle_client_message(websocket: WebSocket, payload):
+    """Verarbeitet subscribe/unsubscribe/resync-Nachrichten eines Clients"""
+    try:
+        message = decode(payload)
+        action = message.get("action")
+        if action == "resync":
+            keyframe = quarter_deltas.keyframe()
+            await manager.send(websocket, keyframe or {"type": "error", "message": "Noch kein Quartalsabschluss"})
+            return
+        if action not in ("subscribe", "unsubscribe"):
+            raise ValueError(f"Unbekannte Aktion '{action}'")
+        requested = parse_topics(message.get("topics"))
+    except (ValueError, TypeError, AttributeError) as e:
+        await manager.send(websocket, {"type": "error", "message": str(e)})
+        return
+
+    if action == "subscribe":
+        manager.subscribe(websocket, requested)
+    else:
+        manager.unsubscribe(websocket, requested)
+    await manager.send(websocket, {
+        "type": "subscriptions",
+        "topics": sorted(manager.subscriptions[websocket])
+    })
+
+
 # ============ DEBUG ENDPOINTS ============
 
 if DEBUG_MODE:
@@ -400,8 +773,16 @@ if DEBUG_MODE:
 @app.on_event("startup")
 async def startup_event():
     """Startup: Hintergrund-Task für Auto-Quarter-Advance + Bots erstellen"""
+    check_import_budget()
+    if STATE_ROLE == "replica":
+        # Simulation läuft in der Engine - hier nur deren Broadcasts an eigene Clients verteilen
+        app.state.relay_task = asyncio.create_task(relay_engine_broadcasts())  # Referenz halten (sonst GC)
+        print(f"[OK] Replikat von {STATE_SOCKET}")
+        return
+
     # Verkürzte Quartalsdauer für schnellere Tests (60s statt 120s)
     game.quarter_duration = 60
+    game.tick_workers = TICK_WORKERS
 
     # Erstelle Bot-Firmen beim Startup
     game.create_bot_firms()
@@ -409,22 +790,42 @@ async def startup_event():
 
     print(f"[OK] {len(game.firms)} Bot-Firmen erstellt")
     print(f"[OK] Quartalsdauer: {game.quarter_duration}s")
+    if game.tick_workers > 1:
+        print(f"[OK] Quartalsabschluss parallel mit {game.tick_workers} Prozessen")
+    if state_server is not None:
+        await state_server.start()
+        print(f"[OK] State-Service auf {STATE_SOCKET}")
 
     async def quarter_timer():
         while True:
             await asyncio.sleep(1)
             if game.is_active and game.should_advance_quarter():
                 results = game.advance_quarter()
-                await manager.broadcast({
-                    "type": "quarter_completed",
-                    "quarter": game.current_quarter,
-                    "results": results,
-                    "market": game.get_market_overview()
-                })
+                await broadcast_quarter_completed(results)
 
     asyncio.create_task(quarter_timer())
 
 
+async def relay_engine_broadcasts():
+    """Replikat: Broadcasts der Engine an die lokal verbundenen WebSocket-Clients"""
+    async for message, topics, delta in subscribe(STATE_SOCKET):
+        game.invalidate()
+        if message.get("type") == "quarter_completed":
+            # Delta-Folge je Prozess (seq gilt pro Verbindung)
+            delta = quarter_deltas.encode(message["quarter"], message["results"], message["market"])
+        elif message.get("type") == "game_reset":
+            quarter_deltas.reset()
+        await manager.broadcast(message, *topics, delta=delta)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Shutdown: Prozess-Pool des Quartalsabschlusses beenden, State-Service schließen"""
+    shutdown_pool()
+    if state_server is not None:
+        await state_server.stop()
+
+
 # ============ M&A ENDPOINTS ============
 
 class AcquisitionInput(BaseModel):
@@ -455,7 +856,7 @@ async def acquire_firm(acquisition: AcquisitionInput):
         "acquirer": acquirer.to_dict(),
         "target": target.to_dict(),
         "message": message
-    })
+    }, TOPIC_MARKET, firm_topic(acquirer.id), firm_topic(target.id))
 
     return {
         "success": True,
@@ -466,25 +867,12 @@ async def acquire_firm(acquisition: AcquisitionInput):
 
 @app.get("/api/firms/{firm_id}/valuation")
 async def get_firm_valuation(firm_id: int):
-    """Holt Firmenbewertung für M&A"""
+    """Firmenbewertung: Unternehmenswert, Übernahmepreise und M&A-Bewertung (ma_valuation)"""
     firm = game.get_firm_by_id(firm_id)
     if not firm:
         raise HTTPException(status_code=404, detail="Firma nicht gefunden")
 
-    enterprise_value = firm.calculate_enterprise_value()
-
-    return {
-        "firm_id": firm_id,
-        "firm_name": firm.name,
-        "enterprise_value": enterprise_value,
-        "acquisition_price_10": firm.calculate_acquisition_price(10),
-        "acquisition_price_25": firm.calculate_acquisition_price(25),
-        "acquisition_price_51": firm.calculate_acquisition_price(51),
-        "acquisition_price_100": firm.calculate_acquisition_price(100),
-        "shares": firm.shares,
-        "is_public": firm.is_public,
-        "market_share": firm.market_share * 100
-    }
+    return valuation_view(ViewContext(game), firm)
 
 @app.get("/api/antitrust/check")
 async def check_antitrust(acquirer_id: int, target_id: int, percentage: float):
@@ -500,9 +888,27 @@ async def check_antitrust(acquirer_id: int, target_id: int, percentage: float):
     return {
         "allowed": allowed,
         "reason": reason,
-        "combined_market_share": (acquirer.market_share + target.market_share * percentage/100.0) * 100
+        "combined_market_share": (acquirer.market_share + target.market_share * percentage/100.0) * 100,
+        "acquirer_market_share": round(acquirer.market_share * 100, 2),
+        "target_market_share": round(target.market_share * 100, 2),
+        "max_percentage": round(game.antitrust.max_percentage(acquirer, target), 2),
+        "hhi": round(game.concentration.hhi, 1),
+        "hhi_delta": round(game.concentration.merger_delta(acquirer_id, target_id) * percentage / 100.0, 1)
     }
 
+@app.get("/api/antitrust/targets")
+async def get_permissible_targets(acquirer_id: int):
+    """Alle Firmen, an denen der Käufer kartellrechtlich Anteile erwerben darf, mit maximalem Anteil"""
+    acquirer = game.get_firm_by_id(acquirer_id)
+    if not acquirer:
+        raise HTTPException(status_code=404, detail="Firma nicht gefunden")
+
+    targets = [target for target in game.antitrust.permissible_targets(acquirer) if target["firm_id"] in game.firms]
+    for target in targets:
+        target["firm_name"] = game.firms[target["firm_id"]].name
+
+    return {"acquirer_id": acquirer_id, "targets": targets}
+
 
 # ============ NEUE SYSTEME - API ENDPOINTS ============
 
@@ -527,7 +933,7 @@ async def upgrade_machines(firm_id: int, upgrade: MachineUpgradeInput):
         "firm_id": firm_id,
         "new_class": upgrade.target_class,
         "firm": firm.to_dict()
-    })
+    }, firm_topic(firm_id))
 
     return {
         "success": True,
@@ -536,42 +942,17 @@ async def upgrade_machines(firm_id: int, upgrade: MachineUpgradeInput):
     }
 
 @app.get("/api/firms/{firm_id}/machines")
-async def get_machine_info(firm_id: int):
+async def get_machine_info(firm_id: int, request: Request, response: Response):
     """Holt Maschinen-Informationen"""
     firm = game.get_firm_by_id(firm_id)
     if not firm:
         raise HTTPException(status_code=404, detail="Firma nicht gefunden")
 
-    upgrade_options = {
-        "basic": {
-            "current": "Basic Machines",
-            "next": "Professional Machines",
-            "cost": 3_000_000,
-            "efficiency_gain": "0.8 → 1.0 (25% boost)",
-            "energy_savings": "20% weniger Energiekosten"
-        },
-        "professional": {
-            "current": "Professional Machines",
-            "next": "Premium Machines",
-            "cost": 6_000_000,
-            "efficiency_gain": "1.0 → 1.3 (30% boost)",
-            "energy_savings": "30% weniger Energiekosten"
-        },
-        "premium": {
-            "current": "Premium Machines",
-            "next": "None (Maximum erreicht)",
-            "cost": 0,
-            "efficiency_gain": "Already at maximum",
-            "energy_savings": "Already at maximum"
-        }
-    }
+    not_modified = check_etag(request, response, firm_etag(firm))
+    if not_modified:
+        return not_modified
 
-    return {
-        "current_class": firm.machine_class,
-        "efficiency_factor": firm.machines_efficiency_factor,
-        "energy_cost_factor": firm.machine_energy_cost_factor,
-        "upgrade_info": upgrade_options.get(firm.machine_class, {})
-    }
+    return machines_view(ViewContext(game), firm)
 
 # FINANZIERUNGSSYSTEM - KREDITE
 class LoanInput(BaseModel):
@@ -597,7 +978,7 @@ async def take_loan(firm_id: int, loan_input: LoanInput):
         "firm_id": firm_id,
         "amount": loan_input.amount,
         "firm": firm.to_dict()
-    })
+    }, firm_topic(firm_id))
 
     return {
         "success": True,
@@ -607,13 +988,14 @@ async def take_loan(firm_id: int, loan_input: LoanInput):
 
 @app.get("/api/firms/{firm_id}/financing/loans")
 async def get_loans(firm_id: int):
-    """Holt Kredit-Informationen"""
+    """Holt Kredit-Informationen inkl. verbleibendem Tilgungsplan je Kredit"""
     firm = game.get_firm_by_id(firm_id)
     if not firm:
         raise HTTPException(status_code=404, detail="Firma nicht gefunden")
 
     return {
         "loans": firm.loans,
+        "schedule": firm.loan_ledger.schedule(firm.id),
         "total_debt": firm.debt,
         "max_loan_capacity": firm.max_loan_capacity,
         "available_credit": firm.max_loan_capacity - firm.debt,
@@ -642,7 +1024,7 @@ async def issue_shares(firm_id: int, shares_input: SharesInput):
         "firm_id": firm_id,
         "amount": shares_input.amount,
         "firm": firm.to_dict()
-    })
+    }, firm_topic(firm_id))
 
     return {
         "success": True,
@@ -662,12 +1044,14 @@ async def buyback_shares_to_go_private(firm_id: int):
     if not success:
         raise HTTPException(status_code=400, detail=message)
 
+    game.exchange.close_book(firm_id)  # offene Orders auf die Aktie entfallen mit dem Delisting
+
     await manager.broadcast({
         "type": "shares_bought_back",
         "firm_id": firm_id,
         "message": message,
         "firm": firm.to_dict()
-    })
+    }, firm_topic(firm_id))
 
     return {
         "success": True,
@@ -676,6 +1060,85 @@ async def buyback_shares_to_go_private(firm_id: int):
         "is_now_private": not firm.is_public
     }
 
+# BÖRSE (ORDERBUCH)
+
+# Umsätze werden gesammelt und höchstens alle TRADE_BROADCAST_INTERVAL Sekunden per WebSocket verteilt
+TRADE_BROADCAST_INTERVAL = float(os.getenv("TRADE_BROADCAST_INTERVAL", "0.1"))
+trade_broadcast_task: Optional[asyncio.Task] = None
+
+class OrderInput(BaseModel):
+    trader_firm_id: int  # kaufende/verkaufende Firma
+    side: str  # "buy" oder "sell"
+    price: float  # Limit je Aktie
+    quantity: int  # Stück
+
+@app.post("/api/firms/{firm_id}/orders")
+async def place_order(firm_id: int, order_input: OrderInput):
+    """Limit-Order auf Aktien einer börsennotierten Firma (sofortige Ausführung, Rest bleibt im Buch)"""
+    try:
+        result = game.exchange.place_order(firm_id, order_input.trader_firm_id, order_input.side,
+                                           order_input.price, order_input.quantity)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if result["trades"]:
+        schedule_trade_broadcast()
+
+    return {"success": True, **result}
+
+@app.delete("/api/orders/{order_id}")
+async def cancel_order(order_id: int, trader_firm_id: Optional[int] = None):
+    """Storniert eine offene Order (mit trader_firm_id nur die eigene)"""
+    try:
+        order = game.exchange.cancel_order(order_id, trader_firm_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    return {"success": True, "order": order}
+
+@app.get("/api/firms/{firm_id}/orderbook")
+async def get_orderbook(firm_id: int, levels: int = 10):
+    """Orderbuch einer Aktie: Preisstufen (beste zuerst) + letzte Umsätze"""
+    firm = game.get_firm_by_id(firm_id)
+    if not firm:
+        raise HTTPException(status_code=404, detail="Firma nicht gefunden")
+    return {
+        **game.exchange.book_view(firm_id, max(1, min(levels, 100))),
+        "is_public": firm.is_public,
+        "share_price": round(firm.share_price, 2)
+    }
+
+@app.get("/api/firms/{firm_id}/orders")
+async def get_open_orders(firm_id: int):
+    """Offene Orders, die diese Firma aufgegeben hat"""
+    if not game.get_firm_by_id(firm_id):
+        raise HTTPException(status_code=404, detail="Firma nicht gefunden")
+    return {"firm_id": firm_id, "orders": game.exchange.open_orders(firm_id)}
+
+
+def schedule_trade_broadcast():
+    global trade_broadcast_task
+    if trade_broadcast_task is None or trade_broadcast_task.done():
+        trade_broadcast_task = asyncio.create_task(broadcast_trades())
+
+
+async def broadcast_trades():
+    """Gesammelte Umsätze je Aktie an market + firm:{id} (eine Nachricht je Aktie und Intervall)"""
+    await asyncio.sleep(TRADE_BROADCAST_INTERVAL)
+    by_firm: Dict[int, list] = {}
+    for trade in game.exchange.drain_trades():
+        by_firm.setdefault(trade["firm_id"], []).append(trade)
+    for firm_id, trades in by_firm.items():
+        await manager.broadcast({
+            "type": "trades",
+            "firm_id": firm_id,
+            "trades": trades,
+            "share_price": trades[-1]["price"]
+        }, TOPIC_MARKET, firm_topic(firm_id))
+
 # PERSONALMANAGEMENT
 class PersonnelInput(BaseModel):
     qualification: str  # "ungelernt", "angelernt", "facharbeiter"
@@ -699,7 +1162,7 @@ async def hire_personnel(firm_id: int, personnel_input: PersonnelInput):
         "qualification": personnel_input.qualification,
         "count": personnel_input.count,
         "firm": firm.to_dict()
-    })
+    }, firm_topic(firm_id))
 
     return {
         "success": True,
@@ -725,7 +1188,7 @@ async def fire_personnel(firm_id: int, personnel_input: PersonnelInput):
         "qualification": personnel_input.qualification,
         "count": personnel_input.count,
         "firm": firm.to_dict()
-    })
+    }, firm_topic(firm_id))
 
     return {
         "success": True,
@@ -734,42 +1197,17 @@ async def fire_personnel(firm_id: int, personnel_input: PersonnelInput):
     }
 
 @app.get("/api/firms/{firm_id}/personnel")
-async def get_personnel_info(firm_id: int):
+async def get_personnel_info(firm_id: int, request: Request, response: Response):
     """Holt Personal-Informationen"""
     firm = game.get_firm_by_id(firm_id)
     if not firm:
         raise HTTPException(status_code=404, detail="Firma nicht gefunden")
 
-    total_personnel = firm.personnel_ungelernt + firm.personnel_angelernt + firm.personnel_facharbeiter
+    not_modified = check_etag(request, response, firm_etag(firm))
+    if not_modified:
+        return not_modified
 
-    return {
-        "personnel": {
-            "ungelernt": {
-                "count": firm.personnel_ungelernt,
-                "cost_per_quarter": firm.cost_ungelernt,
-                "productivity": firm.productivity_ungelernt,
-                "total_cost": firm.personnel_ungelernt * firm.cost_ungelernt
-            },
-            "angelernt": {
-                "count": firm.personnel_angelernt,
-                "cost_per_quarter": firm.cost_angelernt,
-                "productivity": firm.productivity_angelernt,
-                "total_cost": firm.personnel_angelernt * firm.cost_angelernt
-            },
-            "facharbeiter": {
-                "count": firm.personnel_facharbeiter,
-                "cost_per_quarter": firm.cost_facharbeiter,
-                "productivity": firm.productivity_facharbeiter,
-                "total_cost": firm.personnel_facharbeiter * firm.cost_facharbeiter
-            },
-            "total": total_personnel,
-            "average_productivity": (
-                (firm.personnel_ungelernt * firm.productivity_ungelernt +
-                 firm.personnel_angelernt * firm.productivity_angelernt +
-                 firm.personnel_facharbeiter * firm.productivity_facharbeiter) / total_personnel
-            ) if total_personnel > 0 else 0
-        }
-    }
+    return personnel_view(ViewContext(game), firm)
 
 # INNOVATION / PRODUKTLEBENSZYKLUS
 class InnovationInput(BaseModel):
@@ -782,22 +1220,20 @@ async def invest_in_innovation(firm_id: int, innovation_input: InnovationInput):
     if not firm:
         raise HTTPException(status_code=404, detail="Firma nicht gefunden")
 
-    if firm.cash < innovation_input.amount:
-        raise HTTPException(status_code=400, detail=f"Nicht genug Cash. Verfügbar: €{firm.cash:,.0f}")
-
-    firm.cash -= innovation_input.amount
-    firm.innovation_investment += innovation_input.amount
+    success, message = firm.invest_in_innovation(innovation_input.amount)
+    if not success:
+        raise HTTPException(status_code=400, detail=message)
 
     await manager.broadcast({
         "type": "innovation_invested",
         "firm_id": firm_id,
         "amount": innovation_input.amount,
         "firm": firm.to_dict()
-    })
+    }, firm_topic(firm_id))
 
     return {
         "success": True,
-        "message": f"€{innovation_input.amount:,.0f} in Innovation investiert",
+        "message": message,
         "total_innovation_investment": firm.innovation_investment,
         "innovation_threshold": 5_000_000,
         "firm": firm.to_dict()
@@ -810,161 +1246,58 @@ async def get_product_lifecycle(firm_id: int):
     if not firm:
         raise HTTPException(status_code=404, detail="Firma nicht gefunden")
 
-    lifecycle_info = {
-        "introduction": {
-            "stage": "Einführung",
-            "demand_factor": 0.7,
-            "description": "Produkt wird am Markt eingeführt. Geringe Nachfrage.",
-            "quarters_range": "0-4"
-        },
-        "growth": {
-            "stage": "Wachstum",
-            "demand_factor": 1.3,
-            "description": "Produkt wächst stark. Hohe Nachfrage!",
-            "quarters_range": "5-12"
-        },
-        "maturity": {
-            "stage": "Reife",
-            "demand_factor": 1.0,
-            "description": "Stabile Marktphase. Normale Nachfrage.",
-            "quarters_range": "13-24"
-        },
-        "decline": {
-            "stage": "Rückgang",
-            "demand_factor": 0.6,
-            "description": "Produkt veraltet. Niedrige Nachfrage. Innovation nötig!",
-            "quarters_range": "25+"
-        }
-    }
-
-    return {
-        "current_stage": firm.product_lifecycle_stage,
-        "age_quarters": firm.product_age_quarters,
-        "innovation_level": firm.product_innovation_level,
-        "innovation_investment": firm.innovation_investment,
-        "innovation_threshold": 5_000_000,
-        "lifecycle_stages": lifecycle_info,
-        "recommendation": "Innovation investieren!" if firm.product_lifecycle_stage == "decline" else "Produkt läuft gut"
-    }
+    return product_lifecycle_view(ViewContext(game), firm)
 
 # BILANZ & GuV
 @app.get("/api/firms/{firm_id}/balance-sheet")
-async def get_balance_sheet(firm_id: int):
-    """Holt Bilanz"""
+async def get_balance_sheet(firm_id: int, request: Request, response: Response, konsolidiert: bool = False):
+    """Holt Bilanz (?konsolidiert=true: Konzernbilanz mit allen Mehrheitsbeteiligungen)"""
     firm = game.get_firm_by_id(firm_id)
     if not firm:
         raise HTTPException(status_code=404, detail="Firma nicht gefunden")
 
+    etag = konzern_etag(firm) if konsolidiert else firm_etag(firm)
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+
+    if konsolidiert:
+        return game.konzern.balance_sheet(firm)
     return firm.generate_balance_sheet()
 
 @app.get("/api/firms/{firm_id}/income-statement")
-async def get_income_statement(firm_id: int):
-    """Holt Gewinn- und Verlustrechnung (GuV)"""
+async def get_income_statement(firm_id: int, request: Request, response: Response, konsolidiert: bool = False):
+    """Holt Gewinn- und Verlustrechnung (GuV) (?konsolidiert=true: Konzern-GuV)"""
     firm = game.get_firm_by_id(firm_id)
     if not firm:
         raise HTTPException(status_code=404, detail="Firma nicht gefunden")
 
+    etag = konzern_etag(firm) if konsolidiert else firm_etag(firm)
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+
+    if konsolidiert:
+        return game.konzern.income_statement(firm)
     return firm.generate_income_statement()
 
 # LIQUIDITÄTSKENNZAHLEN
 @app.get("/api/firms/{firm_id}/liquidity")
-async def get_liquidity_ratios(firm_id: int):
+async def get_liquidity_ratios(firm_id: int, request: Request, response: Response):
     """Holt Liquiditätskennzahlen"""
     firm = game.get_firm_by_id(firm_id)
     if not firm:
         raise HTTPException(status_code=404, detail="Firma nicht gefunden")
 
-    # Liquiditätsstatus (mit Handling für unendliche Liquidität)
-    if firm.liquidity_1 == float('inf') or firm.liquidity_1 >= 1.5:
-        liquidity_status = "HEALTHY"
-    elif firm.liquidity_1 >= 1.0:
-        liquidity_status = "GOOD"
-    elif firm.liquidity_1 >= 0.5:
-        liquidity_status = "WARNING"
-    else:
-        liquidity_status = "CRITICAL"
+    not_modified = check_etag(request, response, firm_etag(firm))
+    if not_modified:
+        return not_modified
 
-    # Recommendations basierend auf Status
-    recommendations = []
-    if liquidity_status == "HEALTHY":
-        if firm.liquidity_1 == float('inf'):
-            recommendations.append("Perfekte Liquidität! Keine Verbindlichkeiten vorhanden. Bereit für Investitionen.")
-        else:
-            recommendations.append("Liquidität gesund. Gute finanzielle Position.")
-    elif liquidity_status == "GOOD":
-        recommendations.append("Liquidität gut. Weiter überwachen.")
-    elif liquidity_status == "WARNING":
-        recommendations.append("Liquidität niedrig. Cashflow überwachen und Kosten reduzieren.")
-    elif liquidity_status == "CRITICAL":
-        recommendations.append("KRITISCH! Sofort Kredit aufnehmen oder Kosten drastisch senken!")
-
-    return {
-        "liquidity_1": firm.liquidity_1 if firm.liquidity_1 != float('inf') else None,
-        "liquidity_2": firm.liquidity_2 if firm.liquidity_2 != float('inf') else None,
-        "liquidity_3": firm.liquidity_3 if firm.liquidity_3 != float('inf') else None,
-        "current_liabilities": firm.current_liabilities,
-        "status": liquidity_status,
-        "interpretation": {
-            "liquidity_1": "Barliquidität (>1.0 = gut, <0.5 = kritisch)",
-            "liquidity_2": "Einzugsbedingte Liquidität (>1.0 = gut)",
-            "liquidity_3": "Umsatzbedingte Liquidität (>2.0 = gut)"
-        },
-        "recommendations": recommendations
-    }
+    return liquidity_view(ViewContext(game), firm)
 
 
 # ============ M&A COMPLEX SYSTEM ENDPOINTS ============
 
-@app.get("/api/firms/{firm_id}/valuation")
-async def get_firm_valuation(firm_id: int):
-    """Berechnet Unternehmensbewertung für M&A"""
-    firm = game.get_firm_by_id(firm_id)
-    if not firm:
-        raise HTTPException(status_code=404, detail="Firma nicht gefunden")
-
-    # Enterprise Value Berechnung
-    # EV = Eigenkapital + Schulden - Cash + Goodwill
-    # Vereinfacht: Assets + Umsatz-Multiplikator + Marktposition
-
-    asset_value = (
-        firm.cash +
-        (firm.inventory_level * 50) +  # Inventar zum Einkaufspreis
-        firm.machines_value +
-        firm.buildings_value +
-        firm.equipment_value
-    )
-
-    # Umsatz-Multiplikator (4x Jahresumsatz = 16x Quartalsumsatz)
-    revenue_value = firm.revenue * 16
-
-    # Marktpositions-Bonus
-    market_position_value = firm.market_share * 1_000_000  # €1M pro 1% Marktanteil
-
-    # Enterprise Value = Gewichteter Durchschnitt
-    enterprise_value = (
-        asset_value * 0.3 +
-        revenue_value * 0.5 +
-        market_position_value * 0.2
-    )
-
-    # Mindestbewertung
-    enterprise_value = max(enterprise_value, 500_000)
-
-    return {
-        "firm_id": firm_id,
-        "firm_name": firm.name,
-        "enterprise_value": round(enterprise_value, 2),
-        "components": {
-            "asset_value": round(asset_value, 2),
-            "revenue_value": round(revenue_value, 2),
-            "market_position_value": round(market_position_value, 2)
-        },
-        "market_share": round(firm.market_share * 100, 2),
-        "revenue": round(firm.revenue, 2),
-        "equity": round(firm.equity, 2)
-    }
-
-
 @app.get("/api/firms/{firm_id}/ownership")
 async def get_firm_ownership(firm_id: int):
     """Zeigt Besitzstruktur und Portfolio-Übersicht"""
@@ -972,97 +1305,7 @@ async def get_firm_ownership(firm_id: int):
     if not firm:
         raise HTTPException(status_code=404, detail="Firma nicht gefunden")
 
-    # Portfolio: Shares this firm owns IN other companies
-    portfolio_details = []
-    total_portfolio_value = 0.0
-    for target_firm_id, percentage in firm.portfolio.items():
-        target_firm = game.get_firm_by_id(target_firm_id)
-        if target_firm:
-            # Calculate value of this stake
-            valuation = await get_firm_valuation(target_firm_id)
-            stake_value = valuation["enterprise_value"] * (percentage / 100.0)
-            total_portfolio_value += stake_value
-
-            portfolio_details.append({
-                "firm_id": target_firm_id,
-                "firm_name": target_firm.name,
-                "percentage_owned": round(percentage, 2),
-                "stake_value": round(stake_value, 2),
-                "is_full_ownership": percentage >= 100.0,
-                "is_majority": percentage >= 51.0,
-                "is_blocking_minority": percentage >= 25.0
-            })
-
-    # Sort by percentage owned (descending)
-    portfolio_details.sort(key=lambda x: x["percentage_owned"], reverse=True)
-
-    # Shareholders: Who owns shares IN this firm
-    shareholders_details = []
-    for shareholder_name, percentage in firm.shares.items():
-        shareholders_details.append({
-            "shareholder": shareholder_name,
-            "percentage": round(percentage, 2),
-            "is_majority_shareholder": percentage >= 51.0,
-            "is_blocking_minority": percentage >= 25.0
-        })
-
-    # Sort by percentage (descending)
-    shareholders_details.sort(key=lambda x: x["percentage"], reverse=True)
-
-    return {
-        "firm_id": firm_id,
-        "firm_name": firm.name,
-        "portfolio": {
-            "total_investments": len(portfolio_details),
-            "total_portfolio_value": round(total_portfolio_value, 2),
-            "holdings": portfolio_details,
-            "has_full_ownership": any(h["is_full_ownership"] for h in portfolio_details)
-        },
-        "shareholders": {
-            "total_shareholders": len(shareholders_details),
-            "ownership_structure": "Privat" if not firm.is_public else "Börsennotiert",
-            "shareholders_list": shareholders_details
-        }
-    }
-
-
-@app.get("/api/antitrust/check")
-async def check_antitrust(acquirer_id: int, target_id: int, percentage: float):
-    """Prüft ob Übernahme kartellrechtlich zulässig ist"""
-    acquirer = game.get_firm_by_id(acquirer_id)
-    target = game.get_firm_by_id(target_id)
-
-    if not acquirer or not target:
-        raise HTTPException(status_code=404, detail="Firma nicht gefunden")
-
-    # Berechne kombinierten Marktanteil
-    combined_market_share = (acquirer.market_share + target.market_share) * 100
-
-    # Schwellenwerte
-    CRITICAL_THRESHOLD = 40.0  # Ab 40% kritisch
-    BLOCKED_THRESHOLD = 50.0   # Ab 50% verboten
-
-    allowed = combined_market_share < BLOCKED_THRESHOLD
-
-    if combined_market_share >= BLOCKED_THRESHOLD:
-        reason = f"Marktbeherrschung! Kombinierter Marktanteil {combined_market_share:.1f}% überschreitet Grenze von {BLOCKED_THRESHOLD}%"
-        risk_level = "BLOCKED"
-    elif combined_market_share >= CRITICAL_THRESHOLD:
-        reason = f"Kritischer Marktanteil {combined_market_share:.1f}% - Übernahme unter Auflagen möglich"
-        risk_level = "WARNING"
-    else:
-        reason = f"Übernahme unbedenklich - Kombinierter Marktanteil {combined_market_share:.1f}%"
-        risk_level = "OK"
-
-    return {
-        "allowed": allowed,
-        "combined_market_share": round(combined_market_share, 2),
-        "acquirer_market_share": round(acquirer.market_share * 100, 2),
-        "target_market_share": round(target.market_share * 100, 2),
-        "reason": reason,
-        "risk_level": risk_level,
-        "threshold": BLOCKED_THRESHOLD
-    }
+    return ownership_view(ViewContext(game), firm)
 
 
 class AcquisitionRequest(BaseModel):
@@ -1087,13 +1330,12 @@ async def execute_partial_acquisition(req: AcquisitionRequest):
         raise HTTPException(status_code=400, detail="Prozentsatz muss zwischen 1% und 100% liegen")
 
     # Kartellrecht prüfen
-    antitrust_check = await check_antitrust(req.acquirer_firm_id, req.target_firm_id, req.percentage)
-    if not antitrust_check["allowed"]:
-        raise HTTPException(status_code=403, detail=f"Kartellamt verbietet Übernahme: {antitrust_check['reason']}")
+    allowed, reason = game.antitrust.check(acquirer, target, req.percentage)
+    if not allowed:
+        raise HTTPException(status_code=403, detail=f"Kartellamt verbietet Übernahme: {reason}")
 
-    # Bewertung holen
-    valuation = await get_firm_valuation(req.target_firm_id)
-    enterprise_value = valuation["enterprise_value"]
+    # Bewertung holen (M&A-Bewertung, vorgehalten je Versionsstand)
+    enterprise_value = round(game.valuations.get(target).ma_value, 2)
 
     # Preis berechnen (30% Premium)
     acquisition_price = enterprise_value * 1.30 * (req.percentage / 100.0)
@@ -1116,7 +1358,7 @@ async def execute_partial_acquisition(req: AcquisitionRequest):
             "target_firm_id": req.target_firm_id,
             "acquisition_info": acquisition_info,
             "market": game.get_market_overview()
-        })
+        }, TOPIC_MARKET, firm_topic(req.acquirer_firm_id), firm_topic(req.target_firm_id))
 
         return {
             "success": True,
@@ -1129,19 +1371,32 @@ async def execute_partial_acquisition(req: AcquisitionRequest):
         # Teilübernahme (< 100%)
         # Vereinfacht: Kaufe Anteil, übertrage proportionale Assets, Target bleibt bestehen
 
-        # Bezahle
-        acquirer.cash -= acquisition_price
-        target.cash += acquisition_price * 0.7  # 70% geht an Target (30% sind Transaktionskosten/Premium)
-
-        # Übertrage proportionale Assets
-        inventory_transfer = target.inventory_level * (req.percentage / 100.0)
-        capacity_transfer = target.production_capacity * (req.percentage / 100.0)
-
-        acquirer.inventory_level += inventory_transfer
-        acquirer.production_capacity += capacity_transfer
-
-        target.inventory_level -= inventory_transfer
-        target.production_capacity -= capacity_transfer
+        share = req.percentage / 100.0
+        transfer = {}  # beim Commit übertragene Mengen (Stand unter dem Lock)
+
+        def take(field: str):
+            def change(value):
+                transfer[field] = value * share
+                return value - transfer[field]
+            return change
+
+        # Zahlung und proportionale Assets atomar (transactions.py)
+        transaction = (
+            Transaction("partial_acquisition")
+            .require(lambda: acquirer.cash >= acquisition_price,
+                     lambda: f"Nicht genug Cash! Benötigt: €{acquisition_price:,.0f}, Verfügbar: €{acquirer.cash:,.0f}")
+            .add(acquirer, "cash", -acquisition_price)
+            .add(target, "cash", acquisition_price * 0.7)  # 70% geht an Target (30% sind Transaktionskosten/Premium)
+            .update(target, "inventory_level", take("inventory_level"))
+            .update(target, "production_capacity", take("production_capacity"))
+            .update(acquirer, "inventory_level", lambda value: value + transfer["inventory_level"])
+            .update(acquirer, "production_capacity", lambda value: value + transfer["production_capacity"])
+        )
+        try:
+            game.transactions.submit(transaction)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        inventory_transfer, capacity_transfer = transfer["inventory_level"], transfer["production_capacity"]
 
         # Goodwill
         goodwill = acquisition_price - (target.equity * req.percentage / 100.0)
@@ -1155,7 +1410,7 @@ async def execute_partial_acquisition(req: AcquisitionRequest):
             "percentage": req.percentage,
             "price": acquisition_price,
             "market": game.get_market_overview()
-        })
+        }, TOPIC_MARKET, firm_topic(req.acquirer_firm_id), firm_topic(req.target_firm_id))
 
         return {
             "success": True,
@@ -1176,10 +1431,55 @@ async def execute_partial_acquisition(req: AcquisitionRequest):
 
 
 # MOUNT DASHBOARD (at root)
-app.mount("/", WSGIMiddleware(dash_app.server))
+
+class LazyDashboard:
+    """ASGI-App, die dashboard.py (Dash/Plotly) erst beim ersten Dashboard-Aufruf importiert"""
+
+    def __init__(self):
+        self._app = None
+        self._lock = asyncio.Lock()
+
+    async def load(self):
+        if self._app is None:
+            async with self._lock:
+                if self._app is None:
+                    started = time.perf_counter()
+                    # Import im Threadpool - API-Anfragen laufen währenddessen weiter
+                    dashboard = await run_in_threadpool(importlib.import_module, "dashboard")
+                    self._app = WSGIMiddleware(dashboard.app.server)
+                    print(f"[OK] Dashboard geladen ({time.perf_counter() - started:.2f}s)")
+        return self._app
+
+    async def __call__(self, scope, receive, send):
+        dashboard = await self.load()
+        await dashboard(scope, receive, send)
+
+
+if not API_ONLY:
+    app.mount("/", LazyDashboard())
+
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+
+def check_import_budget() -> bool:
+    """Importzeit gegen IMPORT_BUDGET_SECONDS prüfen; Dash darf beim Import nicht geladen werden"""
+    ok = True
+    if IMPORT_SECONDS > IMPORT_BUDGET_SECONDS:
+        print(f"[WARN] Import von main.py dauerte {IMPORT_SECONDS:.2f}s (Budget: {IMPORT_BUDGET_SECONDS:.2f}s)")
+        ok = False
+    if "dash" in sys.modules and "dashboard" not in sys.modules:
+        print("[WARN] dash wurde beim Import geladen - Dashboard wird nicht mehr lazy gemountet")
+        ok = False
+    if ok:
+        print(f"[OK] Import von main.py: {IMPORT_SECONDS:.2f}s (Budget: {IMPORT_BUDGET_SECONDS:.2f}s)")
+    return ok
 
 
 if __name__ == "__main__":
+    if "--check-import-budget" in sys.argv:
+        sys.exit(0 if check_import_budget() else 1)
+
     port = int(os.getenv("PORT", 8000))
     print(f"""
     ================================================
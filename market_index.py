@@ -0,0 +1,149 @@
+"""
+BWL Planspiel - Marktindex für GET /api/firms
+Flache Kennzahl-Zeilen je Firma (neu berechnet nur bei geändertem
+Versionsstand) und vorsortierte Schlüssel je Sortierfeld. Seiten werden
+per Keyset-Cursor (Sortwert, Firmen-ID) + bisect ausgeliefert.
+"""
+import base64
+import bisect
+import json
+from typing import Dict, List, Optional, Tuple
+
+from models import CHANGE_CLOCK, BusinessFirm, GameSession
+
+# Projektierbare Spalten: Name → Wert aus der Firma
+COLUMNS = {
+    "id": lambda f: f.id,
+    "name": lambda f: f.name,
+    "user_count": lambda f: len(f.user_names),
+    "market_share": lambda f: round(f.market_share * 100, 2),
+    "cash": lambda f: round(f.cash, 0),
+    "revenue": lambda f: round(f.revenue, 2),
+    "profit": lambda f: round(f.profit, 2),
+    "ebit": lambda f: round(f.ebit, 2),
+    "roi": lambda f: round(f.roi, 2),
+    "equity": lambda f: round(f.equity, 2),
+    "debt": lambda f: round(f.debt, 2),
+    "product_price": lambda f: round(f.product_price, 2),
+    "production_capacity": lambda f: round(f.production_capacity, 2),
+    "quality_level": lambda f: f.quality_level,
+    "units_sold": lambda f: round(f.units_sold, 2),
+    "machine_class": lambda f: f.machine_class,
+    "is_public": lambda f: f.is_public,
+    "is_bot": lambda f: f.is_bot(),
+    "enterprise_value": lambda f: round(f.enterprise_value, 2),
+}
+
+# Standard-Projektion (= bisherige Antwort von GET /api/firms)
+DEFAULT_FIELDS = ("id", "name", "user_count", "market_share", "cash")
+
+# Sortierbare (indizierte) Kennzahlen
+SORT_FIELDS = (
+    "id", "name", "market_share", "cash", "revenue", "profit", "roi",
+    "equity", "product_price", "quality_level", "enterprise_value",
+)
+
+MAX_LIMIT = 500
+
+
+def _sort_value(row: Dict, field: str):
+    value = row[field]
+    return value.lower() if isinstance(value, str) else value
+
+
+def encode_cursor(sort: str, value, firm_id: int) -> str:
+    raw = json.dumps([sort, value, firm_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, firm_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Ungültiger Cursor")
+    if cursor_sort != sort:
+        raise ValueError("Cursor gehört zu einer anderen Sortierung")
+    return value, firm_id
+
+
+class MarketIndex:
+    """Vorberechnete Firmenzeilen + Sortierreihenfolgen einer GameSession"""
+
+    def __init__(self, game: GameSession):
+        self.game = game
+        self._rows: Dict[int, Tuple[int, Dict]] = {}  # firm_id → (Versionsstand, Zeile)
+        self._orders: Dict[str, Tuple[tuple, List[tuple]]] = {}  # Sortierfeld → (Marktstand, [(Wert, id)])
+
+    def _stamp(self) -> tuple:
+        return CHANGE_CLOCK.value, len(self.game.firms)
+
+    def row(self, firm: BusinessFirm) -> Dict:
+        cached = self._rows.get(firm.id)
+        if cached is None or cached[0] != firm.version:
+            cached = (firm.version, {name: column(firm) for name, column in COLUMNS.items()})
+            self._rows[firm.id] = cached
+        return cached[1]
+
+    def order(self, field: str) -> List[tuple]:
+        """Aufsteigend sortierte Schlüssel (Sortwert, Firmen-ID) - neu nur nach Marktänderung"""
+        stamp = self._stamp()
+        cached = self._orders.get(field)
+        if cached is None or cached[0] != stamp:
+            if len(self._rows) > len(self.game.firms):
+                self._rows = {fid: entry for fid, entry in self._rows.items() if fid in self.game.firms}
+            keys = sorted((_sort_value(self.row(firm), field), firm.id) for firm in self.game.firms.values())
+            cached = (stamp, keys)
+            self._orders[field] = cached
+        return cached[1]
+
+    def page(self, fields: Optional[str] = None, sort: str = "id", limit: Optional[int] = None,
+             cursor: Optional[str] = None) -> Dict:
+        """
+        Seite der Firmenliste
+
+        Args:
+            fields: kommagetrennte Spalten (Standard: DEFAULT_FIELDS)
+            sort: Sortierfeld, "-" davor = absteigend (z.B. "-market_share")
+            limit: Zeilen pro Seite (ohne Limit: alle)
+            cursor: next_cursor der vorherigen Seite
+        """
+        projection = [name.strip() for name in fields.split(",") if name.strip()] if fields else list(DEFAULT_FIELDS)
+        unknown = [name for name in projection if name not in COLUMNS]
+        if unknown:
+            raise ValueError(f"Unbekannte Felder: {', '.join(unknown)} (erlaubt: {', '.join(COLUMNS)})")
+
+        descending = sort.startswith("-")
+        field = sort.lstrip("-")
+        if field not in SORT_FIELDS:
+            raise ValueError(f"Sortierung nur nach: {', '.join(SORT_FIELDS)}")
+        if limit is not None and not 1 <= limit <= MAX_LIMIT:
+            raise ValueError(f"limit muss zwischen 1 und {MAX_LIMIT} liegen")
+
+        keys = self.order(field)
+        if descending:
+            end = len(keys)
+            if cursor:
+                end = bisect.bisect_left(keys, tuple(decode_cursor(cursor, sort)))
+            start = 0 if limit is None else max(0, end - limit)
+            selected = keys[start:end][::-1]
+            has_more = start > 0
+        else:
+            start = 0
+            if cursor:
+                start = bisect.bisect_right(keys, tuple(decode_cursor(cursor, sort)))
+            end = len(keys) if limit is None else min(len(keys), start + limit)
+            selected = keys[start:end]
+            has_more = end < len(keys)
+
+        firms = []
+        for _, firm_id in selected:
+            row = self.row(self.game.firms[firm_id])
+            firms.append({name: row[name] for name in projection})
+
+        last = selected[-1] if selected else None
+        return {
+            "firms": firms,
+            "total": len(keys),
+            "next_cursor": encode_cursor(sort, last[0], last[1]) if has_more and last else None
+        }
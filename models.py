@@ -3,14 +3,28 @@ BWL Planspiel - Business Logic Models
 Portiert von C++ ESP32 zu Python Server
 """
 import random
+import threading
 import time
+import uuid
+from collections import deque
 from typing import Dict, List, Optional
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from datetime import datetime
 import math
 from enum import Enum
 from pydantic import BaseModel
 
+from kernel import QuarterState, QuarterOutcome, run_quarter
+from parallel import run_quarters
+from ownership import OwnershipGraph
+from orderbook import Exchange
+from valuation import ValuationEngine
+from antitrust import AntitrustScreen, enforce_regulations
+from concentration import ConcentrationIndex
+from konzern import ConsolidationEngine
+from transactions import Transaction, TransactionManager
+from loans import LoanLedger
+
 
 class MachineClass(Enum):
     """Maschinenklassen mit unterschiedlicher Qualität und Kosten"""
@@ -54,6 +68,16 @@ class JoinFirmInput(BaseModel):
 LOT_SIZE = 100  # 1 Los = 100 Einheiten
 UNITS_PER_LOT = 100
 
+# AKTIEN: Stückzahl je Firma (Aktienkurs = Preis je Stück, Orderbuch handelt Stück)
+SHARES_OUTSTANDING = 1_000_000
+
+# Kartellamt-Maßnahmen, die GameSession.kartellamt_log vorhält (Feed für Clients)
+KARTELLAMT_LOG_SIZE = 200
+
+# Kreditfelder des Quartals-Kernels (kommen aus dem Kreditbuch, nicht aus der Firma) + Wert ohne Kredit
+LOAN_TERM_FIELDS = ("loan_payments", "loan_interest", "loan_debt")
+NO_LOAN_TERMS = (0.0, 0.0, 0.0)
+
 # MASCHINEN-KAPAZITÄTEN (Lose pro Quartal)
 MACHINE_LOT_CAPACITIES = {
     "basic": 400,        # 400 Lose/Quartal = 40.000 Einheiten
@@ -62,6 +86,48 @@ MACHINE_LOT_CAPACITIES = {
 }
 
 
+# BOT-STRATEGIEN: Spannweiten der Zufallsentscheidungen je Strategie
+# price: Faktor auf Marktdurchschnittspreis, capacity: Faktor auf max. Kapazität
+# marketing/rd: (Anteil vom Cash, min, max) → min(Cash * Anteil, uniform(min, max))
+# quality: randint-Spanne (None = Marktdurchschnitt ±1), jit: Sicherheitsbestand in %
+BOT_STRATEGY_RANGES = {
+    # 15-30% über Markt, niedrige Produktion → bewusst Marktanteil abgeben
+    "KARTELLAMT_DEFENSIVE": {"price": (1.15, 1.30), "capacity": (0.60, 0.75), "marketing": (0.08, 20000, 40000),
+                             "rd": (0.15, 80000, 150000), "quality": (6, 8), "jit": (20, 30)},
+    "KARTELLAMT_CAUTIOUS": {"price": (1.05, 1.15), "capacity": (0.80, 0.90), "marketing": (0.12, 40000, 70000),
+                            "rd": (0.10, 40000, 80000), "quality": (6, 8), "jit": (18, 28)},
+    # Premium Pricing, hohe Qualität, maximale Kapazitätsauslastung
+    "MARKET_LEADER": {"price": (1.1, 1.25), "capacity": (0.95, 1.0), "marketing": (0.20, 80000, 150000),
+                      "rd": (0.12, 50000, 120000), "quality": (7, 9), "jit": (15, 25)},
+    # Niedrige Preise, maximale Kapazität
+    "AGGRESSIVE_GROWTH": {"price": (0.85, 0.95), "capacity": (0.90, 1.0), "marketing": (0.25, 60000, 100000),
+                          "rd": (0.05, 20000, 50000), "quality": (4, 6), "jit": (20, 30)},
+    # Kosten senken, nur 60-75% Auslastung
+    "SURVIVAL": {"price": (1.0, 1.1), "capacity": (0.60, 0.75), "marketing": (0.10, 10000, 30000),
+                 "rd": (0.02, 5000, 15000), "quality": (4, 5), "jit": (25, 35)},
+    # Hohe F&E für neues Produkt, reduzierte Produktion während Transition
+    "INNOVATION_FOCUS": {"price": (0.9, 1.0), "capacity": (0.70, 0.85), "marketing": (0.15, 40000, 80000),
+                         "rd": (0.20, 100000, 200000), "quality": (5, 7), "jit": (20, 30)},
+    "BALANCED": {"price": (0.95, 1.05), "capacity": (0.80, 0.95), "marketing": (0.15, 40000, 80000),
+                 "rd": (0.10, 30000, 60000), "quality": None, "jit": (18, 28)},
+}
+
+
+class ChangeClock:
+    """Prozessweite, monotone Änderungsuhr (Basis für ETags / Versionsstände)"""
+
+    def __init__(self):
+        self.value = 0
+
+    def tick(self) -> int:
+        self.value += 1
+        return self.value
+
+
+CHANGE_CLOCK = ChangeClock()
+_UNSET = object()
+
+
 class PersonnelQualification(Enum):
     """Personalqualifikationsstufen"""
     UNGELERNT = "ungelernt"  # Unskilled
@@ -183,10 +249,11 @@ class BusinessFirm:
     brand_value: float = 1_000_000.0
 
     # M&A & AKTIEN-SYSTEM (nach deutschem Modell)
-    shares: Dict[str, float] = field(default_factory=lambda: {})  # {owner_name: percentage} - Who owns shares IN this firm
-    portfolio: Dict[int, float] = field(default_factory=lambda: {})  # {firm_id: percentage} - Shares this firm owns IN other firms
+    share_units: Dict[str, float] = field(default_factory=lambda: {})  # {owner_name: Anteilseinheiten} - Cap Table dieser Firma
+    total_share_units: float = 100.0  # Bezugsgröße: Anteil (%) = Einheiten / total_share_units * 100
     is_public: bool = False  # Börsennotiert oder privat
     share_price: float = 0.0  # Aktienkurs (bei börsennotierten Firmen)
+    last_trade_price: float = 0.0  # Kurs des letzten Börsenumsatzes (0 = noch kein Handel)
     market_capitalization: float = 0.0  # Marktkapitalisierung
     enterprise_value: float = 0.0  # Unternehmenswert (für Übernahmen)
 
@@ -208,8 +275,7 @@ class BusinessFirm:
     machine_purchase_cost: float = 0.0  # Kosten für nächstes Upgrade
     machine_energy_cost_factor: float = 1.2  # Basic = 1.2 (teurer), Pro = 1.0, Premium = 0.7
 
-    # FINANZIERUNG & KREDITE
-    loans: List[Dict] = field(default_factory=list)  # [{amount, interest_rate, quarters_remaining, quarterly_payment}]
+    # FINANZIERUNG & KREDITE (laufende Kredite im Kreditbuch der Session, siehe loans.py)
     max_loan_capacity: float = 5_000_000.0  # Max Kreditlimit (basierend auf Bonität)
     credit_rating: float = 1.0  # Bonität 0.5-1.5 (beeinflusst Zinssatz)
 
@@ -260,6 +326,112 @@ class BusinessFirm:
     contribution_margin_total: float = 0.0  # Deckungsbeitrag (Revenue - Variable Costs)
     contribution_margin_per_unit: float = 0.0  # Deckungsbeitrag pro Einheit
 
+    def __setattr__(self, name, value):
+        # Versionsstand nur bei echter Wertänderung erhöhen (last_update zählt nicht)
+        if name != "last_update" and self.__dict__.get(name, _UNSET) != value:
+            object.__setattr__(self, "_version", CHANGE_CLOCK.tick())
+        object.__setattr__(self, name, value)
+
+    @property
+    def version(self) -> int:
+        """Stand der Änderungsuhr bei der letzten Änderung dieser Firma"""
+        return self.__dict__.get("_version", 0)
+
+    def touch(self):
+        """Versionsstand erhöhen nach In-place-Änderungen (z.B. user_names.append)"""
+        object.__setattr__(self, "_version", CHANGE_CLOCK.tick())
+
+    @property
+    def shares(self) -> Dict[str, float]:
+        """{owner_name: percentage} - Who owns shares IN this firm (aus der Cap Table abgeleitet)"""
+        scale = 100.0 / self.total_share_units
+        return {owner: units * scale for owner, units in self.share_units.items()}
+
+    @shares.setter
+    def shares(self, percentages: Dict[str, float]):
+        self.share_units = dict(percentages)
+        self.total_share_units = 100.0
+
+    @property
+    def portfolio(self) -> Dict[int, float]:
+        """{firm_id: percentage} - Shares this firm owns IN other firms (aus dem Beteiligungsgraph)"""
+        ownership = self.__dict__.get("_ownership")
+        return dict(ownership.direct_holdings(self.id)) if ownership is not None else {}
+
+    @property
+    def loan_ledger(self) -> LoanLedger:
+        """Kreditbuch der Session (Firmen ohne Session bekommen ein eigenes)"""
+        ledger = self.__dict__.get("_loan_ledger")
+        if ledger is None:
+            ledger = LoanLedger(capacity=1)
+            object.__setattr__(self, "_loan_ledger", ledger)
+        return ledger
+
+    @property
+    def loans(self) -> List[Dict]:
+        """[{amount, interest_rate, quarters_remaining, quarterly_payment, ...}] - aus dem Kreditbuch abgeleitet"""
+        return self.loan_ledger.loans(self.id)
+
+    def loan_terms(self) -> tuple:
+        """(fällige Raten, fällige Zinsen, Restschuld nach dem Quartal) laut Tilgungsplan"""
+        return self.loan_ledger.quarter_terms([self.id]).get(self.id, NO_LOAN_TERMS)
+
+    @property
+    def shareholder_name(self) -> str:
+        """Name, unter dem diese Firma in fremden Cap Tables geführt wird"""
+        return self.user_names[0] if self.user_names else f"Firma_{self.id}"
+
+    def held_shares(self, owner: str) -> float:
+        """Stückzahl (von SHARES_OUTSTANDING), die owner an dieser Firma hält"""
+        return self.share_units.get(owner, 0.0) / self.total_share_units * SHARES_OUTSTANDING
+
+    def share_percentage(self, quantity: float) -> float:
+        """Stückzahl → Anteil in %"""
+        return quantity / SHARES_OUTSTANDING * 100.0
+
+    def transfer_shares(self, seller: str, buyer: str, quantity: float) -> float:
+        """Börsenumsatz: quantity Stück von seller an buyer umbuchen. Returns: übertragener Anteil in %"""
+        units = quantity / SHARES_OUTSTANDING * self.total_share_units
+        remaining = self.share_units.get(seller, 0.0) - units
+        if remaining < -1e-9 * self.total_share_units:
+            raise ValueError(f"{seller} hält nicht genug Aktien")
+        if remaining > 1e-12 * self.total_share_units:
+            self.share_units[seller] = remaining
+        else:
+            self.share_units.pop(seller, None)
+        self.share_units[buyer] = self.share_units.get(buyer, 0.0) + units
+        self.touch()
+        return self.share_percentage(quantity)
+
+    def record_trade(self, price: float):
+        """Letzter Börsenumsatz bestimmt den Aktienkurs"""
+        self.last_trade_price = price
+        self.share_price = price
+        self.market_capitalization = price * SHARES_OUTSTANDING
+
+    def _issue_share_units(self, holder: str, percentage: float):
+        """
+        Neue Anteile ausgeben, die nach der Ausgabe percentage % ausmachen: die übrigen
+        Anteile im Cap Table verwässern über die Bezugsgröße (O(1), nicht einzeln);
+        Firmenbeteiligungen im Graph siehe _rescale_share_units
+        """
+        units = self.total_share_units * percentage / (100.0 - percentage)
+        self.share_units[holder] = self.share_units.get(holder, 0.0) + units
+        self._rescale_share_units(self.total_share_units + units)
+
+    def _rescale_share_units(self, total_units: float):
+        """
+        Neue Bezugsgröße setzen; Firmenbeteiligungen im Graph ändern sich im selben Schritt mit -
+        ein gemeinsames Spalten-Update der Verflechtungsmatrix (OwnershipGraph.scale_holders),
+        Kosten wie eine Anteilsänderung: O(n + betroffene Ketten), nicht O(1)
+        """
+        factor = self.total_share_units / total_units
+        self.total_share_units = total_units
+        self.touch()
+        ownership = self.__dict__.get("_ownership")
+        if ownership is not None:
+            ownership.scale_holders(self.id, factor)
+
     def calculate_max_production_capacity(self) -> float:
         """
         Berechnet maximale Produktionskapazität basierend auf:
@@ -297,6 +469,10 @@ class BusinessFirm:
 
         return max_units
 
+    def is_bot(self) -> bool:
+        """KI-Bot-Firma? (User-Name enthält "Bot")"""
+        return any("bot" in user.lower() for user in self.user_names)
+
     def get_production_in_lots(self) -> float:
         """Konvertiert aktuelle Produktionskapazität in Lose"""
         return self.production_capacity / UNITS_PER_LOT
@@ -305,393 +481,34 @@ class BusinessFirm:
         """Konvertiert Lagerbestand in Lose"""
         return self.inventory_level / UNITS_PER_LOT
 
-    def calculate_quarterly_results(self) -> Dict:
-        """Berechnet Quartalsergebnisse basierend auf Entscheidungen"""
-
-        # 1. REVENUE CALCULATION
-        # Basis-Nachfrage berechnen (Price-Elasticity: +10% Preis → -15% Absatz)
-        base_demand = self.production_capacity
-        price_factor = (100.0 / self.product_price) ** 1.5  # Elastizität
-
-        # Marketing-Effekt (logarithmische Sättigung ab 50M€)
-        marketing_factor = 1.0 + min(0.5, math.log(1 + self.marketing_budget / 1_000_000) * 0.05)
-
-        # Qualitätsprämie (Level 5 → bis +12.5% Preisaufschlag)
-        quality_premium = 1.0 + (self.quality_level / 10.0) * 0.125
-
-        effective_demand = base_demand * price_factor * marketing_factor
-        actual_sales = min(effective_demand, self.inventory_level + self.production_capacity)
-
-        # Stockout-Risiko bei niedrigem Safety Stock
-        if self.safety_stock_percentage < 0.1:
-            stockout_risk = 0.15 * (0.1 - self.safety_stock_percentage) / 0.1
-            actual_sales *= (1.0 - stockout_risk)
-
-        effective_price = self.product_price * quality_premium
-        self.revenue = actual_sales * effective_price
-
-        # 2. COST CALCULATION
-        # Variable Kosten: Material + Produktion (MIT EFFIZIENZFAKTOREN + MASCHINENKLASSE!)
-        base_material_cost_per_unit = 30.0  # €30 Material pro Einheit (Basis)
-        base_production_cost_per_unit = 20.0  # €20 Produktion pro Einheit (Basis)
-
-        # Anwenden der Effizienzfaktoren (Prozessoptimierung + Maschinenklasse)
-        material_cost_per_unit = base_material_cost_per_unit * self.material_cost_reduction
-        production_cost_per_unit = base_production_cost_per_unit * self.variable_cost_efficiency * (2.0 - self.machines_efficiency_factor)  # Bessere Maschinen = niedrigere Produktionskosten
-
-        # PERSONALKOSTEN (Variable, abhängig von Qualifikation)
-        total_personnel = self.personnel_ungelernt + self.personnel_angelernt + self.personnel_facharbeiter
-        personnel_costs = (
-            self.personnel_ungelernt * self.cost_ungelernt +
-            self.personnel_angelernt * self.cost_angelernt +
-            self.personnel_facharbeiter * self.cost_facharbeiter
-        )
-
-        # Durchschnittliche Personalproduktivität
-        if total_personnel > 0:
-            avg_productivity = (
-                self.personnel_ungelernt * self.productivity_ungelernt +
-                self.personnel_angelernt * self.productivity_angelernt +
-                self.personnel_facharbeiter * self.productivity_facharbeiter
-            ) / total_personnel
-        else:
-            avg_productivity = 1.0
-
-        # Produktionskapazität wird durch Personalproduktivität beeinflusst
-        effective_capacity = self.production_capacity * avg_productivity
-
-        # ENERGIEKOSTEN (abhängig von Maschinenklasse)
-        energy_cost_per_unit = 5.0 * self.machine_energy_cost_factor  # Basic: 6€, Pro: 5€, Premium: 3.5€
-        energy_costs = self.production_capacity * energy_cost_per_unit
-
-        variable_costs = self.production_capacity * (material_cost_per_unit + production_cost_per_unit) + energy_costs
-
-        # Lagerkosten: 2% des Lagerwerts pro Quartal
-        avg_inventory_value = (self.inventory_level * material_cost_per_unit)
-        inventory_costs = avg_inventory_value * 0.02
-
-        # Fixkosten: Abschreibungen
-        depreciation_buildings = self.buildings_value * self.buildings_depreciation_rate
-        depreciation_machines = self.machines_value * self.machines_depreciation_rate
-        depreciation_equipment = self.equipment_value * self.equipment_depreciation_rate
-        total_depreciation = depreciation_buildings + depreciation_machines + depreciation_equipment
-
-        # Gemeinkosten (Verwaltung, Vertrieb) - MIT EFFIZIENZFAKTOR
-        base_overhead_costs = 50_000.0  # 50k€ pro Quartal (REDUZIERT: Game Balance Fix)
-        overhead_costs = base_overhead_costs * self.overhead_efficiency  # Reduzierbar durch Investitionen
-
-        # KREDITZINSEN: Berechne Zinsen für alle laufenden Kredite
-        interest_costs = self.debt * 0.025  # Alte Schulden: 10% p.a. = 2.5% pro Quartal
-        loan_payments = 0.0
-        for loan in self.loans:
-            loan_payments += loan.get('quarterly_payment', 0)
-            interest_costs += loan.get('interest_payment', 0)
-
-        # Effizienz-Investitionen (einmalige Kosten dieses Quartals)
-        efficiency_investments = (
-            self.process_optimization_investment +
-            self.supplier_negotiation_investment +
-            self.overhead_reduction_investment
-        )
-
-        # Total Costs (ERWEITERT mit Personalkosten, Kreditzahlungen, Innovation)
-        total_costs = (
-            variable_costs +
-            inventory_costs +
-            total_depreciation +
-            overhead_costs +
-            personnel_costs +  # NEUE KOSTEN: Personal
-            self.marketing_budget +
-            self.rd_budget +
-            interest_costs +
-            loan_payments +  # NEUE KOSTEN: Kredittilgung
-            efficiency_investments +  # Einmalige Investitionen
-            self.innovation_investment  # NEUE KOSTEN: Produktinnovation
-        )
-
-        # 3. PROFIT CALCULATION
-        gross_profit = self.revenue - variable_costs
-        ebit = gross_profit - overhead_costs - personnel_costs - total_depreciation - self.marketing_budget - self.rd_budget
-        ebt = ebit - interest_costs  # Earnings Before Tax
-
-        # Steuern (33.33% = 1/3)
-        taxes = max(0, ebt * 0.3333)
-        net_profit = ebt - taxes
-
-        self.profit = net_profit
-        self.ebit = ebit
-        self.units_sold = actual_sales
-
-        # Store cost breakdown for transparency (UMFASSEND ERWEITERT)
-        self.cost_breakdown = {
-            "variable": variable_costs,
-            "energy": energy_costs,
-            "inventory": inventory_costs,
-            "depreciation": total_depreciation,
-            "depreciation_buildings": depreciation_buildings,
-            "depreciation_machines": depreciation_machines,
-            "depreciation_equipment": depreciation_equipment,
-            "overhead": overhead_costs,
-            "personnel": personnel_costs,
-            "personnel_ungelernt": self.personnel_ungelernt * self.cost_ungelernt,
-            "personnel_angelernt": self.personnel_angelernt * self.cost_angelernt,
-            "personnel_facharbeiter": self.personnel_facharbeiter * self.cost_facharbeiter,
-            "marketing": self.marketing_budget,
-            "rd": self.rd_budget,
-            "interest": interest_costs,
-            "loan_payments": loan_payments,
-            "innovation": self.innovation_investment,
-            "efficiency_investments": efficiency_investments,
-            "total": total_costs
-        }
-
-        # DECKUNGSBEITRAG (Contribution Margin Calculation)
-        self.variable_costs_total = variable_costs + energy_costs + personnel_costs
-        self.fixed_costs_total = total_depreciation + overhead_costs + self.marketing_budget + self.rd_budget + interest_costs
-        self.contribution_margin_total = self.revenue - self.variable_costs_total
-        if actual_sales > 0:
-            self.contribution_margin_per_unit = self.contribution_margin_total / actual_sales
-        else:
-            self.contribution_margin_per_unit = 0.0
-
-        # 3.5 CALCULATE ALL BWL KENNZAHLEN (Business Metrics)
-
-        # EBITDA (EBIT + Depreciation)
-        self.ebitda = ebit + total_depreciation
-
-        # Profitability Ratios (Rentabilitätskennzahlen)
-        if self.revenue > 0:
-            self.gross_margin = (gross_profit / self.revenue) * 100  # in %
-            self.operating_margin = (ebit / self.revenue) * 100  # in %
-            self.net_margin = (net_profit / self.revenue) * 100  # in %
-            self.contribution_margin = ((self.revenue - variable_costs) / self.revenue) * 100  # in %
-        else:
-            self.gross_margin = 0.0
-            self.operating_margin = 0.0
-            self.net_margin = 0.0
-            self.contribution_margin = 0.0
-
-        # Efficiency Ratios (Effizienzkennzahlen)
-        total_assets = self.cash + self.buildings_value + self.machines_value + self.equipment_value
-        if total_assets > 0:
-            self.asset_turnover = self.revenue / total_assets  # Kapitalumschlag
-            self.roa = (net_profit / total_assets) * 100  # Return on Assets in %
-        else:
-            self.asset_turnover = 0.0
-            self.roa = 0.0
-
-        # Inventory Turnover (Lagerumschlag)
-        avg_inventory = (self.inventory_level + (self.inventory_level + self.production_capacity - actual_sales)) / 2
-        if avg_inventory > 0:
-            cogs = variable_costs  # Cost of Goods Sold
-            self.inventory_turnover = cogs / (avg_inventory * material_cost_per_unit)
-        else:
-            self.inventory_turnover = 0.0
-
-        # Capacity Utilization (Kapazitätsauslastung)
-        max_capacity = 120_000.0  # Maximum production capacity
-        if max_capacity > 0:
-            self.capacity_utilization = (self.production_capacity / max_capacity) * 100  # in %
-        else:
-            self.capacity_utilization = 0.0
-
-        # Leverage Ratios (Verschuldungskennzahlen)
-        if self.equity > 0:
-            self.debt_to_equity = self.debt / self.equity
-            self.roe = (net_profit / self.equity) * 100  # Return on Equity in %
-        else:
-            self.debt_to_equity = 0.0
-            self.roe = 0.0
-
-        if total_assets > 0:
-            self.equity_ratio = (self.equity / total_assets) * 100  # Eigenkapitalquote in %
-            self.debt_ratio = (self.debt / total_assets) * 100  # Fremdkapitalquote in %
-        else:
-            self.equity_ratio = 0.0
-            self.debt_ratio = 0.0
-
-        if interest_costs > 0:
-            self.interest_coverage = ebit / interest_costs  # Zinsdeckungsgrad
-        else:
-            self.interest_coverage = float('inf') if ebit > 0 else 0.0
-
-        # Growth Metrics (Wachstumskennzahlen) - compare to previous quarter
-        if self.prev_revenue > 0:
-            self.revenue_growth = ((self.revenue - self.prev_revenue) / self.prev_revenue) * 100
-        else:
-            self.revenue_growth = 0.0
-
-        if self.prev_profit != 0:
-            self.profit_growth = ((net_profit - self.prev_profit) / abs(self.prev_profit)) * 100
-        else:
-            self.profit_growth = 0.0 if net_profit == 0 else 100.0
-
-        if self.prev_market_share > 0:
-            self.market_share_growth = ((self.market_share - self.prev_market_share) / self.prev_market_share) * 100
-        else:
-            self.market_share_growth = 0.0
-
-        # Update previous quarter values for next calculation
-        self.prev_revenue = self.revenue
-        self.prev_profit = net_profit
-        self.prev_market_share = self.market_share
-
-        # 3.5 EFFICIENCY IMPROVEMENTS basierend auf Investitionen
-        # Prozessoptimierung: €2M → -5% variable Kosten (max -20%)
-        if self.process_optimization_investment >= 2_000_000:
-            self.variable_cost_efficiency = max(0.8, self.variable_cost_efficiency - 0.05)
-            self.process_optimization_investment = 0  # Investment verbraucht
-
-        # Lieferantenverhandlungen: €1.5M → -5% Materialkosten (max -30%)
-        if self.supplier_negotiation_investment >= 1_500_000:
-            self.material_cost_reduction = max(0.7, self.material_cost_reduction - 0.05)
-            self.supplier_negotiation_investment = 0  # Investment verbraucht
-
-        # Verwaltungsoptimierung: €1M → -10% Overhead (max -50%)
-        if self.overhead_reduction_investment >= 1_000_000:
-            self.overhead_efficiency = max(0.5, self.overhead_efficiency - 0.10)
-            self.overhead_reduction_investment = 0  # Investment verbraucht
-
-        # 3.6 PRODUKTLEBENSZYKLUS (Product Lifecycle Management)
-        self.product_age_quarters += 1
-
-        # Produktinnovation: €5M → neues Produkt (Generation++)
-        if self.innovation_investment >= 5_000_000:
-            self.product_innovation_level += 1
-            self.product_age_quarters = 0
-            self.product_lifecycle_stage = "introduction"
-            self.innovation_investment = 0
-
-        # Automatische Lifecycle-Übergänge
-        if self.product_age_quarters <= 4:
-            self.product_lifecycle_stage = "introduction"
-        elif self.product_age_quarters <= 12:
-            self.product_lifecycle_stage = "growth"
-        elif self.product_age_quarters <= 24:
-            self.product_lifecycle_stage = "maturity"
-        else:
-            self.product_lifecycle_stage = "decline"
-
-        # Lifecycle-Effekte auf Nachfrage (multiplicativ)
-        lifecycle_demand_factor = {
-            "introduction": 0.7,  # 70% Nachfrage (Markteinführung schwierig)
-            "growth": 1.3,  # 130% Nachfrage (Wachstumsphase)
-            "maturity": 1.0,  # 100% Nachfrage (stabile Phase)
-            "decline": 0.6  # 60% Nachfrage (Produkt veraltet)
-        }
-        # Anwendung des Lifecycle-Faktors auf zukünftige Berechnungen
-        # (wird im nächsten Quartal wirksam)
-
-        # 3.7 KREDITABWICKLUNG (Loan Processing)
-        loans_to_remove = []
-        for i, loan in enumerate(self.loans):
-            # Tilgung der Laufzeit
-            loan['quarters_remaining'] -= 1
-
-            # Berechne Zinszahlung
-            quarterly_interest_rate = loan['interest_rate'] / 4.0  # p.a. → pro Quartal
-            interest_payment = loan['amount'] * quarterly_interest_rate
-            loan['interest_payment'] = interest_payment
-
-            # Berechne Tilgung
-            if loan['quarters_remaining'] > 0:
-                principal_payment = loan['amount'] / (loan['quarters_remaining'] + 1)
-                loan['quarterly_payment'] = principal_payment + interest_payment
-                loan['amount'] -= principal_payment
-            else:
-                # Kredit abbezahlt
-                loans_to_remove.append(i)
-
-        # Entferne abbezahlte Kredite
-        for i in reversed(loans_to_remove):
-            del self.loans[i]
-
-        # Update total debt
-        self.debt = sum(loan['amount'] for loan in self.loans)
-
-        # 3.8 LIQUIDITÄTSKENNZAHLEN (Liquidity Ratios nach BWL-Vorlesung)
-        # Kurzfristige Verbindlichkeiten = Quartalszahlungen + kleine Kredite
-        self.current_liabilities = loan_payments + overhead_costs + personnel_costs
-
-        if self.current_liabilities > 0:
-            # Liquidität 1. Grades (Barliquidität): Cash / kurzfr. Verbindlichkeiten
-            self.liquidity_1 = self.cash / self.current_liabilities
-
-            # Liquidität 2. Grades: (Cash + Forderungen) / kurzfr. Verbindlichkeiten
-            # Vereinfacht: Cash + 50% Inventory Value
-            receivables = self.inventory_level * material_cost_per_unit * 0.5
-            self.liquidity_2 = (self.cash + receivables) / self.current_liabilities
-
-            # Liquidität 3. Grades: (Cash + Forderungen + Vorräte) / kurzfr. Verbindlichkeiten
-            inventory_value = self.inventory_level * material_cost_per_unit
-            self.liquidity_3 = (self.cash + receivables + inventory_value) / self.current_liabilities
-        else:
-            self.liquidity_1 = float('inf')
-            self.liquidity_2 = float('inf')
-            self.liquidity_3 = float('inf')
-
-        # 3.9 BILANZ-KOMPONENTEN UPDATE (Balance Sheet Components)
-        self.current_assets = self.cash + (self.inventory_level * material_cost_per_unit)
-        self.fixed_assets = self.buildings_value + self.machines_value + self.equipment_value
-        self.long_term_liabilities = self.debt
-        self.total_revenue = self.revenue
-        self.total_costs = total_costs
-        self.net_income = net_profit
-        self.retained_earnings += net_profit  # Kumuliere Gewinne/Verluste für Bilanz
-
-        # 4. UPDATE CASH & INVENTORY
-        self.cash += net_profit
-        self.inventory_level = max(0, self.inventory_level + self.production_capacity - actual_sales)
-
-        # 5. UPDATE ASSETS (Abschreibung)
-        self.buildings_value -= depreciation_buildings
-        self.machines_value -= depreciation_machines
-        self.equipment_value -= depreciation_equipment
-
-        # 6. CALCULATE ROI
-        total_assets = self.cash + self.buildings_value + self.machines_value + self.equipment_value
-        if total_assets > 0:
-            self.roi = (ebit / total_assets) * 100  # ROI in %
-
-        # 7. UPDATE QUALITY (F&E Investment)
-        if self.rd_budget > 0:
-            # Level 6 kostet €12M
-            cost_per_level = 12_000_000.0
-            if self.rd_budget >= cost_per_level and self.quality_level < 10:
-                self.quality_level += 1
-                self.rd_budget -= cost_per_level
+    def quarter_state(self, loan_terms: Optional[tuple] = None) -> QuarterState:
+        """
+        Unveränderlicher Snapshot aller Felder, die der Quartals-Kernel braucht
 
-        self.current_quarter += 1
+        loan_terms: (Raten, Zinsen, Restschuld) aus LoanLedger.quarter_terms - ohne
+        Angabe wird der Tilgungsplan dieser Firma einzeln gelesen
+        """
+        values = {f.name: getattr(self, f.name) for f in fields(QuarterState) if f.name not in LOAN_TERM_FIELDS}
+        values.update(zip(LOAN_TERM_FIELDS, loan_terms if loan_terms is not None else self.loan_terms()))
+        return QuarterState(**values)
+
+    def apply_quarter_outcome(self, outcome: QuarterOutcome):
+        """Übernimmt Folgezustand + Kostenaufschlüsselung des Kernels in die Firma (Kredite rückt das Kreditbuch vor)"""
+        for f in fields(QuarterState):
+            if f.name not in LOAN_TERM_FIELDS:
+                setattr(self, f.name, getattr(outcome.state, f.name))
+        self.cost_breakdown = dict(outcome.cost_breakdown)
         self.last_update = time.time()
 
         # Aktualisiere Unternehmenswert
         self.calculate_enterprise_value()
 
-        return {
-            "quarter": self.current_quarter,
-            "revenue": self.revenue,
-            "profit": net_profit,
-            "ebit": ebit,
-            "cash": self.cash,
-            "inventory": self.inventory_level,
-            "roi": self.roi,
-            "market_share": self.market_share,
-            "costs": {
-                "variable": variable_costs,
-                "inventory": inventory_costs,
-                "depreciation": total_depreciation,
-                "overhead": overhead_costs,
-                "marketing": self.marketing_budget,
-                "rd": self.rd_budget,
-                "interest": interest_costs,
-                "total": total_costs
-            },
-            "sales": {
-                "units_sold": actual_sales,
-                "effective_price": effective_price,
-                "quality_premium": quality_premium
-            }
-        }
+    def calculate_quarterly_results(self) -> Dict:
+        """Berechnet Quartalsergebnisse basierend auf Entscheidungen (Kernel: kernel.run_quarter)"""
+        outcome = run_quarter(self.quarter_state())
+        self.apply_quarter_outcome(outcome)
+        self.loan_ledger.advance([self.id])
+        return outcome.result()
 
     def apply_decisions(self, price: float, capacity: float, marketing: float,
                        rd: float, quality: int, jit_safety: float,
@@ -748,12 +565,10 @@ class BusinessFirm:
 
         self.enterprise_value = max(0, enterprise_value)
 
-        # Aktienkurs berechnen (falls börsennotiert)
+        # Aktienkurs berechnen (falls börsennotiert): letzter Börsenumsatz, sonst Unternehmenswert je Aktie
         if self.is_public:
-            # Annahme: 1 Million Aktien ausgegeben
-            total_shares = 1_000_000
-            self.share_price = self.enterprise_value / total_shares
-            self.market_capitalization = self.enterprise_value
+            self.share_price = self.last_trade_price or self.enterprise_value / SHARES_OUTSTANDING
+            self.market_capitalization = self.share_price * SHARES_OUTSTANDING
 
         return self.enterprise_value
 
@@ -788,24 +603,9 @@ class BusinessFirm:
             return False, f"Nicht genug Bargeld. Benötigt: €{acquisition_price:,.0f}, Verfügbar: €{acquirer_firm.cash:,.0f}"
 
         # 3. KARTELLAMT-PRÜFUNG (deutsches Modell)
-        # GWB §35-39: Fusionskontrolle
-
-        # Berechne neuen Marktanteil nach Übernahme
-        combined_market_share = acquirer_firm.market_share + (self.market_share * percentage / 100.0)
-
-        # Schwelle 1: >25% Marktanteil = Vermutung marktbeherrschender Stellung
-        if combined_market_share > 0.25:
-            return False, f"⚖️ KARTELLAMT: Übernahme untersagt! Kombinierter Marktanteil würde {combined_market_share*100:.1f}% betragen (>25% Schwelle)"
-
-        # Schwelle 2: Prüfe ob Top-3 Firmen zusammen >50% haben würden
-        # (vereinfachte Prüfung für oligopolistische Marktstrukturen)
-        market_overview = game_session.get_market_overview()
-        top_3_market_share = sum(f['market_share'] for f in market_overview[:3]) / 100.0
-
-        if top_3_market_share > 0.50 and acquirer_firm.market_share in [f['market_share']/100.0 for f in market_overview[:3]]:
-            return False, "⚖️ KARTELLAMT: Übernahme untersagt! Oligopolbildung verhindert (Top-3 hätten >50% Marktanteil)"
-
-        return True, "Übernahme kartellrechtlich zulässig"
+        # GWB §35-39: Fusionskontrolle - >25% kombinierter Marktanteil oder Oligopol (Top-3 >50%)
+        # Vorberechnete, sortierte Marktanteile je Marktstand (antitrust.py)
+        return game_session.antitrust.check(acquirer_firm, self, percentage)
 
     def acquire_shares(self, acquirer_firm: 'BusinessFirm', percentage: float, game_session: 'GameSession') -> tuple[bool, str]:
         """
@@ -818,49 +618,51 @@ class BusinessFirm:
 
         # Berechne Kaufpreis
         acquisition_price = self.calculate_acquisition_price(percentage)
-
-        # Transaktion durchführen
-        acquirer_firm.cash -= acquisition_price
-
-        # Aktien übertragen
-        acquirer_name = acquirer_firm.user_names[0] if acquirer_firm.user_names else f"Firma_{acquirer_firm.id}"
-
-        if acquirer_name not in acquirer_firm.shares:
-            acquirer_firm.shares[acquirer_name] = 0.0
-
-        # Übernehme Anteile vom ersten Eigentümer (vereinfacht)
-        if self.shares:
-            first_owner = list(self.shares.keys())[0]
-            if self.shares[first_owner] >= percentage:
-                self.shares[first_owner] -= percentage
-                if self.shares[first_owner] <= 0:
-                    del self.shares[first_owner]
-            else:
-                return False, "Nicht genug Anteile verfügbar"
-        else:
-            # Firma hat keine definierten Eigentümer - gehört sich selbst
-            pass
-
-        # Füge Käufer als neuen Eigentümer hinzu
-        if acquirer_name not in self.shares:
-            self.shares[acquirer_name] = 0.0
-        self.shares[acquirer_name] += percentage
-
-        # PORTFOLIO TRACKING: Track shares acquirer owns in this firm
-        if self.id not in acquirer_firm.portfolio:
-            acquirer_firm.portfolio[self.id] = 0.0
-        acquirer_firm.portfolio[self.id] += percentage
-
-        # Check if 100% ownership achieved
-        ownership_status = ""
-        if acquirer_firm.portfolio[self.id] >= 100.0:
-            ownership_status = " [100% EIGENTUM - VOLLSTÄNDIGE ÜBERNAHME]"
-
-        # Cash geht an die Firma (bei Kapitalerhöhung) oder an Altaktionäre (bei Anteilsverkauf)
-        # Hier: Vereinfacht - Cash geht direkt an die Ziel-Firma
-        self.cash += acquisition_price * 0.7  # 70% gehen an Firma, 30% Transaktionskosten/Steuern
-
-        return True, f"Übernahme erfolgreich! {percentage}% Anteile für €{acquisition_price:,.0f} erworben{ownership_status}"
+        acquirer_name = acquirer_firm.shareholder_name
+        units = percentage / 100.0 * self.total_share_units
+        ownership = game_session.ownership
+
+        def take_units(share_units: Dict[str, float]) -> Dict[str, float]:
+            # Übernehme Anteile vom ersten Eigentümer (vereinfacht)
+            share_units = dict(share_units)
+            if share_units:
+                first_owner = next(iter(share_units))
+                if share_units[first_owner] < units:
+                    raise ValueError("Nicht genug Anteile verfügbar")
+                share_units[first_owner] -= units
+                if share_units[first_owner] <= 0:
+                    del share_units[first_owner]
+            # (ohne definierte Eigentümer gehört die Firma sich selbst)
+            share_units[acquirer_name] = share_units.get(acquirer_name, 0.0) + units
+            return share_units
+
+        def outcome() -> str:
+            ownership_status = ""
+            if ownership.direct_holdings(acquirer_firm.id).get(self.id, 0.0) >= 100.0:
+                ownership_status = " [100% EIGENTUM - VOLLSTÄNDIGE ÜBERNAHME]"
+            return f"Übernahme erfolgreich! {percentage}% Anteile für €{acquisition_price:,.0f} erworben{ownership_status}"
+
+        # Transaktion: Zahlung, Aktienübertrag und Beteiligung atomar (transactions.py)
+        transaction = (
+            Transaction("acquire_shares")
+            .require(lambda: acquirer_firm.cash >= acquisition_price,
+                     lambda: f"Nicht genug Bargeld. Benötigt: €{acquisition_price:,.0f}, Verfügbar: €{acquirer_firm.cash:,.0f}")
+            .add(acquirer_firm, "cash", -acquisition_price)
+            .update(acquirer_firm, "share_units",
+                    lambda share_units: share_units if acquirer_name in share_units else {**share_units, acquirer_name: 0.0})
+            .update(self, "share_units", take_units)
+            # Cash geht an die Firma (bei Kapitalerhöhung) oder an Altaktionäre (bei Anteilsverkauf)
+            # Hier: Vereinfacht - 70% gehen an die Ziel-Firma, 30% Transaktionskosten/Steuern
+            .add(self, "cash", acquisition_price * 0.7)
+            # PORTFOLIO TRACKING: Beteiligung der Käuferfirma im Beteiligungsgraph (= acquirer_firm.portfolio)
+            .step(lambda: ownership.add_stake(acquirer_firm.id, self.id, percentage),
+                  lambda: ownership.add_stake(acquirer_firm.id, self.id, -percentage))
+            .returning(outcome)
+        )
+        try:
+            return True, game_session.transactions.submit(transaction)
+        except ValueError as e:
+            return False, str(e)
 
     def process_bankruptcy(self, game_session: 'GameSession') -> Dict:
         """
@@ -960,6 +762,20 @@ class BusinessFirm:
 
         return True, f"Maschinen erfolgreich zu {target_class} upgraded für €{upgrade_info['cost']:,.0f}"
 
+    def invest_in_innovation(self, amount: float) -> tuple[bool, str]:
+        """
+        Investiert in Produktinnovation (Cash → innovation_investment)
+
+        Returns: (success, message)
+        """
+        if self.cash < amount:
+            return False, f"Nicht genug Cash. Verfügbar: €{self.cash:,.0f}"
+
+        self.cash -= amount
+        self.innovation_investment += amount
+
+        return True, f"€{amount:,.0f} in Innovation investiert"
+
     def take_loan(self, amount: float, quarters: int = 12) -> tuple[bool, str]:
         """
         Nimmt Kredit auf
@@ -970,8 +786,13 @@ class BusinessFirm:
 
         Returns: (success, message)
         """
+        # Unter dem Lock des Kreditbuchs (= Session-Lock): nie zwischen Raten-Auslesen und Vorrücken im Quartalsabschluss
+        with self.loan_ledger.lock:
+            return self._take_loan(amount, quarters)
+
+    def _take_loan(self, amount: float, quarters: int) -> tuple[bool, str]:
         # WICHTIG: Nur ein Kredit gleichzeitig erlaubt
-        if len(self.loans) > 0:
+        if self.loan_ledger.has_loans(self.id):
             return False, f"Du hast bereits einen laufenden Kredit! Zahle ihn zuerst ab."
 
         # Prüfe Kreditlimit
@@ -986,17 +807,8 @@ class BusinessFirm:
         interest_rate = base_interest_rate / self.credit_rating
         interest_rate = min(0.25, max(0.05, interest_rate))  # 5-25% p.a.
 
-        # Erstelle Kredit
-        loan = {
-            "amount": amount,
-            "original_amount": amount,
-            "interest_rate": interest_rate,
-            "quarters_remaining": quarters,
-            "quarterly_payment": 0,  # Wird in calculate_quarterly_results berechnet
-            "interest_payment": 0
-        }
-
-        self.loans.append(loan)
+        # Erstelle Kredit samt Tilgungsplan (erste Rate wird im übernächsten Quartalsabschluss fällig)
+        self.loan_ledger.add(self.id, amount, interest_rate, quarters, self.current_quarter)
         self.cash += amount
         self.debt += amount
 
@@ -1141,9 +953,10 @@ class BusinessFirm:
             self.equity += amount
             self.is_public = True
 
-            # Gründer behält 70%, neue Investoren bekommen 30%
-            founder = list(self.shares.keys())[0] if self.shares else "Founder"
-            self.shares = {founder: 70.0, "Public_Investors": 30.0}
+            # Neue Investoren bekommen 30%, bisherige Eigentümer behalten anteilig 70%
+            if not self.share_units:
+                self.share_units = {"Founder": self.total_share_units}
+            self._issue_share_units("Public_Investors", 30.0)
 
             self.calculate_enterprise_value()
 
@@ -1160,12 +973,8 @@ class BusinessFirm:
             self.cash += amount
             self.equity += amount
 
-            # Bestehende Anteile werden verwässert (simplified)
-            dilution_factor = 0.9  # 10% Verwässerung
-            for shareholder in self.shares:
-                self.shares[shareholder] *= dilution_factor
-
-            self.shares["New_Investors"] = self.shares.get("New_Investors", 0) + 10.0
+            # Neue Investoren +10%, bestehende Anteile werden um 10% verwässert (simplified)
+            self._issue_share_units("New_Investors", 10.0)
 
             self.calculate_enterprise_value()
 
@@ -1183,7 +992,7 @@ class BusinessFirm:
         public_shares = 0.0
         public_shareholders = []
 
-        for shareholder, percentage in list(self.shares.items()):
+        for shareholder, percentage in self.shares.items():
             if shareholder in ["Public_Investors", "New_Investors"]:
                 public_shares += percentage
                 public_shareholders.append(shareholder)
@@ -1212,18 +1021,17 @@ class BusinessFirm:
 
         # Entferne öffentliche Aktionäre
         for shareholder in public_shareholders:
-            del self.shares[shareholder]
+            del self.share_units[shareholder]
 
-        # Normalisiere verbleibende Anteile auf 100%
-        if self.shares:
-            remaining_total = sum(self.shares.values())
-            if remaining_total > 0:
-                for shareholder in self.shares:
-                    self.shares[shareholder] = (self.shares[shareholder] / remaining_total) * 100.0
+        # Verbleibende Anteile ergeben wieder 100% (neue Bezugsgröße statt Einzel-Normalisierung)
+        remaining_units = sum(self.share_units.values())
+        if remaining_units > 0:
+            self._rescale_share_units(remaining_units)
 
         # Delisting
         self.is_public = False
         self.share_price = 0.0
+        self.last_trade_price = 0.0
         self.market_capitalization = 0.0
 
         return True, f"Rückkauf erfolgreich! {public_shares:.1f}% für €{buyback_price:,.0f} zurückgekauft (Kosten: €{transaction_costs:,.0f}). Firma ist jetzt privat"
@@ -1486,6 +1294,32 @@ class GameSession:
         self.quarter_start_time: float = time.time()
         self.is_active: bool = False
         self.next_firm_id: int = 1
+        self.firms_version: int = 0  # Stand der Firmenmenge (neue Firma, Insolvenz, Asset Deal)
+        self.tick_workers: int = 0  # >1 → Quartalsabschluss im Prozess-Pool (parallel.py)
+        self.epoch: str = uuid.uuid4().hex[:8]  # Session-Kennung (ETags bleiben nach Neustart eindeutig)
+        self.ownership = OwnershipGraph()  # Beteiligungen zwischen Firmen (direkt + durchgerechnet)
+        self.exchange = Exchange(self)  # Orderbücher der börsennotierten Firmen
+        self.valuations = ValuationEngine(self)  # Bewertungen je Firmen-Versionsstand (M&A-Routen, Dashboard)
+        self.antitrust = AntitrustScreen(self)  # Kartellamt-Vorprüfung über sortierte Marktanteile
+        self.concentration = ConcentrationIndex()  # HHI, CR4/CR8 - mitgeführt bei jeder Marktanteilsänderung
+        self.konzern = ConsolidationEngine(self)  # Konzernabschlüsse, Bausteine je Quartal + Beteiligungsstand
+        self.kartellamt_actions: List[Dict] = []  # Kartellamt-Maßnahmen des letzten Quartalsabschlusses
+        self.kartellamt_log: deque = deque(maxlen=KARTELLAMT_LOG_SIZE)  # Maßnahmen-Feed über mehrere Quartale
+        self.lock = threading.RLock()  # Quartalsabschluss und Transaktionen (Übernahmen) schließen sich aus
+        self.transactions = TransactionManager(self.lock)  # atomare Änderungen über mehrere Firmen
+        self.loan_ledger = LoanLedger(lock=self.lock)  # Kredite aller Firmen mit vorberechneten Tilgungsplänen
+
+    def __getstate__(self):
+        # Snapshots für Replikate (state_service.py): Lock und Transaktions-Warteschlange bleiben im Prozess
+        state = self.__dict__.copy()
+        del state["lock"], state["transactions"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+        self.transactions = TransactionManager(self.lock)
+        self.loan_ledger.lock = self.lock
 
     def create_firm(self, firm_name: str, user_name: str, is_public: bool = False) -> BusinessFirm:
         """Erstellt eine neue Firma mit Aktien-Initialisierung"""
@@ -1498,14 +1332,27 @@ class GameSession:
 
         # AKTIEN-INITIALISIERUNG: Gründer erhält 100% der Anteile
         firm.shares = {user_name: 100.0}
+        object.__setattr__(firm, "_ownership", self.ownership)  # portfolio + Verwässerung über den Graph
+        object.__setattr__(firm, "_loan_ledger", self.loan_ledger)  # Kredite im Kreditbuch der Session
 
         # Berechne initialen Unternehmenswert
         firm.calculate_enterprise_value()
 
         self.firms[firm.id] = firm
+        self.firms_version += 1
+        self.concentration.update(firm.id, firm.market_share)
         self.next_firm_id += 1
         return firm
 
+    def remove_firm(self, firm_id: int):
+        """Firma verlässt das Spiel (Insolvenz, Asset Deal): Beteiligungen, Orders, Kredite und Marktkonzentration mitführen"""
+        self.ownership.remove_firm(firm_id)
+        self.loan_ledger.remove_firm(firm_id)
+        self.exchange.remove_firm(firm_id)
+        self.concentration.remove(firm_id)
+        del self.firms[firm_id]
+        self.firms_version += 1
+
     def get_firm_by_id(self, firm_id: int) -> Optional[BusinessFirm]:
         """Holt Firma nach ID"""
         return self.firms.get(firm_id)
@@ -1525,6 +1372,7 @@ class GameSession:
         if user_name in firm.user_names:
             return False  # User bereits in Firma
         firm.user_names.append(user_name)
+        firm.touch()
         return True
 
     def get_time_until_next_quarter(self) -> int:
@@ -1537,95 +1385,30 @@ class GameSession:
         """Prüft ob Quartal vorbei ist"""
         return time.time() - self.quarter_start_time >= self.quarter_duration
 
-    def enforce_kartellamt_regulations(self):
+    def enforce_kartellamt_regulations(self) -> List[Dict]:
         """
         Kartellamt (Antitrust Authority) enforcement to prevent market dominance
         - Fines for dominant firms
         - Forced price reductions
         - Support for smaller firms
-        - Potential forced divestitures
-        """
-        if not self.firms:
-            return
+        - Forced divestitures (capacity)
 
-        # Thresholds for intervention
-        WARNING_THRESHOLD = 0.30    # 30% market share
-        PENALTY_THRESHOLD = 0.40    # 40% market share
-        CRITICAL_THRESHOLD = 0.50   # 50% market share
-
-        kartellamt_actions = []
-
-        for firm in self.firms.values():
-            if firm.market_share < WARNING_THRESHOLD:
-                # Small firms get subsidies to help competition
-                if firm.market_share < 0.10 and firm.profit < 0:  # Struggling small firms
-                    subsidy = min(50000, abs(firm.profit) * 0.5)
-                    firm.cash += subsidy
-                    kartellamt_actions.append(f"Mittelstandsförderung: {firm.name} erhält €{subsidy:,.0f} Subvention")
-                continue
-
-            # WARNING LEVEL: 30-40% market share
-            if WARNING_THRESHOLD <= firm.market_share < PENALTY_THRESHOLD:
-                warning_fine = firm.revenue * 0.02  # 2% of revenue
-                firm.cash -= warning_fine
-                kartellamt_actions.append(
-                    f"[WARNUNG] Kartellamt: {firm.name} (Marktanteil {firm.market_share*100:.1f}%) - Warnung + €{warning_fine:,.0f} Bußgeld"
-                )
-
-            # PENALTY LEVEL: 40-50% market share
-            elif PENALTY_THRESHOLD <= firm.market_share < CRITICAL_THRESHOLD:
-                # Heavy fines
-                penalty_fine = firm.revenue * 0.05  # 5% of revenue
-                firm.cash -= penalty_fine
-
-                # Force price reduction to help competitors
-                if firm.price > 80:
-                    old_price = firm.price
-                    firm.price = max(80, firm.price * 0.90)  # 10% price reduction, minimum 80
-                    kartellamt_actions.append(
-                        f"[STRAFE] Kartellamt: {firm.name} (Marktanteil {firm.market_share*100:.1f}%) - €{penalty_fine:,.0f} Strafe + Preissenkung €{old_price:.2f} -> €{firm.price:.2f}"
-                    )
-                else:
-                    kartellamt_actions.append(
-                        f"[STRAFE] Kartellamt: {firm.name} (Marktanteil {firm.market_share*100:.1f}%) - €{penalty_fine:,.0f} Strafe"
-                    )
-
-            # CRITICAL LEVEL: 50%+ market share
-            elif firm.market_share >= CRITICAL_THRESHOLD:
-                # Extreme penalties
-                critical_fine = firm.revenue * 0.10  # 10% of revenue
-                firm.cash -= critical_fine
-
-                # Forced price reduction
-                if firm.price > 75:
-                    old_price = firm.price
-                    firm.price = max(75, firm.price * 0.85)  # 15% price reduction, maximum 75
-
-                # Forced capacity reduction (simulate divestiture)
-                if firm.machines > 5:
-                    machines_to_remove = max(1, int(firm.machines * 0.10))  # Remove 10% of machines
-                    firm.machines -= machines_to_remove
-                    firm.max_capacity = firm.machines * 100
-
-                    kartellamt_actions.append(
-                        f"[ZERSCHLAGUNG] KARTELLAMT: {firm.name} (Marktanteil {firm.market_share*100:.1f}%) - €{critical_fine:,.0f} Strafe + Preissenkung €{old_price:.2f} -> €{firm.price:.2f} + Zwangsverkauf von {machines_to_remove} Maschinen"
-                    )
-                else:
-                    kartellamt_actions.append(
-                        f"[ZERSCHLAGUNG] KARTELLAMT: {firm.name} (Marktanteil {firm.market_share*100:.1f}%) - €{critical_fine:,.0f} Strafe + Preissenkung"
-                    )
-
-        # Print all enforcement actions
-        if kartellamt_actions:
-            print("\n" + "="*80)
-            print("KARTELLAMT QUARTALSBERICHT")
-            print("="*80)
-            for action in kartellamt_actions:
-                print(f"  {action}")
-            print("="*80 + "\n")
+        Vektorisiert über alle Firmen (antitrust.enforce_regulations); die Maßnahmen
+        des Quartals stehen danach in kartellamt_actions und im kartellamt_log.
+        """
+        actions = enforce_regulations(list(self.firms.values()), self.current_quarter)
+        self.kartellamt_actions = actions
+        self.kartellamt_log.extend(actions)
+        if actions:
+            print(f"⚖️ KARTELLAMT: {len(actions)} Maßnahmen in Quartal {self.current_quarter}")
+        return actions
 
     def advance_quarter(self):
-        """Führt Quartalsabschluss für alle Firmen durch"""
+        """Führt Quartalsabschluss für alle Firmen durch (unter dem Session-Lock - keine halben Übernahmen)"""
+        with self.lock:
+            return self._close_quarter()
+
+    def _close_quarter(self):
         print(f"[DEBUG] ========== QUARTER {self.current_quarter + 1} STARTING ==========")
         print(f"[DEBUG] Total firms in game: {len(self.firms)}")
 
@@ -1635,9 +1418,18 @@ class GameSession:
         self.current_quarter += 1
         self.quarter_start_time = time.time()
 
+        # Firmen unabhängig voneinander abschließen (optional parallel, siehe parallel.py);
+        # Raten, Zinsen und Restschuld aller Kredite in einem Durchlauf aus dem Kreditbuch
+        firms = list(self.firms.items())
+        terms = self.loan_ledger.quarter_terms()
+        outcomes = run_quarters([firm.quarter_state(terms.get(firm_id, NO_LOAN_TERMS)) for firm_id, firm in firms],
+                                workers=self.tick_workers)
+        self.loan_ledger.advance()
+
         results = {}
-        for firm_id, firm in self.firms.items():
-            result = firm.calculate_quarterly_results()
+        for (firm_id, firm), outcome in zip(firms, outcomes):
+            firm.apply_quarter_outcome(outcome)
+            result = outcome.result()
             results[firm_id] = result
             print(f"[DEBUG] Firm {firm_id} ({firm.name}): Revenue={firm.revenue:.2f}, Profit={firm.profit:.2f}, Cash={firm.cash:.2f}")
 
@@ -1661,6 +1453,7 @@ class GameSession:
         if total_revenue > 0:
             for firm in self.firms.values():
                 firm.market_share = firm.revenue / total_revenue
+                self.concentration.update(firm.id, firm.market_share)
 
         # KARTELLAMT ENFORCEMENT: Prevent market dominance
         self.enforce_kartellamt_regulations()
@@ -1675,7 +1468,7 @@ class GameSession:
                 bankruptcy_results[firm.name] = bankruptcy_info
 
                 # Firma wird aus dem Markt entfernt nach Insolvenz-Abwicklung
-                del self.firms[firm_id]
+                self.remove_firm(firm_id)
 
         if bankrupt_firms:
             print(f"💀 INSOLVENZEN: {', '.join(bankrupt_firms)}")
@@ -1688,6 +1481,10 @@ class GameSession:
             self.create_bot_firms(count=new_bots)
             print(f"📈 {new_bots} neue Bot-Firmen betreten den Markt!")
 
+        # Bewertungen des ganzen Markts in einem Durchlauf vorberechnen, Kartellamt-Vorprüfung neu aufbauen
+        self.valuations.refresh()
+        self.antitrust.invalidate()
+
         return results
 
     def get_market_overview(self) -> List[Dict]:
@@ -1737,6 +1534,42 @@ class GameSession:
         print(f"[DEBUG] Firms after creation: {len(self.firms)}")
         print(f"[DEBUG] Successfully created {created_count} bot firms")
 
+    def select_bot_strategy(self, firm: BusinessFirm) -> tuple[str, str]:
+        """
+        Wählt die Bot-Strategie anhand der Marktposition
+
+        Returns: (strategy, kartellamt_risk) - strategy ist ein Schlüssel in BOT_STRATEGY_RANGES
+        """
+        my_market_share = firm.market_share
+
+        # KARTELLAMT AWARENESS: Adjust strategy based on market dominance
+        # Thresholds: 30% warning, 40% penalty, 50% critical
+        kartellamt_risk = "NONE"
+        if my_market_share >= 0.50:
+            kartellamt_risk = "CRITICAL"
+        elif my_market_share >= 0.40:
+            kartellamt_risk = "PENALTY"
+        elif my_market_share >= 0.30:
+            kartellamt_risk = "WARNING"
+        elif my_market_share >= 0.25:
+            kartellamt_risk = "APPROACHING"
+
+        if kartellamt_risk in ["CRITICAL", "PENALTY"]:
+            # DEFENSIVE: Reduce market aggression to avoid heavy Kartellamt penalties
+            return "KARTELLAMT_DEFENSIVE", kartellamt_risk
+        if kartellamt_risk in ["WARNING", "APPROACHING"]:
+            # CAUTIOUS: Maintain position but don't grow aggressively
+            return "KARTELLAMT_CAUTIOUS", kartellamt_risk
+        if my_market_share > 0.15 and firm.cash > 3_000_000:
+            return "MARKET_LEADER", kartellamt_risk
+        if my_market_share < 3 and firm.profit < 0:
+            return "AGGRESSIVE_GROWTH", kartellamt_risk
+        if firm.cash < 500_000:
+            return "SURVIVAL", kartellamt_risk
+        if firm.product_lifecycle_stage == "decline" and firm.cash > 5_000_000:
+            return "INNOVATION_FOCUS", kartellamt_risk
+        return "BALANCED", kartellamt_risk
+
     def make_bot_decisions(self):
         """Lässt alle Bot-Firmen automatisch Entscheidungen treffen - MIT MARKTDATEN"""
         bot_count = 0
@@ -1756,8 +1589,7 @@ class GameSession:
         market_leader = max(active_firms, key=lambda f: f.market_share) if active_firms else None
 
         for firm in self.firms.values():
-            # Check if it's a bot (user_name contains "Bot")
-            if any("bot" in user.lower() for user in firm.user_names):
+            if firm.is_bot():
                 bot_count += 1
 
                 # BOT HAT ZUGRIFF AUF DIESELBEN DATEN WIE SPIELER:
@@ -1765,97 +1597,31 @@ class GameSession:
                 my_cash = firm.cash
                 my_profit = firm.profit
                 my_revenue = firm.revenue
-                my_lifecycle_stage = firm.product_lifecycle_stage  # String: "introduction", "growth", "maturity", "decline"
-                my_product_age = firm.product_age_quarters  # Alter des Produkts in Quartalen
                 my_rank = sum(1 for f in all_firms if f.revenue > firm.revenue) + 1
 
                 # NEUE LOGIK: Berechne maximale Produktionskapazität basierend auf Maschinen
                 my_max_capacity = firm.calculate_max_production_capacity()
 
-                # KARTELLAMT AWARENESS: Adjust strategy based on market dominance
-                # Thresholds: 30% warning, 40% penalty, 50% critical
-                kartellamt_risk = "NONE"
-                if my_market_share >= 0.50:
-                    kartellamt_risk = "CRITICAL"
-                elif my_market_share >= 0.40:
-                    kartellamt_risk = "PENALTY"
-                elif my_market_share >= 0.30:
-                    kartellamt_risk = "WARNING"
-                elif my_market_share >= 0.25:
-                    kartellamt_risk = "APPROACHING"
-
-                # STRATEGISCHE ENTSCHEIDUNGEN basierend auf Marktposition
-                if kartellamt_risk in ["CRITICAL", "PENALTY"]:
-                    # DEFENSIVE: Reduce market aggression to avoid heavy Kartellamt penalties
-                    # High prices, reduced capacity, lower marketing to lose market share intentionally
-                    price = avg_price * random.uniform(1.15, 1.30)  # 15-30% over market (lose customers)
-                    capacity = my_max_capacity * random.uniform(0.60, 0.75)  # Low production
-                    marketing = min(my_cash * 0.08, random.uniform(20000, 40000))  # Minimal marketing
-                    rd = min(my_cash * 0.15, random.uniform(80000, 150000))  # Focus on innovation instead
-                    quality = random.randint(6, 8)
-                    jit = random.uniform(20, 30)
-                    strategy = f"KARTELLAMT_DEFENSIVE ({kartellamt_risk})"
-
-                elif kartellamt_risk in ["WARNING", "APPROACHING"]:
-                    # CAUTIOUS: Maintain position but don't grow aggressively
-                    price = avg_price * random.uniform(1.05, 1.15)  # Slightly above market
-                    capacity = my_max_capacity * random.uniform(0.80, 0.90)  # Moderate production
-                    marketing = min(my_cash * 0.12, random.uniform(40000, 70000))
-                    rd = min(my_cash * 0.10, random.uniform(40000, 80000))
-                    quality = random.randint(6, 8)
-                    jit = random.uniform(18, 28)
-                    strategy = f"KARTELLAMT_CAUTIOUS ({kartellamt_risk})"
-
-                elif my_market_share > 0.15 and my_cash > 3_000_000:
-                    # MARKTFÜHRER-STRATEGIE: Premium Pricing, hohe Qualität, maximale Kapazitätsauslastung
-                    price = avg_price * random.uniform(1.1, 1.25)  # 10-25% über Markt
-                    capacity = my_max_capacity * random.uniform(0.95, 1.0)  # 95-100% Auslastung
-                    marketing = min(my_cash * 0.20, random.uniform(80000, 150000))
-                    rd = min(my_cash * 0.12, random.uniform(50000, 120000))
-                    quality = random.randint(7, 9)
-                    jit = random.uniform(15, 25)
-                    strategy = "MARKET_LEADER"
-
-                elif my_market_share < 3 and my_profit < 0:
-                    # AGGRESSIVE GROWTH: Niedrige Preise, maximale Kapazität
-                    price = avg_price * random.uniform(0.85, 0.95)  # 5-15% unter Markt
-                    capacity = my_max_capacity * random.uniform(0.90, 1.0)  # 90-100% Auslastung
-                    marketing = min(my_cash * 0.25, random.uniform(60000, 100000))
-                    rd = min(my_cash * 0.05, random.uniform(20000, 50000))
-                    quality = random.randint(4, 6)
-                    jit = random.uniform(20, 30)
-                    strategy = "AGGRESSIVE_GROWTH"
-
-                elif my_cash < 500_000:
-                    # SURVIVAL MODE: Kosten senken, reduzierte Kapazität
-                    price = avg_price * random.uniform(1.0, 1.1)
-                    capacity = my_max_capacity * random.uniform(0.60, 0.75)  # Nur 60-75% Auslastung (Kostensparen)
-                    marketing = min(my_cash * 0.10, random.uniform(10000, 30000))
-                    rd = min(my_cash * 0.02, random.uniform(5000, 15000))
-                    quality = random.randint(4, 5)
-                    jit = random.uniform(25, 35)
-                    strategy = "SURVIVAL"
-
-                elif my_lifecycle_stage == "decline" and my_cash > 5_000_000:
-                    # INNOVATION NEEDED: Investiere in F&E für neues Produkt
-                    price = avg_price * random.uniform(0.9, 1.0)
-                    capacity = my_max_capacity * random.uniform(0.70, 0.85)  # Reduzierte Produktion während Transition
-                    marketing = min(my_cash * 0.15, random.uniform(40000, 80000))
-                    rd = min(my_cash * 0.20, random.uniform(100000, 200000))  # Hohe F&E!
-                    quality = random.randint(5, 7)
-                    jit = random.uniform(20, 30)
-                    strategy = "INNOVATION_FOCUS"
-
-                else:
-                    # BALANCED STRATEGY: Moderate Kapazitätsauslastung
-                    price = avg_price * random.uniform(0.95, 1.05)
-                    capacity = my_max_capacity * random.uniform(0.80, 0.95)  # 80-95% Auslastung
-                    marketing = min(my_cash * 0.15, random.uniform(40000, 80000))
-                    rd = min(my_cash * 0.10, random.uniform(30000, 60000))
+                # STRATEGISCHE ENTSCHEIDUNGEN basierend auf Marktposition (inkl. Kartellamt-Risiko)
+                strategy, kartellamt_risk = self.select_bot_strategy(firm)
+                ranges = BOT_STRATEGY_RANGES[strategy]
+
+                price = avg_price * random.uniform(*ranges["price"])
+                capacity = my_max_capacity * random.uniform(*ranges["capacity"])
+                cash_share, budget_min, budget_max = ranges["marketing"]
+                marketing = min(my_cash * cash_share, random.uniform(budget_min, budget_max))
+                cash_share, budget_min, budget_max = ranges["rd"]
+                rd = min(my_cash * cash_share, random.uniform(budget_min, budget_max))
+                if ranges["quality"] is None:
+                    # BALANCED: am Marktdurchschnitt orientieren
                     quality = int(avg_quality + random.uniform(-1, 1))
                     quality = max(4, min(9, quality))  # Clamp 4-9
-                    jit = random.uniform(18, 28)
-                    strategy = "BALANCED"
+                else:
+                    quality = random.randint(*ranges["quality"])
+                jit = random.uniform(*ranges["jit"])
+
+                if strategy.startswith("KARTELLAMT_"):
+                    strategy = f"{strategy} ({kartellamt_risk})"
 
                 # STRATEGISCHE HEBEL - Bots nutzen dieselben Optionen wie Spieler!
                 # ABER: Viel konservativer um Bankrott zu vermeiden!
@@ -1922,26 +1688,8 @@ class GameSession:
 
         # Berechne hypothetischen Marktanteil
         # Wenn percentage < 100, addieren wir anteilig? Nein, Kartellrecht zählt oft Kontrolle.
-        # Vereinfacht: Wir addieren die Marktanteile.
-        current_share = acquirer.market_share
-        target_share = target.market_share
-        combined_share = current_share + target_share
-
-        # Kartellrechtliche Schwellen
-        DOMINANCE_THRESHOLD = 0.40  # 40% ist marktbeherrschend
-
-        if combined_share >= DOMINANCE_THRESHOLD:
-            return {
-                "allowed": False,
-                "reason": f"Marktbeherrschung ({combined_share*100:.1f}% > 40%)",
-                "combined_market_share": combined_share * 100
-            }
-        
-        return {
-            "allowed": True,
-            "reason": "Unbedenklich",
-            "combined_market_share": combined_share * 100
-        }
+        # Vereinfacht: Wir addieren die Marktanteile (40% = marktbeherrschend).
+        return self.antitrust.dominance_check(acquirer, target)
 
     def acquire_firm(self, acquirer_id: int, target_id: int, percentage: float = 100.0) -> Dict:
         """Führt eine Firmenübernahme durch"""
@@ -1997,23 +1745,13 @@ class GameSession:
             "new_cash": acquirer.cash
         }
 
-    def calculate_acquisition_cost(self, target_firm: BusinessFirm) -> Dict:
-        """Berechnet Aufkaufpreis basierend auf Unternehmenswert"""
-        # BEWERTUNGSFORMEL - Berücksichtigt mehrere Faktoren:
-        # 1. Cash + Inventarwert + Sachwerte (20% Premium)
-        asset_value = target_firm.cash + (target_firm.inventory_level * 50) + (target_firm.machines_value + target_firm.buildings_value + target_firm.equipment_value)
-
-        # 2. Umsatz-Multiplikator (1.5x Quartalsumsatz)
-        revenue_value = target_firm.revenue * 1.5
-
-        # 3. Eigenkapital mit Premium (10% Aufschlag)
-        equity_value = target_firm.equity * 1.1
-
-        # 4. Nehme das Maximum dieser Werte
-        base_price = max(asset_value * 1.2, revenue_value, equity_value)
-
-        # 5. Mindestpreis: €500k (damit Aufkauf sich lohnen muss)
-        return max(base_price, 500_000)
+    def calculate_acquisition_cost(self, target_firm: BusinessFirm) -> float:
+        """
+        Berechnet Aufkaufpreis basierend auf Unternehmenswert
+        Maximum aus Sachwerten (+20%), 1.5x Quartalsumsatz und Eigenkapital (+10%), mindestens €500k
+        (Formel: valuation.evaluate, vorgehalten je Versionsstand der Firma)
+        """
+        return self.valuations.get(target_firm).asset_deal_cost
 
     def acquire_firm(self, acquiring_firm_id: int, target_firm_id: int) -> Dict:
         """Firma kauft andere Firma auf (M&A)"""
@@ -2039,43 +1777,46 @@ class GameSession:
         if acquiring_firm.cash < acquisition_cost:
             raise ValueError(f"Nicht genug Cash! Benötigt: €{acquisition_cost:,.0f}, Verfügbar: €{acquiring_firm.cash:,.0f}")
 
-        # TRANSAKTION DURCHFÜHREN:
-        # 1. Zahle Aufkaufpreis
-        acquiring_firm.cash -= acquisition_cost
-
-        # 2. Übernehme Assets der Zielfirma
-        acquiring_firm.inventory_level += target_firm.inventory_level
-        acquiring_firm.production_capacity += target_firm.production_capacity
-
-        # 3. Übernehme Sachwerte (Maschinen, Gebäude, Ausrüstung)
-        acquiring_firm.machines_value += target_firm.machines_value
-        acquiring_firm.buildings_value += target_firm.buildings_value
-        acquiring_firm.equipment_value += target_firm.equipment_value
-
-        # 4. Schulden werden NICHT übernommen (Asset Deal, kein Share Deal)
-        # Debt bleibt beim Verkäufer
-
-        # 5. Eigenkapital erhöhen um Nettowert der Assets
-        net_asset_value = target_firm.cash + (target_firm.inventory_level * 50) + target_firm.machines_value + target_firm.buildings_value + target_firm.equipment_value - target_firm.debt
-        acquiring_firm.equity += max(0, net_asset_value - acquisition_cost)
-
-        # 6. Goodwill berechnen (Aufpreis über Buchwert)
-        book_value = target_firm.equity
-        goodwill = acquisition_cost - book_value
-
-        # 7. Entferne Zielfirma aus dem Spiel
-        acquisition_info = {
-            "acquiring_firm": acquiring_firm.name,
-            "target_firm": target_firm.name,
-            "acquisition_cost": round(acquisition_cost, 2),
-            "inventory_gained": round(target_firm.inventory_level, 0),
-            "capacity_gained": round(target_firm.production_capacity, 0),
-            "net_asset_value": round(net_asset_value, 2),
-            "goodwill": round(goodwill, 2),
-            "acquiring_firm_cash_after": round(acquiring_firm.cash, 2)
-        }
+        def net_asset_value() -> float:
+            return (target_firm.cash + (target_firm.inventory_level * 50) + target_firm.machines_value
+                    + target_firm.buildings_value + target_firm.equipment_value - target_firm.debt)
 
-        del self.firms[target_firm_id]
+        def acquisition_info() -> Dict:
+            return {
+                "acquiring_firm": acquiring_firm.name,
+                "target_firm": target_firm.name,
+                "acquisition_cost": round(acquisition_cost, 2),
+                "inventory_gained": round(target_firm.inventory_level, 0),
+                "capacity_gained": round(target_firm.production_capacity, 0),
+                "net_asset_value": round(net_asset_value(), 2),
+                "goodwill": round(acquisition_cost - target_firm.equity, 2),  # Aufpreis über Buchwert
+                "acquiring_firm_cash_after": round(acquiring_firm.cash, 2)
+            }
+
+        # TRANSAKTION (atomar unter dem Session-Lock, transactions.py):
+        transaction = (
+            Transaction("acquire_firm")
+            .require(lambda: target_firm_id in self.firms, "Ziel-Firma nicht gefunden!")
+            .require(lambda: acquiring_firm.cash >= acquisition_cost,
+                     lambda: f"Nicht genug Cash! Benötigt: €{acquisition_cost:,.0f}, Verfügbar: €{acquiring_firm.cash:,.0f}")
+            # 1. Zahle Aufkaufpreis
+            .add(acquiring_firm, "cash", -acquisition_cost)
+            # 2. Übernehme Assets der Zielfirma
+            .update(acquiring_firm, "inventory_level", lambda value: value + target_firm.inventory_level)
+            .update(acquiring_firm, "production_capacity", lambda value: value + target_firm.production_capacity)
+            # 3. Übernehme Sachwerte (Maschinen, Gebäude, Ausrüstung)
+            .update(acquiring_firm, "machines_value", lambda value: value + target_firm.machines_value)
+            .update(acquiring_firm, "buildings_value", lambda value: value + target_firm.buildings_value)
+            .update(acquiring_firm, "equipment_value", lambda value: value + target_firm.equipment_value)
+            # 4. Schulden werden NICHT übernommen (Asset Deal, kein Share Deal) - Debt bleibt beim Verkäufer
+            # 5. Eigenkapital erhöhen um Nettowert der Assets
+            .update(acquiring_firm, "equity", lambda value: value + max(0, net_asset_value() - acquisition_cost))
+            # 6. Entferne Zielfirma aus dem Spiel - Beteiligungen an ihr erlöschen mit ihr (letzter Schritt)
+            .step(lambda: self.remove_firm(target_firm_id))
+            .returning(acquisition_info)
+        )
+        acquisition_info = self.transactions.submit(transaction)
+        goodwill = acquisition_info["goodwill"]
 
         print(f"🤝 M&A: {acquiring_firm.name} kauft {target_firm.name} für €{acquisition_cost:,.0f}")
         print(f"   Übernommene Assets: {target_firm.inventory_level:.0f} Einheiten Inventar, {target_firm.production_capacity:.0f} Kapazität")
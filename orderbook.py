@@ -0,0 +1,343 @@
+"""
+BWL Planspiel - Orderbuch für börsennotierte Firmen
+Je Firma ein Limit-Orderbuch mit Preis-Zeit-Priorität (zwei Heaps, Stornos
+werden lazy beim Erreichen der Heap-Spitze entfernt). Eingehende Orders werden
+sofort gegen die Gegenseite ausgeführt; jeder Umsatz bucht Aktien in der Cap
+Table und Cash zwischen den Firmen um, pflegt den Beteiligungsgraph und setzt
+den Aktienkurs (letzter Umsatz). Orders werden unter dem Lock der GameSession
+ausgeführt - Quartalsabschluss und Übernahmen sehen keinen halb gebuchten Umsatz.
+"""
+import heapq
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from ownership import CONTROL_THRESHOLD
+
+SIDES = ("buy", "sell")
+
+# Umsätze je Firma, die für GET /api/firms/{id}/orderbook vorgehalten werden
+RECENT_TRADES = 50
+
+# Heap neu aufbauen, sobald mehr als die Hälfte der Einträge storniert/ausgeführt ist
+COMPACT_MIN_SIZE = 64
+
+
+@dataclass(slots=True)
+class Order:
+    id: int
+    firm_id: int  # gehandelte Aktie
+    trader_id: int  # Firma, die kauft/verkauft (Cash + Depot)
+    side: str
+    price: float  # Limit je Aktie
+    quantity: int  # Stück bei Eingabe
+    remaining: int  # offene Stück
+    created: float
+    active: bool = True
+
+    def to_dict(self) -> Dict:
+        return {
+            "order_id": self.id,
+            "firm_id": self.firm_id,
+            "trader_firm_id": self.trader_id,
+            "side": self.side,
+            "price": self.price,
+            "quantity": self.quantity,
+            "remaining": self.remaining,
+            "filled": self.quantity - self.remaining,
+            "status": "open" if self.active else ("filled" if self.remaining == 0 else "cancelled"),
+            "created": self.created
+        }
+
+
+class OrderBook:
+    """Bid-/Ask-Heaps einer Aktie: (Preisschlüssel, Order-ID, Order) - die ID ist die Eingangsreihenfolge"""
+
+    def __init__(self, firm_id: int):
+        self.firm_id = firm_id
+        self.bids: List[tuple] = []  # (-Preis, ID, Order) → höchster Preis zuerst
+        self.asks: List[tuple] = []  # (Preis, ID, Order) → niedrigster Preis zuerst
+        self.live = 0  # aktive Orders in beiden Heaps
+        self.trades = deque(maxlen=RECENT_TRADES)
+
+    def push(self, order: Order):
+        if order.side == "buy":
+            heapq.heappush(self.bids, (-order.price, order.id, order))
+        else:
+            heapq.heappush(self.asks, (order.price, order.id, order))
+        self.live += 1
+
+    @staticmethod
+    def best(heap: List[tuple]) -> Optional[Order]:
+        """Beste aktive Order einer Seite (erledigte Einträge an der Spitze verwerfen)"""
+        while heap and not heap[0][2].active:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def compact(self):
+        """Erledigte Einträge aus der Tiefe entfernen (sonst wachsen die Heaps mit jedem Storno)"""
+        if len(self.bids) + len(self.asks) > max(COMPACT_MIN_SIZE, 2 * self.live):
+            self.bids = [entry for entry in self.bids if entry[2].active]
+            self.asks = [entry for entry in self.asks if entry[2].active]
+            heapq.heapify(self.bids)
+            heapq.heapify(self.asks)
+
+    def depth(self, levels: int) -> Dict:
+        """Aggregierte Preisstufen je Seite (beste zuerst)"""
+        result = {}
+        for side, heap, sign in (("bids", self.bids, -1), ("asks", self.asks, 1)):
+            book: Dict[float, List[int]] = {}
+            for key, _, order in sorted(entry for entry in heap if entry[2].active):
+                level = book.setdefault(sign * key, [0, 0])
+                if len(book) > levels:
+                    del book[sign * key]
+                    break
+                level[0] += order.remaining
+                level[1] += 1
+            result[side] = [{"price": price, "quantity": quantity, "orders": count}
+                            for price, (quantity, count) in book.items()]
+        return result
+
+
+class Exchange:
+    """Börse einer GameSession: Orderbücher, Reservierungen, Umsatz-Feed"""
+
+    def __init__(self, game):
+        self.game = game
+        self.clear()
+
+    def clear(self):
+        self.books: Dict[int, OrderBook] = {}
+        self.orders: Dict[int, Order] = {}  # nur aktive Orders
+        self.reserved_cash: Dict[int, float] = {}  # Firma → Cash in offenen Kauforders
+        self.reserved_shares: Dict[tuple, int] = {}  # (Aktie, Firma) → Stück in offenen Verkaufsorders
+        self.reserved_buys: Dict[tuple, int] = {}  # (Aktie, Firma) → Stück in offenen Kauforders (Mehrheitsgrenze)
+        self.pending_trades: List[Dict] = []  # noch nicht per WebSocket verteilte Umsätze
+        self.last_order_id = 0
+        self.last_trade_id = 0
+
+    # ============ ORDERS ============
+
+    def place_order(self, firm_id: int, trader_id: int, side: str, price: float, quantity: int) -> Dict:
+        """
+        Limit-Order aufgeben und sofort gegen das Buch ausführen
+
+        Returns: {"order": ..., "trades": [...]} - Rest bleibt im Buch
+        Raises: ValueError bei ungültiger Order (nicht börsennotiert, Deckung fehlt, ...)
+        """
+        with self.game.lock:
+            return self._place_order(firm_id, trader_id, side, price, quantity)
+
+    def _place_order(self, firm_id: int, trader_id: int, side: str, price: float, quantity: int) -> Dict:
+        target = self.game.firms.get(firm_id)
+        trader = self.game.firms.get(trader_id)
+        if target is None or trader is None:
+            raise LookupError("Firma nicht gefunden")
+        if side not in SIDES:
+            raise ValueError(f"side muss einer von {', '.join(SIDES)} sein")
+        if not target.is_public:
+            self.close_book(firm_id)
+            raise ValueError(f"{target.name} ist nicht börsennotiert")
+        price = round(float(price), 2)
+        if price <= 0 or quantity < 1:
+            raise ValueError("Preis und Stückzahl müssen positiv sein")
+
+        if side == "buy":
+            cost = price * quantity
+            available = trader.cash - self.reserved_cash.get(trader_id, 0.0)
+            if cost > available:
+                raise ValueError(f"Nicht genug Bargeld. Benötigt: €{cost:,.0f}, Verfügbar: €{available:,.0f}")
+            if trader_id != firm_id:
+                # eigene offene Kauforders auf dieselbe Aktie zählen mit (sonst Mehrheit über mehrere Orders)
+                pending = self.reserved_buys.get((firm_id, trader_id), 0)
+                if self._exceeds_control(trader_id, target, pending + quantity):
+                    raise ValueError("⚖️ Mehrheitserwerb nur über /api/acquisitions (Fusionskontrolle)")
+        else:
+            key = (firm_id, trader_id)
+            available = target.held_shares(trader.shareholder_name) - self.reserved_shares.get(key, 0)
+            if quantity > available + 1e-6:
+                raise ValueError(f"Nicht genug Aktien. Verfügbar: {max(0.0, available):,.0f} Stück")
+
+        self.last_order_id += 1
+        order = Order(id=self.last_order_id, firm_id=firm_id, trader_id=trader_id, side=side,
+                      price=price, quantity=int(quantity), remaining=int(quantity), created=time.time())
+        book = self.books.get(firm_id) or self.books.setdefault(firm_id, OrderBook(firm_id))
+        trades = self._match(book, order, target)
+
+        if order.remaining and order.active:
+            self.orders[order.id] = order
+            self._reserve(order, order.remaining)
+            book.push(order)
+        else:
+            order.active = False
+        book.compact()
+        return {"order": order.to_dict(), "trades": trades}
+
+    def cancel_order(self, order_id: int, trader_id: Optional[int] = None) -> Dict:
+        with self.game.lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                raise LookupError("Order nicht gefunden oder bereits erledigt")
+            if trader_id is not None and order.trader_id != trader_id:
+                raise ValueError("Order gehört einer anderen Firma")
+            self._deactivate(order)
+            book = self.books.get(order.firm_id)
+            if book is not None:
+                book.compact()
+            return order.to_dict()
+
+    def close_book(self, firm_id: int):
+        """Delisting: alle offenen Orders der Aktie entfallen"""
+        with self.game.lock:
+            book = self.books.pop(firm_id, None)
+            if book is not None:
+                for _, _, order in book.bids + book.asks:
+                    if order.active:
+                        self._deactivate(order)
+
+    def remove_firm(self, firm_id: int):
+        """Firma verlässt das Spiel: ihr Orderbuch und ihre eigenen Orders entfallen"""
+        with self.game.lock:
+            self.close_book(firm_id)
+            for order in [order for order in self.orders.values() if order.trader_id == firm_id]:
+                self._deactivate(order)
+            self.reserved_cash.pop(firm_id, None)
+
+    # ============ MATCHING ============
+
+    def _match(self, book: OrderBook, order: Order, target) -> List[Dict]:
+        trades = []
+        opposite = book.asks if order.side == "buy" else book.bids
+        while order.remaining:
+            resting = book.best(opposite)
+            if resting is None:
+                break
+            if (resting.price > order.price) if order.side == "buy" else (resting.price < order.price):
+                break
+            if resting.trader_id == order.trader_id:
+                self._deactivate(resting)  # Selbsthandel: ältere Order wird storniert
+                continue
+
+            buy, sell = (order, resting) if order.side == "buy" else (resting, order)
+            quantity = min(order.remaining, resting.remaining)
+            failed = self._check_settlement(buy, sell, quantity, resting.price, target)
+            if failed is resting:
+                self._deactivate(resting)
+                continue
+            if failed is order:
+                order.active = False
+                break
+
+            trades.append(self._settle(book, buy, sell, quantity, resting.price, target))
+            order.remaining -= quantity
+            self._release(resting, quantity)
+            resting.remaining -= quantity
+            if not resting.remaining:
+                resting.active = False
+                book.live -= 1
+                self.orders.pop(resting.id, None)
+        return trades
+
+    def _check_settlement(self, buy: Order, sell: Order, quantity: int, price: float, target) -> Optional[Order]:
+        """Deckung beider Seiten zum Ausführungszeitpunkt prüfen - Returns: nicht gedeckte Order"""
+        buyer = self.game.firms.get(buy.trader_id)
+        seller = self.game.firms.get(sell.trader_id)
+        if seller is None or target.held_shares(seller.shareholder_name) < quantity - 1e-6:
+            return sell
+        if buyer is None or buyer.cash < price * quantity:
+            return buy
+        if buyer.id != target.id and self._exceeds_control(buyer.id, target, quantity):
+            return buy  # Anteil hat sich seit Eingabe der Order erhöht (andere Orders, Übernahmen)
+        return None
+
+    def _exceeds_control(self, trader_id: int, target, quantity: int) -> bool:
+        """Würde der direkte Anteil von trader an target mit quantity Stück die Mehrheitsgrenze überschreiten?"""
+        stake = self.game.ownership.direct_holdings(trader_id).get(target.id, 0.0)
+        return stake + target.share_percentage(quantity) > CONTROL_THRESHOLD
+
+    def _settle(self, book: OrderBook, buy: Order, sell: Order, quantity: int, price: float, target) -> Dict:
+        """Umsatz buchen: Aktien (Cap Table + Beteiligungsgraph), Cash, Aktienkurs - Aufrufer hält game.lock"""
+        buyer = self.game.firms[buy.trader_id]
+        seller = self.game.firms[sell.trader_id]
+        percentage = target.transfer_shares(seller.shareholder_name, buyer.shareholder_name, quantity)
+        ownership = self.game.ownership
+        if buyer.id != target.id:
+            ownership.add_stake(buyer.id, target.id, percentage)
+        if seller.id != target.id:
+            ownership.add_stake(seller.id, target.id, -percentage)
+
+        value = price * quantity
+        buyer.cash -= value
+        seller.cash += value
+        target.record_trade(price)
+
+        self.last_trade_id += 1
+        trade = {
+            "trade_id": self.last_trade_id,
+            "firm_id": target.id,
+            "price": price,
+            "quantity": quantity,
+            "buyer_firm_id": buyer.id,
+            "seller_firm_id": seller.id,
+            "timestamp": time.time()
+        }
+        book.trades.append(trade)
+        self.pending_trades.append(trade)
+        return trade
+
+    # ============ RESERVIERUNGEN ============
+
+    def _reserve(self, order: Order, quantity: int):
+        key = (order.firm_id, order.trader_id)
+        if order.side == "buy":
+            self.reserved_cash[order.trader_id] = self.reserved_cash.get(order.trader_id, 0.0) + order.price * quantity
+            self.reserved_buys[key] = self.reserved_buys.get(key, 0) + quantity
+        else:
+            self.reserved_shares[key] = self.reserved_shares.get(key, 0) + quantity
+
+    def _release(self, order: Order, quantity: int):
+        """Reservierung einer Buchorder nach Teilausführung/Storno freigeben"""
+        if not order.active or order.id not in self.orders:
+            return
+        key = (order.firm_id, order.trader_id)
+        if order.side == "buy":
+            left = self.reserved_cash.get(order.trader_id, 0.0) - order.price * quantity
+            if left > 1e-6:
+                self.reserved_cash[order.trader_id] = left
+            else:
+                self.reserved_cash.pop(order.trader_id, None)
+            reserved = self.reserved_buys
+        else:
+            reserved = self.reserved_shares
+        left = reserved.get(key, 0) - quantity
+        if left > 0:
+            reserved[key] = left
+        else:
+            reserved.pop(key, None)
+
+    def _deactivate(self, order: Order):
+        if not order.active:
+            return
+        self._release(order, order.remaining)
+        order.active = False
+        self.orders.pop(order.id, None)
+        book = self.books.get(order.firm_id)
+        if book is not None:
+            book.live -= 1
+
+    # ============ ABFRAGEN ============
+
+    def book_view(self, firm_id: int, levels: int = 10) -> Dict:
+        book = self.books.get(firm_id)
+        if book is None:
+            return {"firm_id": firm_id, "bids": [], "asks": [], "trades": []}
+        return {"firm_id": firm_id, **book.depth(levels), "trades": list(book.trades)[::-1]}
+
+    def open_orders(self, trader_id: int) -> List[Dict]:
+        return [order.to_dict() for order in self.orders.values() if order.trader_id == trader_id]
+
+    def drain_trades(self) -> List[Dict]:
+        """Umsätze seit dem letzten Aufruf (für den WebSocket-Feed)"""
+        trades, self.pending_trades = self.pending_trades, []
+        return trades
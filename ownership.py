@@ -0,0 +1,240 @@
+"""
+BWL Planspiel - Beteiligungsgraph
+Direkte Beteiligungen zwischen Firmen (portfolio) als Adjazenz in beide
+Richtungen plus durchgerechnete Anteile über alle Beteiligungsketten:
+
+    T = A + A² + A³ + ... = (I - A)⁻¹ - I,   A[i, j] = Anteil von Firma i an Firma j
+
+(I - A)⁻¹ wird bei jeder Anteilsänderung per Sherman-Morrison (Rang-1-Update)
+nachgeführt statt neu invertiert. Das Update berührt nur die betroffenen Ketten:
+Zeilen der Firmen, die (indirekt) an der Eigentümerfirma beteiligt sind, mal
+Spalten der Firmen, an denen die Zielfirma (indirekt) beteiligt ist - Kosten
+O(n + Vorgänger · Nachfolger), im vollständig verflochtenen Markt O(n²).
+Alle REBUILD_INTERVAL Updates wird neu invertiert (O(n³), amortisiert).
+Abfragen lesen nur Adjazenz bzw. Matrixeinträge.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Anteile unterhalb dieser Schwelle (in %) gelten als 0
+STAKE_EPSILON = 1e-9
+
+# Beherrschung: direkter Anteil über 50% je Kettenglied (Mehrheitskette, siehe konzern.py)
+CONTROL_THRESHOLD = 50.0
+
+# Nach so vielen Rang-1-Updates wird (I - A)⁻¹ neu berechnet (Rundungsfehler begrenzen)
+REBUILD_INTERVAL = 256
+
+# Bis zu dieser Matrixgröße wird immer dicht aktualisiert (Indexaufwand lohnt nicht)
+DENSE_SIZE = 128
+
+
+class OwnershipGraph:
+    """Beteiligungen Firma → Firma mit inkrementell gepflegter Verflechtungsmatrix"""
+
+    def __init__(self, capacity: int = 64):
+        self.holdings: Dict[int, Dict[int, float]] = {}  # Eigentümer → {Zielfirma: %}
+        self.holders: Dict[int, Dict[int, float]] = {}   # Zielfirma → {Eigentümer: %}
+        self.version = 0
+        self._index: Dict[int, int] = {}  # firm_id → Zeile/Spalte der Matrix
+        self._ids: List[Optional[int]] = [None] * capacity
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self._inverse = np.eye(capacity)  # (I - A)⁻¹
+        self._updates = 0
+
+    def clear(self):
+        self.__init__(len(self._ids))
+
+    # ============ ÄNDERUNGEN ============
+
+    def set_stake(self, owner_id: int, target_id: int, percentage: float):
+        """Direkter Anteil von owner_id an target_id (in %, 0 = Beteiligung aufgelöst)"""
+        if owner_id == target_id:
+            raise ValueError("Eine Firma kann keine Anteile an sich selbst halten")
+        old = self.holdings.get(owner_id, {}).get(target_id, 0.0)
+        if percentage <= STAKE_EPSILON:
+            percentage = 0.0
+        if percentage == old:
+            return
+
+        if percentage:
+            self.holdings.setdefault(owner_id, {})[target_id] = percentage
+            self.holders.setdefault(target_id, {})[owner_id] = percentage
+        else:
+            self._drop_edge(owner_id, target_id)
+
+        self._rank_one(self._slot(owner_id), self._slot(target_id), (percentage - old) / 100.0)
+        self.version += 1
+
+    def add_stake(self, owner_id: int, target_id: int, percentage: float):
+        self.set_stake(owner_id, target_id, self.holdings.get(owner_id, {}).get(target_id, 0.0) + percentage)
+
+    def scale_holders(self, target_id: int, factor: float):
+        """
+        Kapitalmaßnahme der Zielfirma (Verwässerung/Rückkauf): alle Firmenbeteiligungen
+        an ihr ändern sich um factor - ein gemeinsames Rang-1-Update der Spalte statt
+        eines Updates je Anteilseigner (Kosten wie _column_update)
+        """
+        holders = self.holders.get(target_id)
+        if not holders or factor == 1.0:
+            return
+        change = np.zeros(len(self._ids))
+        for owner_id, percentage in holders.items():
+            holders[owner_id] = self.holdings[owner_id][target_id] = percentage * factor
+            change[self._index[owner_id]] = percentage * (factor - 1.0) / 100.0
+        self._column_update(change, self._index[target_id])
+        self.version += 1
+
+    def remove_firm(self, firm_id: int):
+        """Firma verlässt das Spiel: alle Beteiligungen von und an ihr entfallen"""
+        for target_id in list(self.holdings.get(firm_id, {})):
+            self.set_stake(firm_id, target_id, 0.0)
+        for owner_id in list(self.holders.get(firm_id, {})):
+            self.set_stake(owner_id, firm_id, 0.0)
+        slot = self._index.pop(firm_id, None)
+        if slot is not None:
+            # Isolierter Knoten: Zeile/Spalte sind exakt Einheitsvektoren (Rundungsreste verwerfen)
+            self._inverse[slot, :] = 0.0
+            self._inverse[:, slot] = 0.0
+            self._inverse[slot, slot] = 1.0
+            self._ids[slot] = None
+            self._free.append(slot)
+        self.holdings.pop(firm_id, None)
+        self.holders.pop(firm_id, None)
+        self.version += 1
+
+    def _drop_edge(self, owner_id: int, target_id: int):
+        self.holdings.get(owner_id, {}).pop(target_id, None)
+        self.holders.get(target_id, {}).pop(owner_id, None)
+        if not self.holdings.get(owner_id):
+            self.holdings.pop(owner_id, None)
+        if not self.holders.get(target_id):
+            self.holders.pop(target_id, None)
+
+    def _slot(self, firm_id: int) -> int:
+        slot = self._index.get(firm_id)
+        if slot is None:
+            if not self._free:
+                self._grow()
+            slot = self._free.pop()
+            self._index[firm_id] = slot
+            self._ids[slot] = firm_id
+        return slot
+
+    def _grow(self):
+        """Kapazität verdoppeln - neue Knoten sind isoliert, die Inverse bleibt blockdiagonal"""
+        old = len(self._ids)
+        inverse = np.eye(old * 2)
+        inverse[:old, :old] = self._inverse
+        self._inverse = inverse
+        self._ids.extend([None] * old)
+        self._free.extend(range(old * 2 - 1, old - 1, -1))
+
+    def _rank_one(self, i: int, j: int, delta: float):
+        """A[i, j] += delta  →  (I - A)⁻¹ per Sherman-Morrison nachführen"""
+        self._updates += 1
+        m = self._inverse
+        denominator = 1.0 - delta * m[j, i]
+        if self._updates >= REBUILD_INTERVAL or abs(denominator) < 1e-12:
+            self._rebuild()
+            return
+        self._outer_update(m[:, i] * (delta / denominator), m[j, :])
+
+    def _column_update(self, change: np.ndarray, j: int):
+        """A[:, j] += change  →  (I - A)⁻¹ per Sherman-Morrison nachführen"""
+        self._updates += 1
+        m = self._inverse
+        changed = np.flatnonzero(change)
+        m_change = m[:, changed] @ change[changed]
+        denominator = 1.0 - m_change[j]
+        if self._updates >= REBUILD_INTERVAL or abs(denominator) < 1e-12:
+            self._rebuild()
+            return
+        self._outer_update(m_change / denominator, m[j, :])
+
+    def _outer_update(self, column: np.ndarray, row: np.ndarray):
+        """(I - A)⁻¹ += column ⊗ row, nur auf den Nicht-Null-Einträgen (betroffene Ketten)"""
+        rows, columns = np.flatnonzero(column), np.flatnonzero(row)
+        if column.size <= DENSE_SIZE or len(rows) * len(columns) * 4 > column.size * row.size:  # klein/dicht verflochten
+            self._inverse += np.outer(column, row)
+        else:
+            self._inverse[np.ix_(rows, columns)] += np.outer(column[rows], row[columns])
+
+    def _rebuild(self):
+        """Neu invertieren - je Verflechtungsgruppe (zusammenhängende Komponente) getrennt"""
+        size = len(self._ids)
+        a = np.zeros((size, size))
+        for owner_id, targets in self.holdings.items():
+            for target_id, percentage in targets.items():
+                a[self._index[owner_id], self._index[target_id]] = percentage / 100.0
+        inverse = np.eye(size)
+        for group in self._groups():
+            block = np.eye(len(group)) - a[np.ix_(group, group)]
+            try:
+                inverse[np.ix_(group, group)] = np.linalg.inv(block)
+            except np.linalg.LinAlgError:
+                # Geschlossener 100%-Ring: Kettenanteile unendlich → Pseudoinverse
+                inverse[np.ix_(group, group)] = np.linalg.pinv(block)
+        self._inverse = inverse
+        self._updates = 0
+
+    def _groups(self) -> List[List[int]]:
+        """Matrix-Slots je Gruppe über Beteiligungen verbundener Firmen (ohne isolierte Firmen)"""
+        parent: Dict[int, int] = {}
+
+        def find(slot: int) -> int:
+            root = slot
+            while parent.setdefault(root, root) != root:
+                root = parent[root]
+            while parent[slot] != root:
+                parent[slot], slot = root, parent[slot]
+            return root
+
+        for owner_id, targets in self.holdings.items():
+            for target_id in targets:
+                parent[find(self._index[owner_id])] = find(self._index[target_id])
+        groups: Dict[int, List[int]] = {}
+        for slot in parent:
+            groups.setdefault(find(slot), []).append(slot)
+        return [sorted(group) for group in groups.values()]
+
+    # ============ ABFRAGEN ============
+
+    def direct_holdings(self, owner_id: int) -> Dict[int, float]:
+        """{Zielfirma: %} - direkte Beteiligungen, O(Grad)"""
+        return self.holdings.get(owner_id, {})
+
+    def direct_holders(self, target_id: int) -> Dict[int, float]:
+        """{Eigentümerfirma: %} - direkte Anteilseigner unter den Firmen, O(Grad)"""
+        return self.holders.get(target_id, {})
+
+    def integrated_stake(self, owner_id: int, target_id: int) -> float:
+        """Durchgerechneter Anteil (%) über alle Beteiligungsketten, O(1)"""
+        i, j = self._index.get(owner_id), self._index.get(target_id)
+        if i is None or j is None or owner_id == target_id:
+            return 0.0
+        return float(self._inverse[i, j]) * 100.0
+
+    def indirect_stake(self, owner_id: int, target_id: int) -> float:
+        """Nur über Zwischenfirmen gehaltener Anteil (%) = durchgerechnet - direkt"""
+        direct = self.holdings.get(owner_id, {}).get(target_id, 0.0)
+        return max(0.0, self.integrated_stake(owner_id, target_id) - direct)
+
+    def integrated_holdings(self, owner_id: int) -> Dict[int, float]:
+        """{Zielfirma: durchgerechneter %} für alle direkt oder indirekt gehaltenen Firmen"""
+        i = self._index.get(owner_id)
+        if i is None:
+            return {}
+        row = self._inverse[i]
+        return {self._ids[j]: float(row[j]) * 100.0 for j in np.flatnonzero(row * 100.0 > STAKE_EPSILON)
+                if j != i and self._ids[j] is not None}
+
+    def integrated_holders(self, target_id: int) -> Dict[int, float]:
+        """{Eigentümerfirma: durchgerechneter %} für alle direkt oder indirekt beteiligten Firmen"""
+        j = self._index.get(target_id)
+        if j is None:
+            return {}
+        column = self._inverse[:, j]
+        return {self._ids[i]: float(column[i]) * 100.0 for i in np.flatnonzero(column * 100.0 > STAKE_EPSILON)
+                if i != j and self._ids[i] is not None}
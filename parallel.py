@@ -0,0 +1,163 @@
+"""
+BWL Planspiel - Paralleler Quartalsabschluss
+Verteilt den reinen Quartals-Kernel (kernel.run_quarter) nach Firmen auf
+einen Prozess-Pool. Die Zustände werden als float64-Matrix in Shared Memory
+übergeben (keine gepickelten Dataclasses); Worker schreiben Folgezustand
+und Kostenaufschlüsselung zurück in denselben Block.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from kernel import QuarterOutcome, QuarterState, run_quarter
+
+# Ab dieser Firmenanzahl lohnt sich der Pool (darunter: sequentiell)
+PARALLEL_MIN_FIRMS = 500
+
+# Spalten der Zustandsmatrix: alle Zahlenfelder (inkl. Kreditraten aus dem Kreditbuch) + Lebenszyklus-Code
+NUMERIC_FIELDS = tuple(f.name for f in fields(QuarterState) if f.name != "product_lifecycle_stage")
+INT_FIELDS = frozenset(f.name for f in fields(QuarterState) if f.type is int)
+LIFECYCLE_STAGES = ("introduction", "growth", "maturity", "decline")
+STAGE_COLUMN = len(NUMERIC_FIELDS)
+STATE_WIDTH = STAGE_COLUMN + 1
+_INT_COLUMNS = [i for i, name in enumerate(NUMERIC_FIELDS) if name in INT_FIELDS]
+_STAGE_POSITION = [f.name for f in fields(QuarterState)].index("product_lifecycle_stage")
+
+# Kostenaufschlüsselung (Reihenfolge wie kernel.run_quarter) + effektiver Preis + Qualitätsprämie
+COST_KEYS = (
+    "variable", "energy", "inventory", "depreciation", "depreciation_buildings",
+    "depreciation_machines", "depreciation_equipment", "overhead", "personnel",
+    "personnel_ungelernt", "personnel_angelernt", "personnel_facharbeiter",
+    "marketing", "rd", "interest", "loan_payments", "innovation",
+    "efficiency_investments", "total",
+)
+COST_WIDTH = len(COST_KEYS) + 2
+
+_pool = None
+_pool_workers = 0
+
+
+def _layout(n: int) -> Dict[str, tuple]:
+    """Aufteilung des Shared-Memory-Blocks: {name: (offset in float64, shape)}"""
+    shapes = {
+        "state_in": (n, STATE_WIDTH),
+        "state_out": (n, STATE_WIDTH),
+        "costs_out": (n, COST_WIDTH),
+    }
+    layout, offset = {}, 0
+    for name, shape in shapes.items():
+        layout[name] = (offset, shape)
+        offset += shape[0] * shape[1]
+    return layout
+
+
+def _views(buffer, n: int) -> Dict[str, np.ndarray]:
+    """numpy-Views auf den Block (keine Kopie)"""
+    flat = np.ndarray((sum(s[0] * s[1] for _, s in _layout(n).values()),), dtype=np.float64, buffer=buffer)
+    return {name: flat[offset:offset + shape[0] * shape[1]].reshape(shape)
+            for name, (offset, shape) in _layout(n).items()}
+
+
+def _encode_state(state: QuarterState) -> list:
+    row = [getattr(state, name) for name in NUMERIC_FIELDS]
+    row.append(LIFECYCLE_STAGES.index(state.product_lifecycle_stage))
+    return row
+
+
+def _decode_state(row: list) -> QuarterState:
+    # Positionale Konstruktion (NUMERIC_FIELDS hat die Feldreihenfolge von QuarterState)
+    values = row[:STAGE_COLUMN]
+    for i in _INT_COLUMNS:
+        values[i] = int(values[i])
+    values.insert(_STAGE_POSITION, LIFECYCLE_STAGES[int(row[STAGE_COLUMN])])
+    return QuarterState(*values)
+
+
+def _run_shard(shm_name: str, n: int, lo: int, hi: int) -> int:
+    """Worker: rechnet die Firmen lo..hi-1 und schreibt die Ergebnisse in den Block"""
+    shm = SharedMemory(name=shm_name)
+    try:
+        views = _views(shm.buf, n)
+        state_in = views["state_in"][lo:hi].tolist()
+        for i, row in zip(range(lo, hi), state_in):
+            outcome = run_quarter(_decode_state(row))
+
+            views["state_out"][i] = _encode_state(outcome.state)
+            views["costs_out"][i] = [outcome.cost_breakdown[key] for key in COST_KEYS] + [
+                outcome.effective_price, outcome.quality_premium]
+    finally:
+        views = None  # Buffer-Exporte freigeben, sonst schlägt close() fehl
+        shm.close()
+    return hi - lo
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool wird einmalig gestartet und zwischen Quartalen wiederverwendet"""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_pool():
+    """Beendet den Prozess-Pool (z.B. beim Herunterfahren des Servers)"""
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+    _pool, _pool_workers = None, 0
+
+
+def run_quarters(states: Sequence[QuarterState], workers: int = 0) -> List[QuarterOutcome]:
+    """
+    Quartals-Kernel für viele Firmen (Reihenfolge der Ergebnisse = Reihenfolge der Zustände)
+
+    Args:
+        workers: Anzahl Prozesse; <= 1 oder weniger als PARALLEL_MIN_FIRMS Firmen → sequentiell
+
+    Fällt der Pool aus, wird sequentiell weitergerechnet (der Kernel ist seiteneffektfrei).
+    """
+    if workers <= 1 or len(states) < PARALLEL_MIN_FIRMS:
+        return [run_quarter(state) for state in states]
+
+    n = len(states)
+    size = sum(s[0] * s[1] for _, s in _layout(n).values()) * 8
+    shm = SharedMemory(create=True, size=size)
+    try:
+        views = _views(shm.buf, n)
+        views["state_in"][:] = [_encode_state(state) for state in states]
+
+        step = -(-n // workers)
+        try:
+            pool = _get_pool(workers)
+            futures = [pool.submit(_run_shard, shm.name, n, lo, min(n, lo + step))
+                       for lo in range(0, n, step)]
+            for future in futures:
+                future.result()
+        except Exception as e:
+            print(f"[WARN] Paralleler Quartalsabschluss fehlgeschlagen ({e}) - rechne sequentiell")
+            shutdown_pool()
+            return [run_quarter(state) for state in states]
+
+        state_out = views["state_out"].tolist()
+        costs_out = views["costs_out"].tolist()
+
+        outcomes = []
+        for row, costs in zip(state_out, costs_out):
+            outcomes.append(QuarterOutcome(
+                state=_decode_state(row),
+                cost_breakdown=dict(zip(COST_KEYS, costs)),
+                effective_price=costs[-2],
+                quality_premium=costs[-1]
+            ))
+        return outcomes
+    finally:
+        views = None
+        shm.close()
+        shm.unlink()
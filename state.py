@@ -1,5 +1,10 @@
 from models import GameSession
+from state_service import STATE_ROLE, STATE_SOCKET, ReplicaGame, StateClient
 
 # Globaler Spielzustand (Singleton)
 # Wird von main.py (API) und dashboard.py (UI) gemeinsam genutzt
-game = GameSession()
+# Im Replikat (STATE_ROLE=replica) eine lesende Sicht auf die GameSession des Engine-Prozesses
+if STATE_ROLE == "replica":
+    game = ReplicaGame(StateClient(STATE_SOCKET))
+else:
+    game = GameSession()
@@ -0,0 +1,484 @@
+"""
+BWL Planspiel - State-Service für getrennte Engine-/API-/Dashboard-Prozesse
+Der Engine-Prozess hält die einzige GameSession und stellt sie über einen
+Unix-Socket bereit. Replikate (API-Worker, Dash-Worker) lesen Snapshots
+(neu geladen nur nach Änderungen), leiten Schreibzugriffe an die Engine
+weiter und empfangen deren WebSocket-Broadcasts zur lokalen Verteilung.
+
+Protokoll: Frames = 4-Byte-Länge + pickle. Der Socket entsteht schon mit 0600
+(umask beim Binden), und beide Seiten prüfen die Benutzer-ID der Gegenstelle
+(SO_PEERCRED), bevor sie etwas entpickeln - pickle nur zwischen eigenen Prozessen.
+"""
+import asyncio
+import fcntl
+import os
+import pickle
+import socket
+import struct
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from models import CHANGE_CLOCK, BusinessFirm, GameSession
+
+# Rollen: standalone (alles in einem Prozess), engine (Simulation + Socket), replica (liest Snapshots),
+# auto (mehrere Worker: wer die Dateisperre bekommt, wird Engine, alle anderen Replikate)
+STATE_ROLES = ("standalone", "engine", "replica", "auto")
+STATE_SOCKET = os.getenv("STATE_SOCKET", "/tmp/planspiel-state.sock")
+STATE_LOCK = os.getenv("STATE_LOCK", STATE_SOCKET + ".lock")
+
+# Replikate prüfen höchstens so oft (Sekunden) auf einen neuen Snapshot
+SNAPSHOT_TTL = float(os.getenv("SNAPSHOT_TTL", "0.2"))
+
+# So lange (Sekunden) wartet ein Replikat beim Start auf den Engine-Socket
+CONNECT_TIMEOUT = 30.0
+
+# Schreibende Methoden, die Replikate an die Engine weiterleiten
+GAME_WRITE_METHODS = frozenset({
+    "create_firm", "add_user_to_firm", "acquire_firm", "advance_quarter",
+    "create_bot_firms", "make_bot_decisions", "enforce_kartellamt_regulations",
+})
+FIRM_WRITE_METHODS = frozenset({
+    "apply_decisions", "upgrade_machines", "take_loan", "issue_shares", "hire_personnel",
+    "fire_personnel", "buyback_shares_to_go_private", "update_credit_rating", "touch",
+    "invest_in_innovation",
+})
+
+# Felder, die ein Replikat direkt setzen darf (Quartalsentscheidungen wie in apply_decisions) -
+# Cash, Anteile, Kredite usw. ändern sich nur über Firmenmethoden in der Engine
+FIRM_SET_FIELDS = frozenset({
+    "product_price", "production_capacity", "marketing_budget", "rd_budget", "quality_level",
+    "safety_stock_percentage", "process_optimization_investment", "supplier_negotiation_investment",
+    "overhead_reduction_investment", "buildings_depreciation_rate", "machines_depreciation_rate",
+    "equipment_depreciation_rate",
+})
+
+# Antworten, die ein API-Replikat nicht selbst, sondern über die Engine beantwortet
+FORWARDED_PREFIX = "/api/"
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_HEADER = struct.Struct("!I")
+
+
+class StateServiceError(RuntimeError):
+    """Fehler beim Aufruf über den State-Service"""
+
+
+# ============ LEADER-WAHL ============
+
+_leader_lock = None  # offene Sperrdatei des Engine-Prozesses (Sperre gilt bis Prozessende)
+
+
+def elect_role(role: str, lock_path: str = STATE_LOCK) -> str:
+    """
+    "auto" → "engine" für genau einen Prozess (flock auf lock_path), sonst "replica"
+
+    Die Sperre hält der Engine-Prozess bis zu seinem Ende; das Betriebssystem gibt sie
+    auch bei einem Absturz frei, ein neu gestarteter Worker übernimmt dann die Engine.
+    """
+    global _leader_lock
+    role = role.lower()
+    if role not in STATE_ROLES:
+        raise ValueError(f"Unbekannte STATE_ROLE '{role}' (erlaubt: {', '.join(STATE_ROLES)})")
+    if role != "auto":
+        return role
+    lock_file = open(lock_path, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return "replica"
+    _leader_lock = lock_file
+    return "engine"
+
+
+STATE_ROLE = elect_role(os.getenv("STATE_ROLE", "standalone"))
+
+
+# ============ FRAMES ============
+
+def _peer_uid(sock: socket.socket) -> Optional[int]:
+    """Benutzer-ID des Prozesses am anderen Ende eines Unix-Sockets (None: vom System nicht unterstützt)"""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", credentials)[1]
+
+
+def _check_peer(sock: socket.socket):
+    """Nur Prozesse desselben Benutzers - sonst wird nichts gelesen (pickle!)"""
+    uid = _peer_uid(sock)
+    if uid is not None and uid != os.getuid():
+        raise PermissionError(f"State-Service: Gegenstelle mit fremder Benutzer-ID {uid} abgelehnt")
+
+
+def _pack(obj) -> bytes:
+    body = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    return _HEADER.pack(len(body)) + body
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("State-Service hat die Verbindung geschlossen")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def _recv_frame(sock: socket.socket):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return pickle.loads(_recv_exact(sock, size))
+
+
+async def _read_frame(reader: asyncio.StreamReader):
+    try:
+        (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+        return pickle.loads(await reader.readexactly(size))
+    except asyncio.IncompleteReadError:
+        return None
+
+
+async def _write_frame(writer: asyncio.StreamWriter, obj):
+    writer.write(_pack(obj))
+    await writer.drain()
+
+
+# ============ ENGINE ============
+
+async def call_asgi(app, method: str, path: str, query: bytes, headers: list, body: bytes) -> Tuple[int, list, bytes]:
+    """Führt eine HTTP-Anfrage direkt gegen eine ASGI-App aus (ohne Netzwerk)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query, "root_path": "", "headers": headers,
+        "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 0), "state": {},
+    }
+    request_sent = False
+    response = {"status": 500, "headers": [], "body": bytearray()}
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()  # Client trennt nie vorzeitig
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = list(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            response["body"].extend(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return response["status"], response["headers"], bytes(response["body"])
+
+
+class StateServer:
+    """Unix-Socket-Server im Engine-Prozess"""
+
+    def __init__(self, game: GameSession, path: str = STATE_SOCKET, asgi_app=None):
+        self.game = game
+        self.path = path
+        self.asgi_app = asgi_app
+        self._server = None
+        self._snapshot: Tuple[tuple, bytes] = ((), b"")
+        self._subscribers = set()
+
+    def stamp(self) -> tuple:
+        """Ändert sich bei jeder Änderung an Firmen (CHANGE_CLOCK) oder am Spielstand"""
+        game = self.game
+        return (CHANGE_CLOCK.value, len(game.firms), game.next_firm_id, game.current_quarter,
+                game.is_active, game.quarter_start_time, game.quarter_duration)
+
+    def snapshot(self) -> Tuple[tuple, bytes]:
+        """Serialisierte GameSession - einmal je Stand, für alle Replikate"""
+        stamp = self.stamp()
+        if self._snapshot[0] != stamp:
+            with self.game.lock:  # nie mitten in einem Quartalsabschluss oder einer Transaktion
+                self._snapshot = (stamp, pickle.dumps(self.game, protocol=pickle.HIGHEST_PROTOCOL))
+        return self._snapshot
+
+    def publish(self, message: Dict, topics: tuple, delta: Optional[Dict] = None):
+        """Broadcast an alle abonnierten Replikate weiterreichen"""
+        for queue in self._subscribers:
+            queue.put_nowait((message, topics, delta))
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # verwaister Socket eines beendeten Prozesses
+        umask = os.umask(0o177)  # Socket entsteht gleich mit 0600 - kein Zeitfenster bis zum chmod
+        try:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        finally:
+            os.umask(umask)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            _check_peer(writer.get_extra_info("socket"))
+        except PermissionError as e:
+            print(f"[WARN] {e}")
+            writer.close()
+            return
+        try:
+            while True:
+                request = await _read_frame(reader)
+                if request is None:
+                    break
+                if request["op"] == "subscribe":
+                    await self._stream(writer)
+                    break
+                try:
+                    reply = {"ok": True, "result": await self._dispatch(request)}
+                except Exception as e:
+                    reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                await _write_frame(writer, reply)
+        except (ConnectionError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+    async def _stream(self, writer: asyncio.StreamWriter):
+        queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        try:
+            while True:
+                await _write_frame(writer, await queue.get())
+        finally:
+            self._subscribers.discard(queue)
+
+    async def _dispatch(self, request: Dict):
+        op = request["op"]
+        if op == "snapshot":
+            stamp, data = self.snapshot()
+            return None if stamp == request.get("stamp") else (stamp, data, CHANGE_CLOCK.value)
+        if op == "call":
+            if request["method"] not in GAME_WRITE_METHODS:
+                raise StateServiceError(f"Methode nicht erlaubt: {request['method']}")
+            return getattr(self.game, request["method"])(*request["args"], **request["kwargs"])
+        if op in ("firm_call", "firm_set"):
+            firm = self.game.get_firm_by_id(request["firm_id"])
+            if firm is None:
+                raise StateServiceError(f"Firma {request['firm_id']} nicht gefunden")
+            if op == "firm_set":
+                if request["name"] not in FIRM_SET_FIELDS:
+                    raise StateServiceError(f"Feld nicht erlaubt: {request['name']}")
+                setattr(firm, request["name"], request["value"])
+                return None
+            if request["method"] not in FIRM_WRITE_METHODS:
+                raise StateServiceError(f"Methode nicht erlaubt: {request['method']}")
+            return getattr(firm, request["method"])(*request["args"], **request["kwargs"])
+        if op == "http":
+            if self.asgi_app is None:
+                raise StateServiceError("Engine ohne API - HTTP-Weiterleitung nicht möglich")
+            return await call_asgi(self.asgi_app, request["method"], request["path"],
+                                   request["query"], request["headers"], request["body"])
+        raise StateServiceError(f"Unbekannte Operation: {op}")
+
+
+# ============ REPLIKAT ============
+
+class StateClient:
+    """Synchroner Client (auch aus Dash-Callbacks/Threads nutzbar)"""
+
+    def __init__(self, path: str = STATE_SOCKET):
+        self.path = path
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.path)
+                _check_peer(sock)
+                return sock
+            except PermissionError:
+                sock.close()
+                raise
+            except (FileNotFoundError, ConnectionRefusedError):
+                sock.close()
+                if time.monotonic() > deadline:
+                    raise StateServiceError(f"State-Service unter {self.path} nicht erreichbar")
+                time.sleep(0.1)
+
+    def request(self, op: str, **kwargs):
+        with self._lock:
+            for attempt in range(2):
+                if self._sock is None:
+                    self._sock = self._connect()
+                try:
+                    self._sock.sendall(_pack({"op": op, **kwargs}))
+                    reply = _recv_frame(self._sock)
+                    break
+                except (ConnectionError, OSError):
+                    self._sock.close()
+                    self._sock = None
+                    if attempt:
+                        raise
+        if not reply["ok"]:
+            raise StateServiceError(reply["error"])
+        return reply["result"]
+
+
+async def forward_http(path: str, method: str, url_path: str, query: bytes, headers: list, body: bytes):
+    """Leitet eine HTTP-Anfrage an die Engine weiter (eigene Verbindung, blockiert die Event-Loop nicht)"""
+    reader, writer = await asyncio.open_unix_connection(path)
+    try:
+        _check_peer(writer.get_extra_info("socket"))
+        await _write_frame(writer, {"op": "http", "method": method, "path": url_path,
+                                    "query": query, "headers": headers, "body": body})
+        reply = await _read_frame(reader)
+    finally:
+        writer.close()
+    if reply is None or not reply["ok"]:
+        raise StateServiceError(reply["error"] if reply else "Verbindung zur Engine getrennt")
+    return reply["result"]
+
+
+async def subscribe(path: str):
+    """Async-Generator über die Broadcasts der Engine: (message, topics, delta)"""
+    while True:
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            await asyncio.sleep(0.5)
+            continue
+        try:
+            _check_peer(writer.get_extra_info("socket"))
+            await _write_frame(writer, {"op": "subscribe"})
+            while True:
+                event = await _read_frame(reader)
+                if event is None:
+                    break
+                yield event
+        finally:
+            writer.close()
+        await asyncio.sleep(0.5)  # Engine neu gestartet → erneut verbinden
+
+
+class ReplicaFirm:
+    """Firma aus dem aktuellen Snapshot; Schreibzugriffe gehen an die Engine"""
+
+    def __init__(self, game: "ReplicaGame", firm_id: int):
+        object.__setattr__(self, "_game", game)
+        object.__setattr__(self, "id", firm_id)
+
+    @property
+    def _firm(self) -> BusinessFirm:
+        firm = self._game.firms.get(self.id)
+        if firm is None:
+            raise StateServiceError(f"Firma {self.id} nicht mehr vorhanden")
+        return firm
+
+    def __getattr__(self, name):
+        if name in FIRM_WRITE_METHODS:
+            def forward(*args, **kwargs):
+                return self._game._write("firm_call", firm_id=self.id, method=name, args=args, kwargs=kwargs)
+            return forward
+        return getattr(self._firm, name)
+
+    def __setattr__(self, name, value):
+        # Nur Entscheidungsfelder (absolute Werte sind hier unkritisch); alles, was auf dem
+        # Snapshot-Stand aufbaut (Cash, Investitionen, ...), läuft über FIRM_WRITE_METHODS
+        if name not in FIRM_SET_FIELDS:
+            raise StateServiceError(f"Replikat: {name} nur über Firmenmethoden der Engine änderbar")
+        self._game._write("firm_set", firm_id=self.id, name=name, value=value)
+
+
+class ReplicaGame:
+    """
+    Lesende Sicht auf die GameSession der Engine (Ersatz für state.game im Replikat)
+
+    Lesezugriffe gehen auf den zuletzt geladenen Snapshot (höchstens SNAPSHOT_TTL alt,
+    nach eigenen Schreibzugriffen sofort neu); GAME_WRITE_METHODS laufen in der Engine.
+    """
+
+    def __init__(self, client: StateClient):
+        self._client = client
+        self._session: Optional[GameSession] = None
+        self._stamp = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _current(self) -> GameSession:
+        with self._lock:
+            if self._session is None or time.monotonic() - self._checked > SNAPSHOT_TTL:
+                fresh = self._client.request("snapshot", stamp=self._stamp)
+                if fresh is not None:
+                    self._stamp, data, clock = fresh
+                    self._session = pickle.loads(data)
+                    # Lokale Uhr nachziehen, damit Marktindex/ETags den neuen Stand erkennen
+                    CHANGE_CLOCK.value = max(CHANGE_CLOCK.value + 1, clock)
+                self._checked = time.monotonic()
+            return self._session
+
+    def invalidate(self):
+        """Nächster Lesezugriff lädt den Snapshot neu"""
+        self._checked = 0.0
+
+    def _write(self, op: str, **kwargs):
+        try:
+            result = self._client.request(op, **kwargs)
+        finally:
+            self.invalidate()
+        if isinstance(result, BusinessFirm):
+            return ReplicaFirm(self, result.id)
+        return result
+
+    def get_firm_by_id(self, firm_id: int) -> Optional[ReplicaFirm]:
+        return ReplicaFirm(self, firm_id) if firm_id in self.firms else None
+
+    def get_firm_by_user(self, user_name: str) -> Optional[ReplicaFirm]:
+        firm = self._current().get_firm_by_user(user_name)
+        return ReplicaFirm(self, firm.id) if firm else None
+
+    def __getattr__(self, name):
+        if name in GAME_WRITE_METHODS:
+            def forward(*args, **kwargs):
+                return self._write("call", method=name, args=args, kwargs=kwargs)
+            return forward
+        return getattr(self._current(), name)
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            raise StateServiceError(f"Replikat: {name} kann nur in der Engine gesetzt werden")
+
+
+class ForwardWritesMiddleware:
+    """ASGI-Middleware im API-Replikat: schreibende /api/-Anfragen beantwortet die Engine"""
+
+    def __init__(self, app, path: str = STATE_SOCKET):
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] in READ_METHODS
+                or not scope["path"].startswith(FORWARDED_PREFIX)):
+            await self.app(scope, receive, send)
+            return
+
+        body = bytearray()
+        while True:
+            message = await receive()
+            body.extend(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        status, headers, payload = await forward_http(
+            self.path, scope["method"], scope["path"], scope.get("query_string", b""),
+            list(scope.get("headers", [])), bytes(body))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": payload})
@@ -0,0 +1,188 @@
+"""
+BWL Planspiel - Sensitivitätsanalyse über den Entscheidungsraum
+Wertet ein Raster (oder Latin Hypercube) von Entscheidungen für eine Firma
+in einem vektorisierten Durchlauf aus und liefert Gewinnfläche + Optimum.
+"""
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from batch import firm_columns, broadcast_columns, apply_decision_columns, quarterly_results_batch
+from models import BusinessFirm
+
+# Entscheidungsparameter (Namen wie in DecisionInput)
+SWEEP_PARAMETERS = (
+    "product_price", "production_capacity", "marketing_budget",
+    "rd_budget", "quality_level", "jit_safety_stock",
+)
+
+# Auflösung der Gewinnfläche bei Latin-Hypercube-Stichproben
+SURFACE_BINS = 20
+
+
+def decision_ranges(firm: BusinessFirm) -> Dict[str, tuple]:
+    """Zulässige Wertebereiche je Parameter (wie in BusinessFirm.apply_decisions begrenzt)"""
+    return {
+        "product_price": (50.0, 500.0),
+        "production_capacity": (0.0, firm.calculate_max_production_capacity()),
+        "marketing_budget": (0.0, max(0.0, firm.cash * 0.3)),
+        "rd_budget": (0.0, max(0.0, firm.cash * 0.2)),
+        "quality_level": (1.0, 10.0),
+        "jit_safety_stock": (0.0, 100.0),
+    }
+
+
+def grid_points(ranges: Dict[str, tuple], samples: int) -> Dict[str, np.ndarray]:
+    """Kartesisches Raster mit ~samples Punkten (Qualität nur ganzzahlig)"""
+    varying = [name for name in SWEEP_PARAMETERS if ranges[name][1] > ranges[name][0]]
+    steps = max(2, int(round(samples ** (1.0 / max(1, len(varying))))))
+
+    axes = {}
+    for name in SWEEP_PARAMETERS:
+        low, high = ranges[name]
+        if high <= low:
+            axes[name] = np.array([low])
+        elif name == "quality_level":
+            axes[name] = np.unique(np.round(np.linspace(low, high, min(steps, int(high - low) + 1))))
+        else:
+            axes[name] = np.linspace(low, high, steps)
+
+    mesh = np.meshgrid(*(axes[name] for name in SWEEP_PARAMETERS), indexing="ij")
+    return {name: m.ravel() for name, m in zip(SWEEP_PARAMETERS, mesh)}
+
+
+def latin_hypercube(ranges: Dict[str, tuple], samples: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """Latin-Hypercube-Stichprobe: jede Dimension in samples gleich große Schichten geteilt"""
+    points = {}
+    for name in SWEEP_PARAMETERS:
+        low, high = ranges[name]
+        strata = (rng.permutation(samples) + rng.random(samples)) / samples
+        values = low + (high - low) * strata
+        points[name] = np.round(values) if name == "quality_level" else values
+    return points
+
+
+def _bin_index(values: np.ndarray, low: float, high: float, bins: int) -> np.ndarray:
+    """Ordnet Werte gleich breiten Klassen zu (0 .. bins-1)"""
+    if high <= low:
+        return np.zeros(values.shape, dtype=int)
+    return np.minimum(((values - low) / (high - low) * bins).astype(int), bins - 1)
+
+
+def _finite_list(values: np.ndarray) -> list:
+    """JSON-taugliche Liste (leere Klassen = -inf → None)"""
+    return [round(float(v), 2) if np.isfinite(v) else None for v in values]
+
+
+def sweep_decisions(firm: BusinessFirm, method: str = "grid", samples: int = 100_000,
+                    ranges: Optional[Dict[str, Sequence[float]]] = None,
+                    surface: Sequence[str] = ("product_price", "production_capacity"),
+                    seed: Optional[int] = None) -> Dict:
+    """
+    Berechnet die Gewinnfläche einer Firma über den Entscheidungsraum
+
+    Args:
+        method: "grid" (kartesisches Raster) oder "lhs" (Latin Hypercube)
+        samples: Anzahl ausgewerteter Entscheidungskombinationen (ca.)
+        ranges: optionale Einschränkung einzelner Parameter {name: (min, max)}
+        surface: Parameterpaar für die 2D-Gewinnfläche (Maximum über alle übrigen)
+
+    Returns: Optimum, aktuelle Entscheidung, Gewinnfläche und Randprofile je Parameter
+    """
+    started = time.perf_counter()
+    if method not in ("grid", "lhs"):
+        raise ValueError("Methode muss 'grid' oder 'lhs' sein")
+    if len(surface) != 2 or any(name not in SWEEP_PARAMETERS for name in surface):
+        raise ValueError(f"Gewinnfläche braucht zwei Parameter aus {', '.join(SWEEP_PARAMETERS)}")
+
+    bounds = decision_ranges(firm)
+    for name, (low, high) in (ranges or {}).items():
+        if name not in bounds:
+            raise ValueError(f"Unbekannter Parameter: {name}")
+        allowed_low, allowed_high = bounds[name]
+        clipped = (max(allowed_low, float(low)), min(allowed_high, float(high)))
+        if clipped[0] > clipped[1]:  # Bereich leer (außerhalb der Grenzen oder min > max)
+            raise ValueError(f"Bereich für {name} ({float(low):g} … {float(high):g}) ist leer bzw. liegt außerhalb "
+                             f"des zulässigen Bereichs {allowed_low:g} … {allowed_high:g}")
+        bounds[name] = clipped
+
+    if method == "grid":
+        points = grid_points(bounds, samples)
+    else:
+        points = latin_hypercube(bounds, samples, np.random.default_rng(seed))
+    n = len(points["product_price"])
+
+    # 1. Alle Kombinationen in einem Durchlauf auswerten
+    columns = broadcast_columns(firm_columns([firm]), (n,))
+    decided = apply_decision_columns(
+        columns,
+        price=points["product_price"],
+        capacity=points["production_capacity"],
+        marketing=points["marketing_budget"],
+        rd=points["rd_budget"],
+        quality=points["quality_level"],
+        jit_safety=points["jit_safety_stock"]
+    )
+    results = quarterly_results_batch(decided)
+    profit = results["profit"]
+
+    # 2. Optimum
+    best = int(np.argmax(profit))
+    optimum = {name: round(float(points[name][best]), 2) for name in SWEEP_PARAMETERS}
+    optimum.update({
+        "revenue": round(float(results["revenue"][best]), 2),
+        "profit": round(float(profit[best]), 2),
+        "cash": round(float(results["cash"][best]), 2)
+    })
+
+    # 3. Aktuelle Entscheidung als Vergleich
+    current = quarterly_results_batch(firm_columns([firm]))
+
+    # 4. Randprofile + 2D-Fläche (Maximum/Mittelwert je Klasse)
+    bins = {}
+    for name in SWEEP_PARAMETERS:
+        low, high = bounds[name]
+        if method == "grid" or name == "quality_level":
+            axis, index = np.unique(points[name], return_inverse=True)
+        else:
+            count = SURFACE_BINS if high > low else 1
+            index = _bin_index(points[name], low, high, count)
+            axis = low + (np.arange(count) + 0.5) * (high - low) / count
+        bins[name] = (axis, index)
+
+    marginals = {}
+    for name in SWEEP_PARAMETERS:
+        axis, index = bins[name]
+        best_profit = np.full(len(axis), -np.inf)
+        np.maximum.at(best_profit, index, profit)
+        mean_profit = np.bincount(index, weights=profit, minlength=len(axis)) / np.maximum(1, np.bincount(index, minlength=len(axis)))
+        marginals[name] = {
+            "values": np.round(axis, 2).tolist(),
+            "max_profit": _finite_list(best_profit),
+            "mean_profit": np.round(mean_profit, 2).tolist()
+        }
+
+    (x_axis, x_index), (y_axis, y_index) = bins[surface[0]], bins[surface[1]]
+    grid = np.full((len(x_axis), len(y_axis)), -np.inf)
+    np.maximum.at(grid, (x_index, y_index), profit)
+
+    return {
+        "firm_id": firm.id,
+        "method": method,
+        "evaluated": n,
+        "optimum": optimum,
+        "current": {
+            "profit": round(float(current["profit"][0]), 2),
+            "revenue": round(float(current["revenue"][0]), 2)
+        },
+        "surface": {
+            "x": surface[0],
+            "y": surface[1],
+            "x_values": np.round(x_axis, 2).tolist(),
+            "y_values": np.round(y_axis, 2).tolist(),
+            "max_profit": [_finite_list(row) for row in grid]
+        },
+        "marginals": marginals,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
@@ -0,0 +1,9 @@
+"""
+BWL Planspiel - Testkonfiguration
+Die Module liegen flach im Projektverzeichnis; pytest soll sie auch ohne
+Installation (und unabhängig vom Aufrufverzeichnis) importieren können.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,124 @@
+"""
+Kreditbuch: vorberechnete Tilgungspläne gegen die schrittweise
+Kreditabwicklung, wie sie bisher im Quartals-Kernel lief
+"""
+import threading
+
+import numpy as np
+import pytest
+
+from loans import INITIAL_CAPACITY, INITIAL_TERM, LoanLedger, amortization_schedule
+from models import GameSession
+
+
+def step_loans(loans: list) -> tuple:
+    """
+    Ein Quartal Kreditabwicklung wie früher im Kernel (Dicts wie BusinessFirm.loans)
+
+    Returns: (neue Kredite, fällige Raten, fällige Zinsen, Restschuld)
+    """
+    payments = sum(loan["quarterly_payment"] for loan in loans)
+    interest = sum(loan["interest_payment"] for loan in loans)
+    following = []
+    for loan in loans:
+        quarters_remaining = loan["quarters_remaining"] - 1
+        interest_payment = loan["amount"] * (loan["interest_rate"] / 4.0)
+        if quarters_remaining > 0:
+            principal_payment = loan["amount"] / (quarters_remaining + 1)
+            following.append({
+                "amount": loan["amount"] - principal_payment,
+                "interest_rate": loan["interest_rate"],
+                "quarters_remaining": quarters_remaining,
+                "quarterly_payment": principal_payment + interest_payment,
+                "interest_payment": interest_payment,
+            })
+    return following, payments, interest, sum(loan["amount"] for loan in following)
+
+
+def new_loan(amount: float, interest_rate: float, quarters: int) -> dict:
+    return {"amount": amount, "interest_rate": interest_rate, "quarters_remaining": quarters,
+            "quarterly_payment": 0, "interest_payment": 0}
+
+
+def test_schedule_matches_stepwise_processing():
+    """Raten, Zinsen und Restschuld je Firma und Quartal wie bei der schrittweisen Abwicklung (Summen bis auf Rundung)"""
+    rng = np.random.default_rng(7)
+    ledger = LoanLedger(capacity=4)  # wächst über Zeilen und Planlänge
+    reference = {}  # firm_id → Kredit-Dicts
+    for quarter in range(30):
+        for _ in range(int(rng.integers(0, 4))):
+            firm_id = int(rng.integers(20))
+            amount, rate, quarters = float(rng.uniform(1e5, 5e6)), float(rng.uniform(0.05, 0.25)), int(rng.integers(1, 30))
+            ledger.add(firm_id, amount, rate, quarters, quarter)
+            reference.setdefault(firm_id, []).append(new_loan(amount, rate, quarters))
+
+        terms = ledger.quarter_terms()
+        for firm_id in list(reference):
+            reference[firm_id], payments, interest, debt = step_loans(reference[firm_id])
+            assert terms.get(firm_id, (0.0, 0.0, 0.0)) == pytest.approx((payments, interest, debt), rel=1e-12, abs=1e-9), \
+                (quarter, firm_id)
+            if not reference[firm_id]:
+                del reference[firm_id]
+        ledger.advance()
+
+        assert set(ledger.rows) == set(reference)
+    assert len(ledger.firm) > 4 and ledger.balance.shape[1] > INITIAL_TERM
+
+
+def test_loans_view_matches_stepwise_processing():
+    """Je Kredit auf das Bit gleich: Restbetrag, Restlaufzeit und letzte Rate nach jedem Quartal"""
+    ledger = LoanLedger()
+    ledger.add(1, 1_200_000.0, 0.1, 4)
+    loans = [new_loan(1_200_000.0, 0.1, 4)]
+    for _ in range(4):
+        ledger.advance()
+        loans = step_loans(loans)[0]
+        view = ledger.loans(1)
+        assert [(v["amount"], v["quarters_remaining"], v["quarterly_payment"], v["interest_payment"]) for v in view] == \
+               [(l["amount"], l["quarters_remaining"], l["quarterly_payment"], l["interest_payment"]) for l in loans]
+    assert not ledger.has_loans(1)
+
+
+def test_schedule_lists_remaining_payments():
+    """Tilgungsplan: erste Rate im übernächsten Abschluss, Tilgungen ergeben den Kreditbetrag"""
+    ledger = LoanLedger()
+    ledger.add(1, 1_000_000.0, 0.08, 5, start_quarter=3)
+
+    (entries,) = ledger.schedule(1)
+
+    assert [entry["quarter"] for entry in entries] == [4, 5, 6, 7, 8]
+    assert entries[0]["payment"] == 0.0
+    assert entries[-1]["remaining_amount"] == 0.0
+    balances, _, _ = amortization_schedule(1_000_000.0, 0.08, 5)
+    assert sum(entry["principal"] for entry in entries) == pytest.approx(1_000_000.0 - balances[-1], abs=0.05)
+
+
+def test_remove_firm_frees_rows():
+    """Austritt einer Firma: ihre Kredite entfallen, die Zeilen werden wiederverwendet"""
+    ledger = LoanLedger()
+    for firm_id in range(INITIAL_CAPACITY):
+        ledger.add(firm_id, 1e6, 0.1, 12)
+
+    ledger.remove_firm(0)
+    ledger.add(99, 1e6, 0.1, 12)
+
+    assert 0 not in ledger.quarter_terms()
+    assert len(ledger.firm) == INITIAL_CAPACITY
+
+
+def test_take_loan_waits_for_session_lock():
+    """Kreditaufnahme wartet, solange der Session-Lock gehalten wird (z.B. Quartalsabschluss)"""
+    game = GameSession()
+    firm = game.create_firm("Kredit GmbH", "kredit")
+    results = []
+
+    with game.lock:
+        worker = threading.Thread(target=lambda: results.append(firm.take_loan(1_000_000.0)))
+        worker.start()
+        worker.join(timeout=0.2)
+        assert results == []
+    worker.join()
+
+    assert results[0][0] is True
+    assert game.loan_ledger.has_loans(firm.id)
+    assert game.loan_ledger.lock is game.lock
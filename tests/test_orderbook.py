@@ -0,0 +1,157 @@
+"""
+Orderbuch: Preis-Zeit-Priorität, Teilausführung, Reservierungen,
+Selbsthandel und Mehrheitsgrenze bei der Ausführung
+"""
+import pytest
+
+from models import SHARES_OUTSTANDING, GameSession
+
+
+@pytest.fixture
+def game():
+    game = GameSession()
+    game.create_firm("Ziel AG", "ziel", is_public=True)
+    for name in ("Käufer", "Verkäufer 1", "Verkäufer 2"):
+        firm = game.create_firm(name, name.lower())
+        firm.cash = 1e9
+    return game
+
+
+def firm(game, name):
+    return next(f for f in game.firms.values() if f.name == name)
+
+
+def give_shares(game, target, holder, quantity):
+    """Aktien aus dem Gründerbestand an eine Firma übertragen (Cap Table + Beteiligungsgraph)"""
+    percentage = target.transfer_shares(target.shareholder_name, holder.shareholder_name, quantity)
+    game.ownership.add_stake(holder.id, target.id, percentage)
+
+
+def test_price_time_priority(game):
+    """Bester Preis zuerst, bei gleichem Preis die ältere Order"""
+    target, buyer = firm(game, "Ziel AG"), firm(game, "Käufer")
+    first, second = firm(game, "Verkäufer 1"), firm(game, "Verkäufer 2")
+    give_shares(game, target, first, 10_000)
+    give_shares(game, target, second, 10_000)
+    exchange = game.exchange
+
+    exchange.place_order(target.id, first.id, "sell", 11.0, 1_000)
+    exchange.place_order(target.id, second.id, "sell", 11.0, 1_000)
+    exchange.place_order(target.id, second.id, "sell", 10.5, 500)
+
+    trades = exchange.place_order(target.id, buyer.id, "buy", 11.0, 2_000)["trades"]
+
+    assert [(t["seller_firm_id"], t["price"], t["quantity"]) for t in trades] == [
+        (second.id, 10.5, 500),
+        (first.id, 11.0, 1_000),
+        (second.id, 11.0, 500),
+    ]
+    assert target.share_price == 11.0
+
+
+def test_no_trade_without_crossing_prices(game):
+    """Kauflimit unter dem besten Verkaufslimit: beide Orders bleiben im Buch"""
+    target, buyer, seller = firm(game, "Ziel AG"), firm(game, "Käufer"), firm(game, "Verkäufer 1")
+    give_shares(game, target, seller, 1_000)
+
+    game.exchange.place_order(target.id, seller.id, "sell", 12.0, 1_000)
+    result = game.exchange.place_order(target.id, buyer.id, "buy", 11.0, 1_000)
+
+    assert result["trades"] == []
+    book = game.exchange.book_view(target.id)
+    assert book["bids"][0]["price"] == 11.0 and book["asks"][0]["price"] == 12.0
+
+
+def test_partial_fill_releases_reservation(game):
+    """Teilausführung gibt Cash und Kaufmenge anteilig frei, das Storno den Rest"""
+    target, buyer, seller = firm(game, "Ziel AG"), firm(game, "Käufer"), firm(game, "Verkäufer 1")
+    give_shares(game, target, seller, 10_000)
+    exchange = game.exchange
+    cash_before = buyer.cash
+
+    order = exchange.place_order(target.id, buyer.id, "buy", 10.0, 1_000)["order"]
+    assert exchange.reserved_cash[buyer.id] == pytest.approx(10_000.0)
+
+    trades = exchange.place_order(target.id, seller.id, "sell", 9.0, 400)["trades"]
+
+    assert [(t["price"], t["quantity"]) for t in trades] == [(10.0, 400)]  # Preis der ruhenden Order
+    assert buyer.cash == pytest.approx(cash_before - 4_000.0)
+    assert exchange.reserved_cash[buyer.id] == pytest.approx(6_000.0)
+    assert exchange.reserved_buys[(target.id, buyer.id)] == 600
+    assert exchange.orders[order["order_id"]].remaining == 600
+    assert target.held_shares(buyer.shareholder_name) == pytest.approx(400)
+    assert game.ownership.direct_holdings(buyer.id)[target.id] == pytest.approx(400 / SHARES_OUTSTANDING * 100)
+
+    cancelled = exchange.cancel_order(order["order_id"], buyer.id)
+
+    assert cancelled["status"] == "cancelled" and cancelled["filled"] == 400
+    assert buyer.id not in exchange.reserved_cash
+    assert (target.id, buyer.id) not in exchange.reserved_buys
+
+
+def test_sell_reservation_limits_open_orders(game):
+    """Reservierte Aktien können nicht ein zweites Mal verkauft werden"""
+    target, seller = firm(game, "Ziel AG"), firm(game, "Verkäufer 1")
+    give_shares(game, target, seller, 1_000)
+
+    game.exchange.place_order(target.id, seller.id, "sell", 12.0, 800)
+    with pytest.raises(ValueError, match="Nicht genug Aktien"):
+        game.exchange.place_order(target.id, seller.id, "sell", 12.0, 300)
+
+
+def test_self_trade_cancels_resting_order(game):
+    """Trifft eine Order auf eine eigene Gegenorder, wird die ältere storniert statt ausgeführt"""
+    target, trader = firm(game, "Ziel AG"), firm(game, "Käufer")
+    give_shares(game, target, trader, 1_000)
+    exchange = game.exchange
+    cash_before = trader.cash
+
+    resting = exchange.place_order(target.id, trader.id, "buy", 10.0, 500)["order"]
+    result = exchange.place_order(target.id, trader.id, "sell", 9.0, 500)
+
+    assert result["trades"] == []
+    assert result["order"]["status"] == "open"
+    assert resting["order_id"] not in exchange.orders
+    assert trader.id not in exchange.reserved_cash
+    assert trader.cash == cash_before
+    assert exchange.book_view(target.id)["bids"] == []
+
+
+def test_majority_cap_on_placement(game):
+    """Kauforders, die zusammen über 50% führen würden, werden abgelehnt"""
+    target, buyer = firm(game, "Ziel AG"), firm(game, "Käufer")
+
+    game.exchange.place_order(target.id, buyer.id, "buy", 10.0, 300_000)
+    with pytest.raises(ValueError, match="Mehrheitserwerb"):
+        game.exchange.place_order(target.id, buyer.id, "buy", 10.0, 300_000)
+
+
+def test_majority_cap_rejected_at_settlement(game):
+    """Steigt der Anteil nach Eingabe der Order, scheitert die Ausführung an der Mehrheitsgrenze"""
+    target, buyer = firm(game, "Ziel AG"), firm(game, "Käufer")
+    exchange = game.exchange
+
+    order = exchange.place_order(target.id, buyer.id, "buy", 10.0, 300_000)["order"]
+    give_shares(game, target, buyer, 250_000)  # Zukauf außerhalb der Börse (z.B. Übernahme)
+
+    result = exchange.place_order(target.id, target.id, "sell", 10.0, 300_000)
+
+    assert result["trades"] == []
+    assert order["order_id"] not in exchange.orders
+    assert buyer.id not in exchange.reserved_cash
+    assert (target.id, buyer.id) not in exchange.reserved_buys
+    assert game.ownership.direct_holdings(buyer.id)[target.id] == pytest.approx(25.0)
+    assert result["order"]["status"] == "open"  # Verkaufsorder bleibt im Buch
+
+
+def test_delisting_closes_book(game):
+    """Nicht börsennotierte Aktie: Orders werden abgelehnt, offene Orders entfallen"""
+    target, buyer = firm(game, "Ziel AG"), firm(game, "Käufer")
+    game.exchange.place_order(target.id, buyer.id, "buy", 10.0, 100)
+
+    target.is_public = False
+    with pytest.raises(ValueError, match="nicht börsennotiert"):
+        game.exchange.place_order(target.id, buyer.id, "buy", 10.0, 100)
+
+    assert game.exchange.orders == {}
+    assert buyer.id not in game.exchange.reserved_cash
@@ -0,0 +1,127 @@
+"""
+Beteiligungsgraph: inkrementell gepflegte Verflechtungsmatrix (I - A)⁻¹
+gegen eine direkte Invertierung mit numpy
+"""
+import numpy as np
+import pytest
+
+from ownership import DENSE_SIZE, REBUILD_INTERVAL, OwnershipGraph
+
+
+def reference_inverse(graph: OwnershipGraph) -> np.ndarray:
+    """(I - A)⁻¹ direkt aus den direkten Beteiligungen"""
+    size = len(graph._ids)
+    a = np.zeros((size, size))
+    for owner_id, targets in graph.holdings.items():
+        for target_id, percentage in targets.items():
+            a[graph._index[owner_id], graph._index[target_id]] = percentage / 100.0
+    return np.linalg.inv(np.eye(size) - a)
+
+
+def mixed_updates(graph: OwnershipGraph, firms: int, updates: int, seed: int, group: int = 0):
+    """Zufällige Folge aus neuen/geänderten/aufgelösten Anteilen, Kapitalmaßnahmen und Austritten"""
+    rng = np.random.default_rng(seed)
+    for _ in range(updates):
+        base = int(rng.integers(firms // group)) * group if group else 0
+        owner, target = (base + rng.integers(group or firms, size=2)).tolist()
+        if owner == target:
+            continue
+        action = rng.random()
+        if action < 0.45:
+            graph.add_stake(owner, target, float(rng.random() * 20))
+        elif action < 0.65:
+            graph.set_stake(owner, target, float(rng.random() * 60))
+        elif action < 0.8:
+            graph.set_stake(owner, target, 0.0)
+        elif action < 0.95:
+            graph.scale_holders(target, float(rng.uniform(0.5, 1.0)))
+        else:
+            graph.remove_firm(target)
+        # Summe der Firmenanteile an einer Zielfirma bleibt unter 100%
+        for target_id, holders in list(graph.holders.items()):
+            total = sum(holders.values())
+            if total > 95.0:
+                graph.scale_holders(target_id, 95.0 / total)
+
+
+@pytest.mark.parametrize("firms, capacity, group", [
+    (12, 4, 0),  # wächst über die Anfangskapazität, dicht verflochten
+    (300, 64, 6),  # über DENSE_SIZE: dünne Updates entlang der Ketten
+    (300, 64, 0),  # über DENSE_SIZE, dicht verflochten
+])
+def test_inverse_matches_numpy_after_mixed_updates(firms, capacity, group):
+    """Nach gemischten Updates (inkl. periodischem Neuaufbau) stimmt die Matrix mit np.linalg.inv überein"""
+    graph = OwnershipGraph(capacity)
+    mixed_updates(graph, firms, 3 * REBUILD_INTERVAL + 17, seed=firms + group, group=group)
+
+    assert len(graph._ids) > capacity or firms <= capacity
+    np.testing.assert_allclose(graph._inverse, reference_inverse(graph), atol=1e-10)
+
+
+def test_sparse_update_leaves_unrelated_groups_untouched():
+    """Anteilsänderung in einer Gruppe ändert die Matrix nur auf deren Ketten"""
+    graph = OwnershipGraph(DENSE_SIZE * 2)
+    graph.set_stake(1, 2, 40.0)
+    graph.set_stake(3, 4, 30.0)
+    before = graph._inverse.copy()
+
+    graph.set_stake(2, 5, 50.0)
+
+    changed = np.argwhere(graph._inverse != before).tolist()
+    slots = {firm_id: graph._index[firm_id] for firm_id in (1, 2, 5)}
+    assert sorted(changed) == sorted([[slots[1], slots[5]], [slots[2], slots[5]]])
+    np.testing.assert_allclose(graph._inverse, reference_inverse(graph), atol=1e-12)
+
+
+def test_chain_stakes():
+    """A hält 60% an B, B 60% an C: A hält durchgerechnet 36% an C, davon alles indirekt"""
+    graph = OwnershipGraph()
+    graph.set_stake(1, 2, 60.0)
+    graph.set_stake(2, 3, 60.0)
+
+    assert graph.integrated_stake(1, 3) == pytest.approx(36.0)
+    assert graph.indirect_stake(1, 3) == pytest.approx(36.0)
+    assert graph.integrated_holdings(1) == pytest.approx({2: 60.0, 3: 36.0})
+    assert graph.integrated_holders(3) == pytest.approx({2: 60.0, 1: 36.0})
+
+
+def test_cross_holding_ring():
+    """Ringbeteiligung A ↔ B: geometrische Reihe über den Ring"""
+    graph = OwnershipGraph()
+    graph.set_stake(1, 2, 50.0)
+    graph.set_stake(2, 1, 20.0)
+
+    assert graph.integrated_stake(1, 2) == pytest.approx(50.0 / (1 - 0.5 * 0.2))
+    np.testing.assert_allclose(graph._inverse, reference_inverse(graph), atol=1e-12)
+
+
+def test_scale_holders_dilutes_all_firm_holders():
+    """Kapitalmaßnahme: alle Firmenbeteiligungen an der Zielfirma ändern sich um denselben Faktor"""
+    graph = OwnershipGraph()
+    graph.set_stake(1, 3, 40.0)
+    graph.set_stake(2, 3, 20.0)
+    graph.set_stake(3, 4, 50.0)
+
+    graph.scale_holders(3, 0.5)
+
+    assert graph.direct_holders(3) == pytest.approx({1: 20.0, 2: 10.0})
+    assert graph.integrated_stake(1, 4) == pytest.approx(10.0)
+    np.testing.assert_allclose(graph._inverse, reference_inverse(graph), atol=1e-12)
+
+
+def test_remove_firm_isolates_slot():
+    """Austritt: alle Beteiligungen entfallen, der Slot ist exakt wieder Einheitsvektor"""
+    graph = OwnershipGraph()
+    graph.set_stake(1, 2, 60.0)
+    graph.set_stake(2, 3, 60.0)
+
+    graph.remove_firm(2)
+
+    assert graph.integrated_stake(1, 3) == 0.0
+    assert graph.direct_holdings(1) == {}
+    np.testing.assert_allclose(graph._inverse, np.eye(len(graph._ids)), atol=1e-12)
+
+
+def test_self_holding_rejected():
+    with pytest.raises(ValueError):
+        OwnershipGraph().set_stake(1, 1, 10.0)
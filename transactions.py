@@ -0,0 +1,130 @@
+"""
+BWL Planspiel - Transaktionen über mehrere Firmen
+Übernahmen ändern Käufer und Ziel in vielen Einzelschritten (Cash, Anteile,
+Inventar, Kapazität, Sachwerte, Beteiligungsgraph). Eine Transaction sammelt
+diese Änderungen erst (staging) und wendet sie beim Commit unter dem Lock der
+GameSession in einem Zug an: Quartalsabschluss und Dash-Callbacks sehen
+entweder den alten oder den neuen Stand, eine Ausnahme stellt den alten Stand
+wieder her.
+
+Commits werden gebündelt (Group Commit): alles, was eingeht, während der Lock
+gehalten wird (z.B. während eines Quartalsabschlusses), wird danach in einem
+Durchlauf unter einer einzigen Lock-Übernahme angewendet.
+"""
+from collections import deque
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class Transaction:
+    """
+    Vorgemerkte Änderungen an einer oder mehreren Firmen
+
+    require: Bedingung, die beim Commit (unter dem Lock) noch gelten muss, sonst ValueError
+    update/add/set: Feldänderung, beim Commit aus dem dann aktuellen Wert berechnet
+    step: sonstige Änderung (z.B. Beteiligungsgraph) mit Gegenstück für den Rollback
+    returning: Ergebnis, gebildet nach dem Anwenden (noch unter dem Lock)
+    """
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self._checks: List[Tuple[Callable[[], bool], Any]] = []
+        self._updates: List[Tuple[Any, str, Callable[[Any], Any]]] = []
+        self._steps: List[Tuple[Callable[[], None], Optional[Callable[[], None]]]] = []
+        self._result: Optional[Callable[[], Any]] = None
+        self.done = False
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    # ============ STAGING ============
+
+    def require(self, condition: Callable[[], bool], message):
+        """message: Text oder Callable (Meldung mit den Werten zum Commit-Zeitpunkt)"""
+        self._checks.append((condition, message))
+        return self
+
+    def update(self, firm, field: str, change: Callable[[Any], Any]):
+        """Neuer Wert = change(alter Wert) - change darf den alten Wert nicht verändern (Dicts kopieren)"""
+        self._updates.append((firm, field, change))
+        return self
+
+    def add(self, firm, field: str, amount: float):
+        return self.update(firm, field, lambda value: value + amount)
+
+    def set(self, firm, field: str, value):
+        return self.update(firm, field, lambda _: value)
+
+    def step(self, apply: Callable[[], None], undo: Optional[Callable[[], None]] = None):
+        """Ausgeführt nach allen Feldänderungen, in Reihenfolge; ohne undo nur als letzter Schritt sinnvoll"""
+        self._steps.append((apply, undo))
+        return self
+
+    def returning(self, build: Callable[[], Any]):
+        self._result = build
+        return self
+
+    # ============ COMMIT ============
+
+    def apply(self):
+        """Alles oder nichts - Aufrufer hält den Lock (TransactionManager)"""
+        for condition, message in self._checks:
+            if not condition():
+                raise ValueError(message() if callable(message) else message)
+
+        previous = []  # (firm, field, alter Wert) in Schreibreihenfolge
+        undos = []
+        try:
+            for firm, field, change in self._updates:
+                old = getattr(firm, field)
+                previous.append((firm, field, old))
+                setattr(firm, field, change(old))
+            for run, undo in self._steps:
+                run()
+                undos.append(undo)
+            return self._result() if self._result is not None else None
+        except BaseException:
+            for undo in reversed(undos):
+                if undo is not None:
+                    undo()
+            for firm, field, old in reversed(previous):
+                setattr(firm, field, old)
+            raise
+
+
+class TransactionManager:
+    """Wendet Transaktionen einer GameSession unter deren Lock an, gebündelt je Lock-Übernahme"""
+
+    def __init__(self, lock):
+        self.lock = lock
+        self._pending: deque = deque()
+        self.committed = 0
+        self.rolled_back = 0
+        self.batches = 0
+
+    def submit(self, transaction: Transaction):
+        """
+        Transaktion einreihen und auf ihr Ergebnis warten
+
+        Wer den Lock bekommt, wendet alle bis dahin eingereihten Transaktionen an -
+        jede für sich atomar, ein Fehler betrifft nur die eigene Transaktion.
+        Fehler (z.B. ValueError aus require) werden beim Einreicher erneut ausgelöst.
+        """
+        self._pending.append(transaction)
+        with self.lock:
+            if not transaction.done:  # sonst schon im Durchlauf eines anderen Threads angewendet
+                self._flush()
+        if transaction.error is not None:
+            raise transaction.error
+        return transaction.result
+
+    def _flush(self):
+        self.batches += 1
+        while self._pending:
+            transaction = self._pending.popleft()
+            try:
+                transaction.result = transaction.apply()
+                self.committed += 1
+            except Exception as e:
+                transaction.error = e
+                self.rolled_back += 1
+            finally:
+                transaction.done = True
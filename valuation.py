@@ -0,0 +1,99 @@
+"""
+BWL Planspiel - Bewertungen aller Firmen
+Die drei Bewertungsformeln des Spiels - Unternehmenswert nach deutschem Modell
+(BusinessFirm.calculate_enterprise_value), M&A-Bewertung für Portfolio und
+Teilübernahmen, Aufkaufpreis beim Asset Deal - werden für alle geänderten Firmen
+in einem numpy-Durchlauf berechnet und je Firmen-Versionsstand vorgehalten:
+nach dem Quartalsabschluss einmal für den ganzen Markt, danach nur für Firmen,
+die sich seitdem geändert haben (Kapitalmaßnahmen, Kredite, Börsenumsätze, ...).
+"""
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+# Übernahmeprämie auf den Unternehmenswert (Durchschnitt in Deutschland)
+ACQUISITION_PREMIUM = 0.30
+
+# EBIT-Multiple für profitable Firmen (konservativ)
+EBIT_MULTIPLE = 7.0
+
+# Mindestbewertung (M&A-Bewertung und Asset Deal)
+MIN_VALUATION = 500_000
+
+# Anteile, für die GET /api/firms/{id}/valuation Übernahmepreise ausweist
+ACQUISITION_PRICE_STEPS = (10, 25, 51, 100)
+
+# Eingaben aller Formeln (Spalten der Bewertungsmatrix)
+INPUT_FIELDS = (
+    "equity", "buildings_value", "machines_value", "equipment_value", "brand_value", "debt", "ebit",
+    "cash", "inventory_level", "revenue", "market_share",
+)
+
+
+class Valuation(NamedTuple):
+    enterprise_value: float  # Eigenkapital + Sachwerte + Goodwill - Schulden (+ EBIT-Multiple)
+    asset_value: float  # Cash + Inventar + Sachwerte
+    revenue_value: float  # 4x Jahresumsatz
+    market_position_value: float  # €1M je 1% Marktanteil
+    ma_value: float  # gewichtete M&A-Bewertung (Portfolio, Teilübernahmen)
+    asset_deal_cost: float  # Aufkaufpreis beim Asset Deal (GameSession.acquire_firm)
+
+    def acquisition_price(self, percentage: float) -> float:
+        """Übernahmepreis für percentage % inkl. Prämie (= BusinessFirm.calculate_acquisition_price)"""
+        return self.enterprise_value * (1 + ACQUISITION_PREMIUM) * (percentage / 100.0)
+
+
+def evaluate(columns: np.ndarray) -> np.ndarray:
+    """Bewertungsformeln spaltenweise: columns[len(INPUT_FIELDS), n] → [len(Valuation._fields), n]"""
+    equity, buildings, machines, equipment, brand, debt, ebit, cash, inventory, revenue, market_share = columns
+
+    # Unternehmenswert = Buchwert + Goodwill, bei positivem EBIT zzgl. EBIT-Multiple
+    enterprise_value = equity + (buildings + machines + equipment) + brand - debt
+    enterprise_value = np.maximum(0, np.where(ebit > 0, enterprise_value + ebit * EBIT_MULTIPLE, enterprise_value))
+
+    # M&A-Bewertung: 30% Assets, 50% Umsatz-Multiplikator (16x Quartalsumsatz), 20% Marktposition
+    asset_value = cash + inventory * 50 + machines + buildings + equipment
+    revenue_value = revenue * 16
+    market_position_value = market_share * 1_000_000
+    ma_value = np.maximum(asset_value * 0.3 + revenue_value * 0.5 + market_position_value * 0.2, MIN_VALUATION)
+
+    # Asset Deal: Maximum aus Sachwerten (+20%), 1.5x Quartalsumsatz, Eigenkapital (+10%)
+    deal_assets = cash + inventory * 50 + (machines + buildings + equipment)
+    asset_deal_cost = np.maximum(np.maximum(np.maximum(deal_assets * 1.2, revenue * 1.5), equity * 1.1), MIN_VALUATION)
+
+    return np.stack([enterprise_value, asset_value, revenue_value, market_position_value, ma_value, asset_deal_cost])
+
+
+class ValuationEngine:
+    """Bewertungen einer GameSession, vorgehalten je Firmen-Versionsstand"""
+
+    def __init__(self, game):
+        self.game = game
+        self._cache: Dict[int, Tuple[int, Valuation]] = {}  # firm_id → (Versionsstand, Bewertung)
+
+    def clear(self):
+        self._cache.clear()
+
+    def get(self, firm) -> Valuation:
+        cached = self._cache.get(firm.id)
+        if cached is None or cached[0] != firm.version:
+            self.refresh()
+            cached = self._cache.get(firm.id)
+            if cached is None:  # Firma (noch) nicht in der Session, z.B. gerade entfernt
+                return self._evaluate([firm])[0]
+        return cached[1]
+
+    def refresh(self):
+        """Alle seit der letzten Bewertung geänderten Firmen in einem Durchlauf neu bewerten"""
+        firms = self.game.firms
+        if len(self._cache) > len(firms):
+            self._cache = {fid: entry for fid, entry in self._cache.items() if fid in firms}
+        stale = [firm for firm in firms.values() if self._cache.get(firm.id, (None,))[0] != firm.version]
+        if stale:
+            for firm, valuation in zip(stale, self._evaluate(stale)):
+                self._cache[firm.id] = (firm.version, valuation)
+
+    @staticmethod
+    def _evaluate(firms: List) -> List[Valuation]:
+        columns = np.array([[getattr(firm, name) for firm in firms] for name in INPUT_FIELDS], dtype=float)
+        return [Valuation(*row) for row in evaluate(columns).T.tolist()]
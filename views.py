@@ -0,0 +1,349 @@
+"""
+BWL Planspiel - Lese-Sichten auf Firmen
+Die Antworten der Einzel-Routen (Bilanz, GuV, Liquidität, ...) als Funktionen,
+damit Bundle-/Bulk-Anfragen mehrere Sichten in einem Durchlauf zusammenstellen
+und Zwischenergebnisse (Bewertungen, to_dict) teilen können.
+"""
+from typing import Callable, Dict, List, Optional
+
+from models import BusinessFirm, GameSession
+from valuation import ACQUISITION_PRICE_STEPS, Valuation
+
+# Upgrade-Pfade der Maschinenklassen
+MACHINE_UPGRADE_OPTIONS = {
+    "basic": {
+        "current": "Basic Machines",
+        "next": "Professional Machines",
+        "cost": 3_000_000,
+        "efficiency_gain": "0.8 → 1.0 (25% boost)",
+        "energy_savings": "20% weniger Energiekosten"
+    },
+    "professional": {
+        "current": "Professional Machines",
+        "next": "Premium Machines",
+        "cost": 6_000_000,
+        "efficiency_gain": "1.0 → 1.3 (30% boost)",
+        "energy_savings": "30% weniger Energiekosten"
+    },
+    "premium": {
+        "current": "Premium Machines",
+        "next": "None (Maximum erreicht)",
+        "cost": 0,
+        "efficiency_gain": "Already at maximum",
+        "energy_savings": "Already at maximum"
+    }
+}
+
+# Produktlebenszyklus-Phasen
+LIFECYCLE_INFO = {
+    "introduction": {
+        "stage": "Einführung",
+        "demand_factor": 0.7,
+        "description": "Produkt wird am Markt eingeführt. Geringe Nachfrage.",
+        "quarters_range": "0-4"
+    },
+    "growth": {
+        "stage": "Wachstum",
+        "demand_factor": 1.3,
+        "description": "Produkt wächst stark. Hohe Nachfrage!",
+        "quarters_range": "5-12"
+    },
+    "maturity": {
+        "stage": "Reife",
+        "demand_factor": 1.0,
+        "description": "Stabile Marktphase. Normale Nachfrage.",
+        "quarters_range": "13-24"
+    },
+    "decline": {
+        "stage": "Rückgang",
+        "demand_factor": 0.6,
+        "description": "Produkt veraltet. Niedrige Nachfrage. Innovation nötig!",
+        "quarters_range": "25+"
+    }
+}
+
+
+class ViewContext:
+    """Zwischenergebnisse, die sich die Sichten einer Anfrage teilen"""
+
+    def __init__(self, game: GameSession):
+        self.game = game
+        self._firm_dicts: Dict[int, Dict] = {}
+        self._ma_valuations: Dict[int, Dict] = {}
+
+    def firm_dict(self, firm: BusinessFirm) -> Dict:
+        if firm.id not in self._firm_dicts:
+            self._firm_dicts[firm.id] = firm.to_dict()
+        return self._firm_dicts[firm.id]
+
+    def ma_valuation(self, firm: BusinessFirm) -> Dict:
+        if firm.id not in self._ma_valuations:
+            self._ma_valuations[firm.id] = ma_valuation_view(firm, self.game.valuations.get(firm))
+        return self._ma_valuations[firm.id]
+
+
+def firm_view(ctx: ViewContext, firm: BusinessFirm) -> Dict:
+    return ctx.firm_dict(firm)
+
+
+def balance_sheet_view(ctx: ViewContext, firm: BusinessFirm) -> Dict:
+    return firm.generate_balance_sheet()
+
+
+def income_statement_view(ctx: ViewContext, firm: BusinessFirm) -> Dict:
+    return firm.generate_income_statement()
+
+
+def liquidity_view(ctx: ViewContext, firm: BusinessFirm) -> Dict:
+    """Liquiditätskennzahlen mit Status und Empfehlungen"""
+    # Liquiditätsstatus (mit Handling für unendliche Liquidität)
+    if firm.liquidity_1 == float('inf') or firm.liquidity_1 >= 1.5:
+        liquidity_status = "HEALTHY"
+    elif firm.liquidity_1 >= 1.0:
+        liquidity_status = "GOOD"
+    elif firm.liquidity_1 >= 0.5:
+        liquidity_status = "WARNING"
+    else:
+        liquidity_status = "CRITICAL"
+
+    # Recommendations basierend auf Status
+    recommendations = []
+    if liquidity_status == "HEALTHY":
+        if firm.liquidity_1 == float('inf'):
+            recommendations.append("Perfekte Liquidität! Keine Verbindlichkeiten vorhanden. Bereit für Investitionen.")
+        else:
+            recommendations.append("Liquidität gesund. Gute finanzielle Position.")
+    elif liquidity_status == "GOOD":
+        recommendations.append("Liquidität gut. Weiter überwachen.")
+    elif liquidity_status == "WARNING":
+        recommendations.append("Liquidität niedrig. Cashflow überwachen und Kosten reduzieren.")
+    elif liquidity_status == "CRITICAL":
+        recommendations.append("KRITISCH! Sofort Kredit aufnehmen oder Kosten drastisch senken!")
+
+    return {
+        "liquidity_1": firm.liquidity_1 if firm.liquidity_1 != float('inf') else None,
+        "liquidity_2": firm.liquidity_2 if firm.liquidity_2 != float('inf') else None,
+        "liquidity_3": firm.liquidity_3 if firm.liquidity_3 != float('inf') else None,
+        "current_liabilities": firm.current_liabilities,
+        "status": liquidity_status,
+        "interpretation": {
+            "liquidity_1": "Barliquidität (>1.0 = gut, <0.5 = kritisch)",
+            "liquidity_2": "Einzugsbedingte Liquidität (>1.0 = gut)",
+            "liquidity_3": "Umsatzbedingte Liquidität (>2.0 = gut)"
+        },
+        "recommendations": recommendations
+    }
+
+
+def machines_view(ctx: ViewContext, firm: BusinessFirm) -> Dict:
+    return {
+        "current_class": firm.machine_class,
+        "efficiency_factor": firm.machines_efficiency_factor,
+        "energy_cost_factor": firm.machine_energy_cost_factor,
+        "upgrade_info": MACHINE_UPGRADE_OPTIONS.get(firm.machine_class, {})
+    }
+
+
+def personnel_view(ctx: ViewContext, firm: BusinessFirm) -> Dict:
+    total_personnel = firm.personnel_ungelernt + firm.personnel_angelernt + firm.personnel_facharbeiter
+
+    return {
+        "personnel": {
+            "ungelernt": {
+                "count": firm.personnel_ungelernt,
+                "cost_per_quarter": firm.cost_ungelernt,
+                "productivity": firm.productivity_ungelernt,
+                "total_cost": firm.personnel_ungelernt * firm.cost_ungelernt
+            },
+            "angelernt": {
+                "count": firm.personnel_angelernt,
+                "cost_per_quarter": firm.cost_angelernt,
+                "productivity": firm.productivity_angelernt,
+                "total_cost": firm.personnel_angelernt * firm.cost_angelernt
+            },
+            "facharbeiter": {
+                "count": firm.personnel_facharbeiter,
+                "cost_per_quarter": firm.cost_facharbeiter,
+                "productivity": firm.productivity_facharbeiter,
+                "total_cost": firm.personnel_facharbeiter * firm.cost_facharbeiter
+            },
+            "total": total_personnel,
+            "average_productivity": (
+                (firm.personnel_ungelernt * firm.productivity_ungelernt +
+                 firm.personnel_angelernt * firm.productivity_angelernt +
+                 firm.personnel_facharbeiter * firm.productivity_facharbeiter) / total_personnel
+            ) if total_personnel > 0 else 0
+        }
+    }
+
+
+def product_lifecycle_view(ctx: ViewContext, firm: BusinessFirm) -> Dict:
+    return {
+        "current_stage": firm.product_lifecycle_stage,
+        "age_quarters": firm.product_age_quarters,
+        "innovation_level": firm.product_innovation_level,
+        "innovation_investment": firm.innovation_investment,
+        "innovation_threshold": 5_000_000,
+        "lifecycle_stages": LIFECYCLE_INFO,
+        "recommendation": "Innovation investieren!" if firm.product_lifecycle_stage == "decline" else "Produkt läuft gut"
+    }
+
+
+def valuation_view(ctx: ViewContext, firm: BusinessFirm) -> Dict:
+    """Firmenbewertung mit Übernahmepreisen (GET /api/firms/{id}/valuation)"""
+    valuation = ctx.game.valuations.get(firm)
+
+    result = {
+        "firm_id": firm.id,
+        "firm_name": firm.name,
+        "enterprise_value": valuation.enterprise_value,
+    }
+    for percentage in ACQUISITION_PRICE_STEPS:
+        result[f"acquisition_price_{percentage}"] = valuation.acquisition_price(percentage)
+    result.update({
+        "shares": firm.shares,
+        "is_public": firm.is_public,
+        "market_share": firm.market_share * 100,
+        "ma_valuation": ctx.ma_valuation(firm)
+    })
+    return result
+
+
+def ma_valuation_view(firm: BusinessFirm, valuation: Valuation) -> Dict:
+    """M&A-Bewertung (Assets, Umsatz-Multiplikator, Marktposition) für Portfolio und Teilübernahmen"""
+    return {
+        "firm_id": firm.id,
+        "firm_name": firm.name,
+        "enterprise_value": round(valuation.ma_value, 2),
+        "components": {
+            "asset_value": round(valuation.asset_value, 2),
+            "revenue_value": round(valuation.revenue_value, 2),
+            "market_position_value": round(valuation.market_position_value, 2)
+        },
+        "market_share": round(firm.market_share * 100, 2),
+        "revenue": round(firm.revenue, 2),
+        "equity": round(firm.equity, 2)
+    }
+
+
+def ownership_view(ctx: ViewContext, firm: BusinessFirm) -> Dict:
+    """Besitzstruktur und Portfolio-Übersicht"""
+    ownership = ctx.game.ownership
+
+    # Portfolio: Shares this firm owns IN other companies (Beteiligungsgraph, O(Grad))
+    portfolio_details = []
+    total_portfolio_value = 0.0
+    for target_firm_id, percentage in ownership.direct_holdings(firm.id).items():
+        target_firm = ctx.game.firms.get(target_firm_id)
+        if target_firm:
+            # Calculate value of this stake
+            valuation = ctx.ma_valuation(target_firm)
+            stake_value = valuation["enterprise_value"] * (percentage / 100.0)
+            total_portfolio_value += stake_value
+
+            portfolio_details.append({
+                "firm_id": target_firm_id,
+                "firm_name": target_firm.name,
+                "percentage_owned": round(percentage, 2),
+                "stake_value": round(stake_value, 2),
+                "is_full_ownership": percentage >= 100.0,
+                "is_majority": percentage >= 51.0,
+                "is_blocking_minority": percentage >= 25.0
+            })
+
+    # Sort by percentage owned (descending)
+    portfolio_details.sort(key=lambda x: x["percentage_owned"], reverse=True)
+
+    # Shareholders: Who owns shares IN this firm
+    shareholders_details = []
+    for shareholder_name, percentage in firm.shares.items():
+        shareholders_details.append({
+            "shareholder": shareholder_name,
+            "percentage": round(percentage, 2),
+            "is_majority_shareholder": percentage >= 51.0,
+            "is_blocking_minority": percentage >= 25.0
+        })
+
+    # Sort by percentage (descending)
+    shareholders_details.sort(key=lambda x: x["percentage"], reverse=True)
+
+    # Durchgerechnete Beteiligungen über Ketten (z.B. A → B → C); beherrscht = über Mehrheitskette (wie Konzernkreis)
+    controlled = ctx.game.konzern.controlled(firm.id)
+    indirect_details = []
+    for target_firm_id, integrated in ownership.integrated_holdings(firm.id).items():
+        indirect = ownership.indirect_stake(firm.id, target_firm_id)
+        target_firm = ctx.game.firms.get(target_firm_id)
+        if target_firm and indirect > 0.01:
+            indirect_details.append({
+                "firm_id": target_firm_id,
+                "firm_name": target_firm.name,
+                "indirect_percentage": round(indirect, 2),
+                "integrated_percentage": round(integrated, 2),
+                "is_controlled": target_firm_id in controlled
+            })
+    indirect_details.sort(key=lambda x: x["integrated_percentage"], reverse=True)
+
+    # Firmen, die diese Firma direkt oder über Mehrheitsketten beherrschen (Mutter zuerst)
+    controlling_firms = []
+    for owner_id in ctx.game.konzern.controlling(firm.id):
+        controlling_firms.append({
+            "firm_id": owner_id,
+            "firm_name": ctx.game.firms[owner_id].name,
+            "integrated_percentage": round(ownership.integrated_stake(owner_id, firm.id), 2)
+        })
+
+    return {
+        "firm_id": firm.id,
+        "firm_name": firm.name,
+        "portfolio": {
+            "total_investments": len(portfolio_details),
+            "total_portfolio_value": round(total_portfolio_value, 2),
+            "holdings": portfolio_details,
+            "has_full_ownership": any(h["is_full_ownership"] for h in portfolio_details),
+            "indirect_holdings": indirect_details
+        },
+        "controlled_by": controlling_firms,
+        "shareholders": {
+            "total_shareholders": len(shareholders_details),
+            "ownership_structure": "Privat" if not firm.is_public else "Börsennotiert",
+            "shareholders_list": shareholders_details
+        }
+    }
+
+
+# Name in ?views=... → Sicht
+VIEWS: Dict[str, Callable[[ViewContext, BusinessFirm], Dict]] = {
+    "firm": firm_view,
+    "balance_sheet": balance_sheet_view,
+    "income_statement": income_statement_view,
+    "liquidity": liquidity_view,
+    "machines": machines_view,
+    "personnel": personnel_view,
+    "product_lifecycle": product_lifecycle_view,
+    "valuation": valuation_view,
+    "ownership": ownership_view,
+}
+
+# Sichten, die Daten anderer Firmen lesen (für ETags)
+CROSS_FIRM_VIEWS = frozenset({"ownership"})
+
+
+def parse_views(views: Optional[str]) -> List[str]:
+    """Kommagetrennte Sichtnamen (Bindestriche erlaubt); leer = alle Sichten"""
+    if not views:
+        return list(VIEWS)
+    selected = []
+    for name in views.split(","):
+        name = name.strip().replace("-", "_")
+        if not name:
+            continue
+        if name not in VIEWS:
+            raise ValueError(f"Unbekannte Sicht '{name}' (erlaubt: {', '.join(VIEWS)})")
+        if name not in selected:
+            selected.append(name)
+    return selected
+
+
+def build_bundle(ctx: ViewContext, firm: BusinessFirm, views: List[str]) -> Dict:
+    """Stellt die gewünschten Sichten einer Firma in einem Durchlauf zusammen"""
+    return {name: VIEWS[name](ctx, firm) for name in views}
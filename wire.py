@@ -0,0 +1,109 @@
+"""
+BWL Planspiel - WebSocket-Wire-Format
+Clients handeln beim Verbindungsaufbau Kodierung und Schema aus
+(/ws?encoding=msgpack&schema=slim). Jede Broadcast-Nachricht wird pro
+benötigter Variante genau einmal kodiert und dann an alle Clients verteilt.
+"""
+import json
+from typing import Dict, Tuple, Union
+
+import msgpack
+
+ENCODINGS = ("json", "msgpack")
+SCHEMAS = ("full", "slim")
+DEFAULT_FORMAT = ("json", "full")
+
+# Slim-Schema: Firmen nur mit Kernkennzahlen statt vollem to_dict()
+FIRM_SLIM_FIELDS = (
+    "id", "name", "cash", "revenue", "profit", "market_share",
+    "product_price", "production_capacity", "quality_level", "current_quarter",
+)
+# Nachrichtenfelder, die ein volles firm.to_dict() enthalten
+FIRM_KEYS = ("firm", "acquirer", "target")
+
+# Slim-Schema: Marktübersicht spaltenweise (Rang = Zeilenindex + 1)
+MARKET_SLIM_COLUMNS = ("id", "name", "market_share", "revenue", "profit", "cash")
+
+# Slim-Schema: Quartalsergebnis je Firma ohne Kosten-/Absatzdetails
+RESULT_SLIM_FIELDS = ("revenue", "profit", "cash", "market_share")
+
+
+def parse_format(encoding: str = "json", schema: str = "full") -> Tuple[str, str]:
+    """Prüft die vom Client gewünschte Kodierung + Schema"""
+    encoding, schema = (encoding or "json").lower(), (schema or "full").lower()
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unbekannte Kodierung '{encoding}' (erlaubt: {', '.join(ENCODINGS)})")
+    if schema not in SCHEMAS:
+        raise ValueError(f"Unbekanntes Schema '{schema}' (erlaubt: {', '.join(SCHEMAS)})")
+    return encoding, schema
+
+
+def slim_firm(firm: Dict) -> Dict:
+    return {key: firm[key] for key in FIRM_SLIM_FIELDS if key in firm}
+
+
+def slim_market(market: list) -> Dict:
+    return {
+        "columns": MARKET_SLIM_COLUMNS,
+        "rows": [[row.get(key) for key in MARKET_SLIM_COLUMNS] for row in market]
+    }
+
+
+def slim_results(results: Dict) -> Dict:
+    return {firm_id: {key: result[key] for key in RESULT_SLIM_FIELDS if key in result}
+            for firm_id, result in results.items()}
+
+
+def slim_message(message: Dict) -> Dict:
+    """Reduziert eine Broadcast-Nachricht auf das Slim-Schema (Original bleibt unverändert)"""
+    slim = dict(message)
+    for key in FIRM_KEYS:
+        if isinstance(slim.get(key), dict):
+            slim[key] = slim_firm(slim[key])
+    if isinstance(slim.get("market"), list):
+        slim["market"] = slim_market(slim["market"])
+    if isinstance(slim.get("results"), dict):
+        slim["results"] = slim_results(slim["results"])
+    return slim
+
+
+def _default(value):
+    """Fallback für nicht-native Typen (z.B. numpy-Skalare)"""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def encode(message: Dict, encoding: str) -> Union[str, bytes]:
+    """JSON → Text-Frame, msgpack → Binär-Frame"""
+    if encoding == "msgpack":
+        return msgpack.packb(message, use_bin_type=True, default=_default)
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=_default)
+
+
+def decode(payload: Union[str, bytes]) -> Dict:
+    """Client-Nachricht (Text-Frame = JSON, Binär-Frame = msgpack)"""
+    if isinstance(payload, bytes):
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    return json.loads(payload)
+
+
+class WireMessage:
+    """Broadcast-Nachricht mit Cache je (Kodierung, Schema) - jede Variante wird nur einmal kodiert"""
+
+    def __init__(self, message: Dict):
+        self.message = message
+        self._slim = None
+        self._encoded: Dict[Tuple[str, str], Union[str, bytes]] = {}
+
+    def payload(self, encoding: str, schema: str) -> Union[str, bytes]:
+        key = (encoding, schema)
+        if key not in self._encoded:
+            if schema == "slim":
+                if self._slim is None:
+                    self._slim = slim_message(self.message)
+                body = self._slim
+            else:
+                body = self.message
+            self._encoded[key] = encode(body, encoding)
+        return self._encoded[key]